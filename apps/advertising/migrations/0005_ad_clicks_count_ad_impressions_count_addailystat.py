@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:49
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertising', '0004_ad_ad_render_type_alter_ad_description_alter_ad_name_and_more'),
+        ('streaming', '0017_event_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='clicks_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='impressions_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='AdDailyStat',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('first_quartiles', models.PositiveIntegerField(default=0)),
+                ('midpoints', models.PositiveIntegerField(default=0)),
+                ('third_quartiles', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('skips', models.PositiveIntegerField(default=0)),
+                ('rewards', models.PositiveIntegerField(default=0)),
+                ('ad', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='advertising.ad')),
+                ('slot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='streaming.videoadslot')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('ad__isnull', False)), fields=('ad', 'day'), name='ad_daily_stat_ad_uniq'), models.UniqueConstraint(condition=models.Q(('slot__isnull', False)), fields=('slot', 'day'), name='ad_daily_stat_slot_uniq')],
+            },
+        ),
+    ]
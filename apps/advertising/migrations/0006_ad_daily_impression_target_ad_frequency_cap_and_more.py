@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertising', '0005_ad_clicks_count_ad_impressions_count_addailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='daily_impression_target',
+            field=models.PositiveIntegerField(blank=True, help_text='Deliveries per day, paced evenly over the day', null=True),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='frequency_cap',
+            field=models.PositiveIntegerField(blank=True, help_text='Deliveries per user per day', null=True),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='weight',
+            field=models.PositiveIntegerField(default=1, help_text='Relative share of ad decisions; 0 pauses the ad'),
+        ),
+    ]
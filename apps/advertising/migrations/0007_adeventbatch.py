@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:48
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertising', '0006_ad_daily_impression_target_ad_frequency_cap_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdEventBatch',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('batch_id', models.CharField(max_length=32, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -26,8 +26,52 @@ class Ad(BaseModel):
     views_count = models.IntegerField(default=0)
     likes_count = models.IntegerField(default=0)
     dislikes_count = models.IntegerField(default=0)
+    # Updated in batches by apps.advertising.services.events.flush_ad_events
+    impressions_count = models.IntegerField(default=0)
+    clicks_count = models.IntegerField(default=0)
     is_published = models.BooleanField(default=False)
+    # Delivery settings read by apps.advertising.services.decisions
+    weight = models.PositiveIntegerField(default=1, help_text='Relative share of ad decisions; 0 pauses the ad')
+    daily_impression_target = models.PositiveIntegerField(null=True, blank=True,
+                                                          help_text='Deliveries per day, paced evenly over the day')
+    frequency_cap = models.PositiveIntegerField(null=True, blank=True,
+                                                help_text='Deliveries per user per day')
     
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class AdDailyStat(BaseModel):
+    """Per-day delivery counters of one ad, or of one self-contained interceptor slot."""
+
+    day = models.DateField()
+    ad = models.ForeignKey(Ad, related_name='daily_stats', on_delete=models.CASCADE, null=True, blank=True)
+    slot = models.ForeignKey('streaming.VideoAdSlot', related_name='daily_stats', on_delete=models.CASCADE, null=True, blank=True)
+    impressions = models.PositiveIntegerField(default=0)
+    first_quartiles = models.PositiveIntegerField(default=0)
+    midpoints = models.PositiveIntegerField(default=0)
+    third_quartiles = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    skips = models.PositiveIntegerField(default=0)
+    # Reward claims (claim_reward), counted into Ad.views_count
+    rewards = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ad', 'day'], condition=models.Q(ad__isnull=False), name='ad_daily_stat_ad_uniq'),
+            models.UniqueConstraint(fields=['slot', 'day'], condition=models.Q(slot__isnull=False), name='ad_daily_stat_slot_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.ad or self.slot} on {self.day}'
+
+
+class AdEventBatch(BaseModel):
+    """An ad event buffer batch already counted into ``AdDailyStat``, so a replayed batch is skipped."""
+
+    batch_id = models.CharField(max_length=32, unique=True)
+
+    def __str__(self):
+        return self.batch_id
@@ -1,2 +1,3 @@
 from apps.advertising.serializers.ads import AdSerializer
-from apps.advertising.serializers.claim_reward import ClaimRewardSerializer
\ No newline at end of file
+from apps.advertising.serializers.ad_events import AdEventBatchSerializer
+from apps.advertising.serializers.claim_reward import ClaimRewardSerializer
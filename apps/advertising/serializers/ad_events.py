@@ -0,0 +1,23 @@
+from rest_framework import serializers
+
+from apps.advertising.services.events import TRACKED_AD_EVENTS, parse_ad_ref
+
+MAX_EVENTS_PER_BATCH = 100
+
+
+class AdEventSerializer(serializers.Serializer):
+    """One ad event; ``ad_id`` is the id from the ad payload (``12`` or ``slot_3``)."""
+
+    ad_id = serializers.CharField(max_length=32)
+    event = serializers.ChoiceField(choices=TRACKED_AD_EVENTS)
+
+    def validate_ad_id(self, value):
+        try:
+            parse_ad_ref(value)
+        except ValueError:
+            raise serializers.ValidationError('Invalid ad id.')
+        return value
+
+
+class AdEventBatchSerializer(serializers.Serializer):
+    events = AdEventSerializer(many=True, allow_empty=False, max_length=MAX_EVENTS_PER_BATCH)
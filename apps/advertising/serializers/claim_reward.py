@@ -7,3 +7,5 @@ class ClaimRewardSerializer(serializers.Serializer):
     time_spent_seconds = serializers.IntegerField(min_value=0)
     ad_clicked = serializers.BooleanField(default=False)
     ad_id = serializers.IntegerField(required=False, allow_null=True)
+    # Client-generated id of the ad impression; a retried claim sends the same one
+    impression_id = serializers.CharField(max_length=64, required=False)
@@ -0,0 +1,61 @@
+"""
+Cached ad catalogue.
+
+The carousel is loaded on every home screen, so its newest published ads are
+serialized once, per ``ad_render_type`` variant, and kept in memory behind a
+version key. The ad views call ``invalidate_ad_catalogue`` whenever an ad is
+created, updated or deleted.
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from apps.advertising.models import Ad
+from apps.advertising.serializers import AdSerializer
+from core.utils.cache import SIGNED_URL_CACHE_TIMEOUT, VersionedCache
+
+# Surfaces served from the catalogue; banners have no endpoint reading them
+CATALOGUE_AD_TYPES = (Ad.AD_TYPES.CAROUSEL,)
+# Ads per surface variant
+CATALOGUE_LIMIT = 4
+
+CATALOGUE_TIMEOUT = SIGNED_URL_CACHE_TIMEOUT
+
+_catalogue_cache = VersionedCache('advertising:ad_catalogue', timeout=CATALOGUE_TIMEOUT)
+
+
+def _build_catalogue() -> dict:
+    """``{ad type: {render type or None: [ad payload]}}``, newest first, in one query."""
+
+    # The newest CATALOGUE_LIMIT of each render type also hold the newest overall
+    ads = (
+        Ad.objects
+        .filter(type__in=CATALOGUE_AD_TYPES, is_published=True)
+        .annotate(rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('type'), F('ad_render_type')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        ))
+        .filter(rank__lte=CATALOGUE_LIMIT)
+        .order_by('-created_at', '-id')
+    )
+    catalogue = {
+        ad_type: {render_type: [] for render_type in (None, *Ad.AD_RENDER_TYPES.values)}
+        for ad_type in CATALOGUE_AD_TYPES
+    }
+    for ad, data in zip(ads, AdSerializer(ads, many=True).data):
+        variants = catalogue[ad.type]
+        for render_type in (None, ad.ad_render_type):
+            if len(variants.get(render_type, ())) < CATALOGUE_LIMIT:
+                variants.setdefault(render_type, []).append(dict(data))
+    return catalogue
+
+
+def get_catalogue_ads(ad_type: str, ad_render_type: str = None) -> list:
+    """Published ads of a catalogue surface, optionally of one render type."""
+
+    variants = _catalogue_cache.get(_build_catalogue)[ad_type]
+    return variants.get(ad_render_type if ad_render_type in Ad.AD_RENDER_TYPES.values else None, [])
+
+
+def invalidate_ad_catalogue() -> None:
+    _catalogue_cache.bump()
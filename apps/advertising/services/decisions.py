@@ -0,0 +1,206 @@
+"""
+Ad decision engine.
+
+The eligible ads of each pool (``feed``: published ads, ``interceptor``:
+active self-contained interceptor slots) are loaded with their payloads into
+an inventory kept in process memory behind ``VersionedCache``, reloaded every
+``INVENTORY_TIMEOUT`` seconds and whenever ads change
+(``invalidate_ad_inventory``). Each pool carries a Vose alias table over the
+ad weights, so a draw is O(1) whatever the pool size and a decision never
+touches the database.
+
+Delivery limits are checked against shared-cache counters, fetched in one
+``get_many`` and only for the ads that have limits:
+
+- ``frequency_cap``: deliveries per user and day;
+- ``daily_impression_target``: deliveries per day, paced evenly so that by a
+  given time of day at most that share of the target (plus
+  ``PACING_LEAD``) has been delivered.
+
+An ad over a limit is skipped by redrawing from the same alias table, which
+keeps the other ads in proportion to their weights. Counters count decisions
+(ads handed to a client), not the impressions reported later.
+"""
+from datetime import datetime, time as dt_time
+import random
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.advertising.models import Ad
+from apps.streaming.models import VideoAdSlot
+from core.utils.cache import SIGNED_URL_CACHE_TIMEOUT, VersionedCache
+
+FEED_POOL = 'feed'
+INTERCEPTOR_POOL = 'interceptor'
+
+# Periodic reload, bounded by the signed URLs embedded in the payloads
+INVENTORY_TIMEOUT = min(5 * 60, SIGNED_URL_CACHE_TIMEOUT)
+# Share of the day a paced ad may run ahead of an even delivery
+PACING_LEAD = 1 / 24
+# Redraws before falling back to a scan of the eligible ads
+MAX_REDRAWS = 8
+COUNTER_TIMEOUT = 2 * 24 * 60 * 60
+
+_inventory_cache = VersionedCache('advertising:ad_inventory', timeout=INVENTORY_TIMEOUT)
+
+
+def _alias_table(weights: list) -> tuple:
+    """Vose's alias method: ``(probabilities, aliases)`` for weighted O(1) draws."""
+
+    count = len(weights)
+    total = sum(weights)
+    probabilities = [weight * count / total for weight in weights]
+    aliases = list(range(count))
+    small = [i for i, probability in enumerate(probabilities) if probability < 1]
+    large = [i for i, probability in enumerate(probabilities) if probability >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        aliases[less] = more
+        probabilities[more] += probabilities[less] - 1
+        (small if probabilities[more] < 1 else large).append(more)
+    for i in small + large:
+        probabilities[i] = 1.0
+    return probabilities, aliases
+
+
+def _draw(pool: dict) -> int:
+    index = random.randrange(len(pool['probabilities']))
+    return index if random.random() < pool['probabilities'][index] else pool['aliases'][index]
+
+
+def _feed_entries() -> list:
+    ads = Ad.objects.filter(is_published=True, weight__gt=0).order_by('id')
+    return [
+        {
+            'ref': str(ad.id),
+            'weight': ad.weight,
+            'target': ad.daily_impression_target,
+            'cap': ad.frequency_cap,
+            'payload': {
+                'id': ad.id,
+                'name': ad.name,
+                'slug': ad.slug,
+                'type': ad.type,
+                'thumbnail': ad.thumbnail.url if ad.thumbnail else None,
+                'video': ad.video.url if ad.video else None,
+                'duration': ad.duration.total_seconds() if ad.duration else None,
+            },
+        }
+        for ad in ads
+    ]
+
+
+def _interceptor_entries() -> list:
+    slots = VideoAdSlot.objects.filter(is_active=True, weight__gt=0).exclude(media_file='').order_by('id')
+    return [
+        {
+            'ref': f'slot_{slot.id}',
+            'weight': slot.weight,
+            'target': None,
+            'cap': None,
+            'payload': {
+                'id': slot.id,
+                'media_type': slot.media_type,
+                'media_url': slot.media_file.url if slot.media_file else None,
+                'redirect_link': slot.redirect_link,
+                'display_duration': slot.display_duration,
+            },
+        }
+        for slot in slots
+    ]
+
+
+def _build_inventory() -> dict:
+    inventory = {}
+    for name, entries in ((FEED_POOL, _feed_entries()), (INTERCEPTOR_POOL, _interceptor_entries())):
+        probabilities, aliases = _alias_table([entry['weight'] for entry in entries]) if entries else ([], [])
+        inventory[name] = {'entries': entries, 'probabilities': probabilities, 'aliases': aliases}
+    return inventory
+
+
+def invalidate_ad_inventory() -> None:
+    """Reload the ad inventory of every worker on its next decision."""
+
+    _inventory_cache.bump()
+
+
+def _delivered_key(day, ref: str) -> str:
+    return f'advertising:delivered:{day.isoformat()}:{ref}'
+
+
+def _frequency_key(day, user_id: int, ref: str) -> str:
+    return f'advertising:frequency:{day.isoformat()}:{user_id}:{ref}'
+
+
+def _count(key: str) -> None:
+    if not cache.add(key, 1, timeout=COUNTER_TIMEOUT):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=COUNTER_TIMEOUT)
+
+
+def _blocked(entries: list, user_id, now: datetime) -> set:
+    """Indexes of the entries over their frequency cap or ahead of their pacing."""
+
+    day = now.date()
+    keys = {}
+    for index, entry in enumerate(entries):
+        if entry['target'] is not None:
+            keys[_delivered_key(day, entry['ref'])] = (index, 'target')
+        if entry['cap'] is not None and user_id is not None:
+            keys[_frequency_key(day, user_id, entry['ref'])] = (index, 'cap')
+    if not keys:
+        return set()
+
+    day_start = timezone.make_aware(datetime.combine(day, dt_time.min))
+    day_share = min(1.0, (now - day_start).total_seconds() / 86400 + PACING_LEAD)
+    counts = cache.get_many(list(keys))
+    blocked = set()
+    for key, (index, limit) in keys.items():
+        count = counts.get(key, 0)
+        entry = entries[index]
+        if limit == 'cap' and count >= entry['cap']:
+            blocked.add(index)
+        if limit == 'target' and count >= entry['target'] * day_share:
+            blocked.add(index)
+    return blocked
+
+
+def has_ads(pool: str) -> bool:
+    """Whether ``pool`` has any ad, regardless of delivery limits."""
+
+    return bool(_inventory_cache.get(_build_inventory)[pool]['entries'])
+
+
+def choose_ad(pool: str, user=None):
+    """
+    Payload of the ad chosen from ``pool`` (``FEED_POOL`` or
+    ``INTERCEPTOR_POOL``) for ``user``, or None when no ad is eligible.
+    """
+    inventory = _inventory_cache.get(_build_inventory)[pool]
+    entries = inventory['entries']
+    if not entries:
+        return None
+
+    user_id = user.id if user is not None and user.is_authenticated else None
+    now = timezone.localtime()
+    blocked = _blocked(entries, user_id, now)
+    if len(blocked) == len(entries):
+        return None
+
+    for _ in range(MAX_REDRAWS):
+        index = _draw(inventory)
+        if index not in blocked:
+            break
+    else:
+        eligible = [i for i in range(len(entries)) if i not in blocked]
+        index = random.choices(eligible, weights=[entries[i]['weight'] for i in eligible])[0]
+
+    entry = entries[index]
+    if entry['target'] is not None:
+        _count(_delivered_key(now.date(), entry['ref']))
+    if entry['cap'] is not None and user_id is not None:
+        _count(_frequency_key(now.date(), user_id, entry['ref']))
+    return entry['payload']
@@ -0,0 +1,207 @@
+"""
+Ad event ingestion.
+
+Clients report impressions, quartiles, completions, clicks and skips (and
+``claim_reward`` reports reward claims). Requests only add to a counter
+buffer in Redis keyed ``<day>|<ad ref>|<event>``, so a hot ad costs one
+HINCRBY per event instead of a row lock. ``flush_ad_events`` (beat, every
+minute) drains the buffer and persists a whole batch at once: one
+``INSERT ... ON CONFLICT DO UPDATE SET x = x + EXCLUDED.x`` for the ad rows
+of ``AdDailyStat`` and one for the slot rows, and a single ``UPDATE ... SET
+counter = counter + CASE ...`` for the ``Ad`` totals. The batch id is
+recorded as an ``AdEventBatch`` in the same transaction, so a batch that is
+replayed because the worker died before acking it is not counted twice.
+
+Ad refs are the ids the interceptor payload hands out: ``"<ad id>"`` for
+ads, ``"slot_<slot id>"`` for self-contained interceptor slots.
+"""
+from datetime import date, timedelta
+from uuid import uuid4
+import logging
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.advertising.models import Ad, AdDailyStat, AdEventBatch
+from apps.streaming.models import VideoAdSlot
+from core.utils.cache import CounterBuffer
+
+logger = logging.getLogger(__name__)
+
+# event: AdDailyStat counter
+AD_EVENT_FIELDS = {
+    'impression': 'impressions',
+    'first_quartile': 'first_quartiles',
+    'midpoint': 'midpoints',
+    'third_quartile': 'third_quartiles',
+    'complete': 'completions',
+    'click': 'clicks',
+    'skip': 'skips',
+    'reward': 'rewards',
+}
+STAT_FIELDS = tuple(AD_EVENT_FIELDS.values())
+# Events clients may report; rewards only come from claim_reward
+TRACKED_AD_EVENTS = tuple(event for event in AD_EVENT_FIELDS if event != 'reward')
+# AdDailyStat counter: Ad total it feeds
+AD_TOTAL_FIELDS = {'impressions': 'impressions_count', 'clicks': 'clicks_count', 'rewards': 'views_count'}
+
+SLOT_REF_PREFIX = 'slot_'
+FLUSH_LOCK_KEY = 'advertising:ad_events:flush_lock'
+FLUSH_LOCK_TIMEOUT = 300
+# Rows per upsert statement, well under the bind parameter limits
+UPSERT_CHUNK_SIZE = 1000
+# Replays happen within minutes; older batch ids are forgotten
+APPLIED_BATCH_RETENTION = timedelta(days=7)
+
+_buffer = CounterBuffer('advertising:ad_events')
+
+
+def parse_ad_ref(ref) -> tuple:
+    """``('ad', id)`` or ``('slot', id)`` for an ad ref; raises ``ValueError`` when malformed."""
+
+    ref = str(ref)
+    if ref.startswith(SLOT_REF_PREFIX):
+        return 'slot', int(ref[len(SLOT_REF_PREFIX):])
+    return 'ad', int(ref)
+
+
+def tracking_urls(request, ref) -> dict:
+    """Absolute tracking URLs of an ad ref, for the ``tracking`` block of ad payloads."""
+
+    def url(event):
+        return request.build_absolute_uri(reverse('advertising:track-ad-event', args=[ref, event]))
+
+    return {'impression_url': url('impression'), 'click_url': url('click')}
+
+
+def record_ad_events(events, day: date = None) -> int:
+    """Buffer ``(ad ref, event)`` pairs; returns how many were accepted."""
+
+    day = day or timezone.localdate()
+    counts = {}
+    for ref, event in events:
+        if event not in AD_EVENT_FIELDS:
+            continue
+        kind, target_id = parse_ad_ref(ref)
+        key = f"{day.isoformat()}|{kind}:{target_id}|{event}"
+        counts[key] = counts.get(key, 0) + 1
+    _buffer.add(counts)
+    return sum(counts.values())
+
+
+def _group_batch(batch: dict) -> dict:
+    """``{(day, kind, id): {stat field: count}}`` from drained buffer fields."""
+
+    groups = {}
+    for key, count in batch.items():
+        try:
+            day, target, event = key.split('|')
+            kind, target_id = target.split(':')
+            field = AD_EVENT_FIELDS[event]
+            group = groups.setdefault((date.fromisoformat(day), kind, int(target_id)), {})
+        except (KeyError, ValueError):
+            logger.warning(f"Dropping malformed ad event counter {key}")
+            continue
+        group[field] = group.get(field, 0) + count
+    return groups
+
+
+def _upsert_daily_stats(kind: str, rows: list) -> None:
+    """Add ``(day, id, counts)`` rows into the ``AdDailyStat`` rows of ``kind`` (``'ad'`` or ``'slot'``)."""
+
+    meta = AdDailyStat._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    target = quote(meta.get_field(kind).column)
+    fields = [meta.get_field(name) for name in ('uid', 'created_at', 'updated_at', 'day', kind, *STAT_FIELDS)]
+    columns = ', '.join(quote(field.column) for field in fields)
+    row_sql = f"({', '.join(['%s'] * len(fields))})"
+    updates = ', '.join(
+        [f"{quote(name)} = {table}.{quote(name)} + EXCLUDED.{quote(name)}" for name in STAT_FIELDS]
+        + [f"{quote('updated_at')} = EXCLUDED.{quote('updated_at')}"]
+    )
+
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+            params = []
+            for day, target_id, counts in chunk:
+                values = (uuid4(), now, now, day, target_id, *(counts.get(name, 0) for name in STAT_FIELDS))
+                params.extend(field.get_db_prep_value(value, connection) for field, value in zip(fields, values))
+            # The conflict target names the partial unique index of this kind
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {', '.join([row_sql] * len(chunk))} "
+                f"ON CONFLICT ({target}, {quote('day')}) WHERE {target} IS NOT NULL DO UPDATE SET {updates}",
+                params,
+            )
+
+
+def _save_daily_stats(groups: dict) -> None:
+    rows = {'ad': [], 'slot': []}
+    for (day, kind, target_id), counts in groups.items():
+        rows[kind].append((day, target_id, counts))
+    for kind, kind_rows in rows.items():
+        if kind_rows:
+            _upsert_daily_stats(kind, kind_rows)
+
+
+def _save_ad_totals(groups: dict) -> None:
+    totals = {}
+    for (_, kind, target_id), counts in groups.items():
+        if kind != 'ad':
+            continue
+        for field, total_field in AD_TOTAL_FIELDS.items():
+            if counts.get(field):
+                per_ad = totals.setdefault(total_field, {})
+                per_ad[target_id] = per_ad.get(target_id, 0) + counts[field]
+    if not totals:
+        return
+
+    ad_ids = {ad_id for per_ad in totals.values() for ad_id in per_ad}
+    Ad.objects.filter(id__in=ad_ids).update(**{
+        total_field: F(total_field) + Case(
+            *[When(id=ad_id, then=Value(count)) for ad_id, count in per_ad.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        for total_field, per_ad in totals.items()
+    })
+
+
+def flush_ad_events() -> dict:
+    """Persist the buffered events (single consumer); returns ``{'events', 'rows'}``."""
+
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=FLUSH_LOCK_TIMEOUT):
+        return {'events': 0, 'rows': 0, 'skipped': True}
+
+    try:
+        batch_id, batch = _buffer.drain()
+        if batch_id is None:
+            return {'events': 0, 'rows': 0}
+        groups = _group_batch(batch)
+
+        # Events of deleted ads/slots have nothing left to count into
+        existing = {
+            'ad': set(Ad.objects.filter(id__in=[i for _, k, i in groups if k == 'ad']).values_list('id', flat=True)),
+            'slot': set(VideoAdSlot.objects.filter(id__in=[i for _, k, i in groups if k == 'slot']).values_list('id', flat=True)),
+        }
+        groups = {key: counts for key, counts in groups.items() if key[2] in existing[key[1]]}
+
+        with transaction.atomic():
+            _, created = AdEventBatch.objects.get_or_create(batch_id=batch_id)
+            if created:
+                _save_daily_stats(groups)
+                _save_ad_totals(groups)
+            else:
+                logger.info(f"Ad event batch {batch_id} was already applied, acking it")
+                groups = {}
+        _buffer.ack()
+        AdEventBatch.objects.filter(created_at__lt=timezone.now() - APPLIED_BATCH_RETENTION).delete()
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+    return {'events': sum(batch.values()), 'rows': len(groups)}
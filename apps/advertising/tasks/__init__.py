@@ -0,0 +1 @@
+from .events import flush_ad_event_buffer
@@ -0,0 +1,19 @@
+"""
+Celery task persisting buffered ad events.
+"""
+import logging
+
+from apps.advertising.services.events import flush_ad_events
+from farajayangu_be.celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def flush_ad_event_buffer(self):
+    """Periodic: write the buffered ad events to the daily stats and ad counters."""
+
+    result = flush_ad_events()
+    if result['events']:
+        logger.info(f"Flushed {result['events']} ad events into {result['rows']} daily stats")
+    return {'success': True, **result}
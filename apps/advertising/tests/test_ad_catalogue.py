@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytest
+
+from apps.advertising.models import Ad
+from apps.advertising.services import catalogue
+from apps.advertising.services.catalogue import CATALOGUE_LIMIT, invalidate_ad_catalogue
+from apps.authentication.models import User
+from core.utils import cache as cache_utils
+from core.utils.cache import SIGNED_URL_CACHE_TIMEOUT, VersionedCache
+
+
+@pytest.mark.django_db
+class TestCarouselCatalogue:
+    def setup_method(self):
+        cache.clear()
+        invalidate_ad_catalogue()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="admin", password="x")
+        self.client.force_authenticate(user=self.user)
+        for index in range(5):
+            Ad.objects.create(
+                name=f"custom-{index}", uploaded_by=self.user, is_published=True, type=Ad.AD_TYPES.CAROUSEL,
+            )
+        Ad.objects.create(
+            name="google", uploaded_by=self.user, is_published=True, type=Ad.AD_TYPES.CAROUSEL,
+            ad_render_type=Ad.AD_RENDER_TYPES.GOOGLE,
+        )
+
+    def carousel(self, **params):
+        return [ad["name"] for ad in self.client.get(reverse("advertising:get-carousel-ads"), params).data["data"]]
+
+    def test_variants_are_served_from_cache(self):
+        assert self.carousel() == ["google", "custom-4", "custom-3", "custom-2"]
+
+        with CaptureQueriesContext(connection) as queries:
+            custom = self.carousel(ad_render_type="CUSTOM")
+            google = self.carousel(ad_render_type="GOOGLE")
+        assert len(queries) == 0
+        assert custom == ["custom-4", "custom-3", "custom-2", "custom-1"]
+        assert google == ["google"]
+
+    def test_only_the_served_ads_are_loaded(self, monkeypatch):
+        for index in range(20):
+            Ad.objects.create(
+                name=f"old-{index}", uploaded_by=self.user, is_published=True, type=Ad.AD_TYPES.CAROUSEL,
+            )
+        Ad.objects.filter(name__startswith="old-").update(created_at="2020-01-01T00:00:00Z")
+        Ad.objects.create(name="banner", uploaded_by=self.user, is_published=True, type=Ad.AD_TYPES.BANNER)
+        serialized = []
+        serializer = catalogue.AdSerializer
+
+        def recording_serializer(ads, **kwargs):
+            serialized.extend(ad.name for ad in ads)
+            return serializer(ads, **kwargs)
+
+        monkeypatch.setattr(catalogue, "AdSerializer", recording_serializer)
+
+        assert self.carousel() == ["google", "custom-4", "custom-3", "custom-2"]
+        # At most CATALOGUE_LIMIT per render type, no banners
+        assert sorted(serialized) == ["custom-1", "custom-2", "custom-3", "custom-4", "google"]
+        assert len(serialized) <= CATALOGUE_LIMIT * len(Ad.AD_RENDER_TYPES)
+
+    def test_writes_invalidate_the_catalogue(self):
+        self.carousel()
+        google = Ad.objects.get(name="google")
+
+        self.client.patch(reverse("advertising:update-carousel-ad", args=[google.id]), {"name": "renamed"})
+        assert self.carousel(ad_render_type="GOOGLE") == ["renamed"]
+
+        self.client.delete(reverse("advertising:delete-carousel-ad", args=[google.id]))
+        assert self.carousel(ad_render_type="GOOGLE") == []
+        assert self.carousel()[0] == "custom-4"
+
+    def test_payloads_expire_from_their_build_time_across_workers(self, monkeypatch):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return len(builds)
+
+        now = [1_000_000.0]
+        monkeypatch.setattr(cache_utils.time, "time", lambda: now[0])
+        VersionedCache("test:signed", timeout=SIGNED_URL_CACHE_TIMEOUT).get(build)
+
+        # Another worker loading the shared payload late must not restart its clock
+        now[0] += SIGNED_URL_CACHE_TIMEOUT - 1
+        late_worker = VersionedCache("test:signed", timeout=SIGNED_URL_CACHE_TIMEOUT, check_interval=0)
+        assert late_worker.get(build) == 1
+        now[0] += 2
+        assert late_worker.get(build) == 2
+        assert SIGNED_URL_CACHE_TIMEOUT == 1800
@@ -0,0 +1,58 @@
+from collections import Counter
+import random
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+from apps.advertising.models import Ad
+from apps.advertising.services.decisions import FEED_POOL, _alias_table, choose_ad, invalidate_ad_inventory
+from apps.authentication.models import User
+
+
+@pytest.mark.django_db
+class TestAdDecisions:
+    def setup_method(self):
+        cache.clear()
+        invalidate_ad_inventory()
+        random.seed(7)
+        self.user = User.objects.create_user(username="viewer", password="x")
+
+    def create_ad(self, name, **fields):
+        return Ad.objects.create(name=name, slug=name, uploaded_by=self.user, is_published=True, **fields)
+
+    def test_alias_table_matches_weights(self):
+        probabilities, aliases = _alias_table([1, 3, 4])
+        shares = [probability / 3 for probability in probabilities]
+        for index, alias in enumerate(aliases):
+            shares[alias] += (1 - probabilities[index]) / 3
+        assert shares == pytest.approx([1 / 8, 3 / 8, 4 / 8])
+
+    def test_decisions_follow_weights_without_queries(self):
+        self.create_ad("heavy", weight=3)
+        self.create_ad("light", weight=1)
+        self.create_ad("paused", weight=0)
+        choose_ad(FEED_POOL, self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            names = Counter(choose_ad(FEED_POOL, self.user)["name"] for _ in range(4000))
+        assert len(queries) == 0
+        assert set(names) == {"heavy", "light"}
+        assert names["heavy"] / names["light"] == pytest.approx(3, rel=0.15)
+
+    def test_frequency_caps_are_per_user(self):
+        self.create_ad("capped", weight=100, frequency_cap=2)
+        other_user = User.objects.create_user(username="other", password="x")
+
+        picks = [choose_ad(FEED_POOL, self.user) for _ in range(3)]
+        assert [ad and ad["name"] for ad in picks] == ["capped", "capped", None]
+        assert choose_ad(FEED_POOL, other_user)["name"] == "capped"
+
+    def test_paced_ads_stop_at_their_share_of_the_target(self):
+        # A target of one per day is used up by the first delivery
+        self.create_ad("paced", weight=100, daily_impression_target=1)
+        self.create_ad("filler", weight=1)
+        names = [choose_ad(FEED_POOL)["name"] for _ in range(20)]
+        assert names.count("paced") == 1
+        assert names.count("filler") == 19
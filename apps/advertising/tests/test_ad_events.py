@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+import pytest
+
+from apps.advertising.models import Ad, AdDailyStat, AdEventBatch
+from apps.advertising.services import events
+from apps.advertising.services.events import flush_ad_events, record_ad_events
+from apps.authentication.models import User
+from apps.streaming.models import VideoAdSlot
+
+
+@pytest.mark.django_db
+class TestAdEventPipeline:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="viewer", password="x")
+        self.client.force_authenticate(user=self.user)
+        self.ad = Ad.objects.create(name="Ad", uploaded_by=self.user, is_published=True)
+
+    def test_events_are_buffered_then_flushed_in_bulk(self):
+        ref = str(self.ad.id)
+        response = self.client.post(reverse("advertising:record-ad-events"), {"events": [
+            {"ad_id": ref, "event": "impression"},
+            {"ad_id": ref, "event": "midpoint"},
+            {"ad_id": ref, "event": "click"},
+        ]}, format="json")
+        assert response.data["data"]["accepted"] == 3
+        self.client.get(reverse("advertising:track-ad-event", args=[ref, "impression"]))
+        self.client.post(reverse("advertising:claim-reward"), {"time_spent_seconds": 30, "ad_id": self.ad.id})
+
+        # Nothing is written until the flush
+        self.ad.refresh_from_db()
+        assert self.ad.impressions_count == 0
+
+        assert flush_ad_events() == {"events": 5, "rows": 1}
+        self.ad.refresh_from_db()
+        assert (self.ad.impressions_count, self.ad.clicks_count, self.ad.views_count) == (2, 1, 1)
+        stat = AdDailyStat.objects.get(ad=self.ad, day=timezone.localdate())
+        assert (stat.impressions, stat.midpoints, stat.clicks, stat.rewards) == (2, 1, 1, 1)
+
+        self.client.get(reverse("advertising:track-ad-event", args=[ref, "impression"]))
+        flush_ad_events()
+        assert AdDailyStat.objects.get(ad=self.ad).impressions == 3
+        assert flush_ad_events()["events"] == 0
+
+    def test_rejects_unknown_events(self):
+        response = self.client.post(reverse("advertising:record-ad-events"), {"events": [
+            {"ad_id": str(self.ad.id), "event": "reward"},
+        ]}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_batch_is_written_with_one_upsert_per_kind(self):
+        ads = [self.ad] + [Ad.objects.create(name=f"Ad {i}", uploaded_by=self.user) for i in range(3)]
+        slot = VideoAdSlot.objects.create(title="Slot", start_time="00:00:00", end_time="00:00:10")
+        record_ad_events([(str(ad.id), "impression") for ad in ads] + [(f"slot_{slot.id}", "click")])
+        flush_ad_events()
+
+        record_ad_events([(str(ad.id), "impression") for ad in ads] + [(f"slot_{slot.id}", "click")])
+        with CaptureQueriesContext(connection) as queries:
+            assert flush_ad_events()["rows"] == 5
+        writes = [query["sql"] for query in queries if query["sql"].startswith('INSERT INTO "advertising_addailystat"')]
+        assert len(writes) == 2
+        assert set(AdDailyStat.objects.filter(ad__isnull=False).values_list("impressions", flat=True)) == {2}
+        assert AdDailyStat.objects.get(slot=slot).clicks == 2
+
+    def test_replayed_batch_is_not_counted_twice(self, monkeypatch):
+        record_ad_events([(str(self.ad.id), "impression"), (str(self.ad.id), "click")])
+
+        # The worker dies after committing the batch but before acking it
+        def crash():
+            raise RuntimeError("worker lost")
+
+        monkeypatch.setattr(events._buffer, "ack", crash)
+        with pytest.raises(RuntimeError):
+            flush_ad_events()
+        monkeypatch.undo()
+
+        assert flush_ad_events() == {"events": 2, "rows": 0}
+        self.ad.refresh_from_db()
+        assert (self.ad.impressions_count, self.ad.clicks_count) == (1, 1)
+        assert AdDailyStat.objects.get(ad=self.ad).impressions == 1
+        assert AdEventBatch.objects.count() == 1
+        assert flush_ad_events() == {"events": 0, "rows": 0}
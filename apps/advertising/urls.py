@@ -10,4 +10,6 @@ urlpatterns = [
     path('update-carousel-ad/<int:pk>/', views.update_carousel_ad, name='update-carousel-ad'),
     path('delete-carousel-ad/<int:pk>/', views.delete_carousel_ad, name='delete-carousel-ad'),
     path('claim-reward/', views.claim_reward, name='claim-reward'),
+    path('events/', views.record_ad_event_batch, name='record-ad-events'),
+    path('events/<str:ad_ref>/<str:event>/', views.track_ad_event, name='track-ad-event'),
 ]
@@ -3,7 +3,12 @@ from rest_framework.response import Response
 from core.response_wrapper import success_response, error_response
 from rest_framework.permissions import IsAuthenticated
 from apps.advertising.models import Ad
-from apps.advertising.serializers import AdSerializer, ClaimRewardSerializer
+from apps.advertising.serializers import AdEventBatchSerializer, AdSerializer, ClaimRewardSerializer
+from apps.advertising.services.catalogue import get_catalogue_ads, invalidate_ad_catalogue
+from apps.advertising.services.decisions import invalidate_ad_inventory
+from apps.advertising.services.events import TRACKED_AD_EVENTS, parse_ad_ref, record_ad_events
+from apps.authentication.models import CreditTransaction
+from apps.authentication.services.credits import apply_credit
 
 # Reward constants
 CREDITS_PER_SECOND = 1  # Credits earned per second of ad viewing
@@ -20,15 +25,7 @@ def get_carousel_ads(request):
     - ad_render_type: "CUSTOM" or "GOOGLE" (optional)
     """
     ad_render_type = request.GET.get('ad_render_type')
-
-    qs = Ad.objects.filter(type=Ad.AD_TYPES.CAROUSEL, is_published=True)
-    if ad_render_type in (Ad.AD_RENDER_TYPES.CUSTOM, Ad.AD_RENDER_TYPES.GOOGLE):
-        qs = qs.filter(ad_render_type=ad_render_type)
-
-    ads = qs.order_by('-created_at')[:4]
-
-    serializer = AdSerializer(ads, many=True)
-    return success_response(serializer.data)
+    return success_response(get_catalogue_ads(Ad.AD_TYPES.CAROUSEL, ad_render_type))
 
 
 @api_view(['POST'])
@@ -41,6 +38,8 @@ def create_carousel_ad(request):
     serializer = AdSerializer(data=data)
     if serializer.is_valid():
         serializer.save()
+        invalidate_ad_inventory()
+        invalidate_ad_catalogue()
         return success_response(serializer.data, message='Carousel ad created successfully')
 
     return error_response(serializer.errors, code=400)
@@ -58,6 +57,8 @@ def update_carousel_ad(request, pk):
     serializer = AdSerializer(ad, data=request.data, partial=partial)
     if serializer.is_valid():
         serializer.save()
+        invalidate_ad_inventory()
+        invalidate_ad_catalogue()
         return success_response(serializer.data, message='Carousel ad updated successfully')
 
     return error_response(serializer.errors, code=400)
@@ -72,6 +73,8 @@ def delete_carousel_ad(request, pk):
         return error_response('Carousel ad not found', code=404)
 
     ad.delete()
+    invalidate_ad_inventory()
+    invalidate_ad_catalogue()
     return success_response(message='Carousel ad deleted successfully')
 
 
@@ -84,6 +87,9 @@ def claim_reward(request):
     - time_spent_seconds: int - seconds spent watching the ad
     - ad_clicked: bool - whether the user clicked the ad
     - ad_id: int (optional) - ID of the ad watched
+    - impression_id: str (optional) - client id of the ad impression, also
+      accepted as the ``Idempotency-Key`` header; a claim repeating it is
+      not credited again
     
     Returns:
     - credits_earned: total credits earned from this interaction
@@ -93,9 +99,9 @@ def claim_reward(request):
     if not serializer.is_valid():
         return error_response(serializer.errors, code=400)
     
-    time_spent_seconds = serializer.validated_data['time_spent_seconds']
     ad_clicked = serializer.validated_data['ad_clicked']
     ad_id = serializer.validated_data.get('ad_id')
+    impression_id = serializer.validated_data.get('impression_id') or request.headers.get('Idempotency-Key')
     
     # Calculate credits
     credits_earned = 10
@@ -109,25 +115,67 @@ def claim_reward(request):
         from apps.authentication.models import Profile
         profile = Profile.objects.create()
         user.profile = profile
-        user.save()
+        user.save(update_fields=['profile'])
     
-    # Update credit accumulation
-    profile.credit_accumulation += credits_earned
-    profile.save()
+    ad = Ad.objects.filter(pk=ad_id).first() if ad_id else None  # Invalid ad ids are ignored
+    credit = apply_credit(
+        profile.id,
+        credits_earned,
+        CreditTransaction.REASONS.AD_REWARD,
+        idempotency_key=f'reward:{impression_id[:64]}' if impression_id else None,
+        ad_id=ad.id if ad else None,
+    )
+    if not credit['applied']:
+        return success_response({
+            'credits_earned': credit['amount'],
+            'new_balance': credit['balance'],
+        }, message='Reward already claimed')
     
     # Track ad interaction if ad_id provided
-    if ad_id:
-        try:
-            ad = Ad.objects.get(pk=ad_id)
-            profile.ads_viewed.add(ad)
-            ad.views_count += 1
-            if ad_clicked:
-                profile.ads_clicked.add(ad)
-            ad.save()
-        except Ad.DoesNotExist:
-            pass  # Silently ignore invalid ad_id
+    if ad:
+        profile.ads_viewed.add(ad)
+        if ad_clicked:
+            profile.ads_clicked.add(ad)
+        # Counted into ad.views_count by the batched event flush
+        record_ad_events([(ad.id, 'reward')])
     
     return success_response({
-        'credits_earned': credits_earned,
-        'new_balance': profile.credit_accumulation,
-    }, message='Reward claimed successfully')
\ No newline at end of file
+        'credits_earned': credit['amount'],
+        'new_balance': credit['balance'],
+    }, message='Reward claimed successfully')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def record_ad_event_batch(request):
+    """Record a batch of ad events.
+
+    Payload:
+    - events: list of {"ad_id": "12" or "slot_3", "event": one of TRACKED_AD_EVENTS}
+
+    Events are buffered and persisted in bulk every minute.
+    """
+    serializer = AdEventBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return error_response(serializer.errors, code=400)
+
+    accepted = record_ad_events(
+        (event['ad_id'], event['event']) for event in serializer.validated_data['events']
+    )
+    return success_response({'accepted': accepted}, message='Events recorded')
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def track_ad_event(request, ad_ref, event):
+    """Single-event tracking URL (the ``tracking`` URLs of ad payloads)."""
+
+    try:
+        parse_ad_ref(ad_ref)
+    except ValueError:
+        return error_response('Invalid ad id', code=400)
+    if event not in TRACKED_AD_EVENTS:
+        return error_response('Unknown event', code=400)
+
+    record_ad_events([(ad_ref, event)])
+    return success_response({'accepted': 1}, message='Event recorded')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.analytics.services.partitions import PARTITION_MONTHS_AHEAD, convert_to_partitioned, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the monthly View/Notification partitions ahead of time (PostgreSQL). '
+        'Run once with --convert to partition the existing tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help='Convert the plain tables to partitioned ones first')
+        parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD, help='Months of partitions to keep ready')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('Partitioning requires PostgreSQL; nothing to do'))
+            return
+
+        if options['convert']:
+            converted = convert_to_partitioned(options['months_ahead'])
+            self.stdout.write(f"Converted: {', '.join(converted) or 'none (already partitioned)'}")
+
+        created = ensure_partitions(options['months_ahead'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {len(created)} partitions')
+        )
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.services.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily dashboard rollups for a date range (default: all history)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day, YYYY-MM-DD')
+        parser.add_argument('--end', help='Last day, YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+
+        written = rebuild_rollups(start, end)
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} daily rollups')
+        )
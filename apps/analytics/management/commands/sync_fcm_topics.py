@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.services.topics import sync_all_subscriptions
+
+
+class Command(BaseCommand):
+    help = 'Subscribe every active device to its FCM topics (all, clients, followed categories)'
+
+    def handle(self, *args, **options):
+        processed = sync_all_subscriptions()
+        self.stdout.write(
+            self.style.SUCCESS(f'Synced FCM topic subscriptions for {processed} devices')
+        )
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:05
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_notification_target_url_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBlast',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('target', models.CharField(max_length=50)),
+                ('notification_type', models.CharField(max_length=50)),
+                ('title', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('SENDING', 'SENDING'), ('COMPLETED', 'COMPLETED')], default='SENDING', max_length=20)),
+                ('shards', models.PositiveIntegerField(default=0)),
+                ('notified_count', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('retried_count', models.PositiveIntegerField(default=0)),
+                ('deactivated_count', models.PositiveIntegerField(default=0)),
+                ('error_counts', models.JSONField(blank=True, default=dict)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_notificationblast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationblast',
+            name='topic',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:12
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_notificationblast_topic'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('audience', models.CharField(max_length=100)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('type', models.CharField(choices=[('VIDEO', 'VIDEO'), ('SYSTEM', 'SYSTEM'), ('PROMO', 'PROMO')], default='SYSTEM', max_length=50)),
+                ('target_video_slug', models.SlugField(blank=True, null=True)),
+                ('target_url', models.URLField(blank=True, null=True)),
+                ('blast', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcasts', to='analytics.notificationblast')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BroadcastReadState',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='states', to='analytics.broadcastnotification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_states', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='broadcastnotification',
+            index=models.Index(fields=['audience', 'created_at'], name='broadcast_audience_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='broadcastreadstate',
+            unique_together={('broadcast', 'user')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='active_users_sketch',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+from core.utils.migrations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Concurrent index builds cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('analytics', '0009_dailyrollup_active_users_sketch'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='notification_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user'], name='notification_user_unread_idx'),
+        ),
+    ]
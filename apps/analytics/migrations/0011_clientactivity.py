@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:22
+
+import datetime
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_client_activity(apps, schema_editor):
+    # One row per user, aggregated from their views a chunk of users at a time
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    View = apps.get_model('streaming', 'View')
+    ClientActivity = apps.get_model('analytics', 'ClientActivity')
+
+    last_id = 0
+    while True:
+        users = list(User.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'date_joined')[:2000])
+        if not users:
+            return
+        last_id = users[-1][0]
+        totals = {
+            row['user']: row
+            for row in View.objects
+            .filter(user_id__in=[user_id for user_id, _ in users])
+            .values('user')
+            .annotate(views_count=Count('id'), watch_time=Sum('watch_time'), last_viewed=Max('created_at'))
+        }
+        ClientActivity.objects.bulk_create([
+            ClientActivity(
+                user_id=user_id,
+                views_count=totals.get(user_id, {}).get('views_count', 0),
+                watch_time=totals.get(user_id, {}).get('watch_time') or datetime.timedelta(0),
+                last_active=totals.get(user_id, {}).get('last_viewed') or date_joined,
+            )
+            for user_id, date_joined in users
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_notification_indexes'),
+        ('streaming', '0018_videoadslot_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientActivity',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('views_count', models.PositiveIntegerField(default=0)),
+                ('watch_time', models.DurationField(default=datetime.timedelta(0))),
+                ('last_active', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['watch_time', 'user'], name='client_activity_watch_idx'), models.Index(fields=['last_active', 'user'], name='client_activity_active_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_client_activity, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+from datetime import timedelta
+from uuid import uuid4
+
 from django.db import models
 from apps.common.models import TimeStampedModel
 from core.base_model import BaseModel
@@ -45,6 +48,117 @@ class Notification(BaseModel):
     is_read = models.BooleanField(default=False)
     target_video_slug = models.SlugField(null=True, blank=True)
     target_url = models.URLField(null=True, blank=True)
+    # Partitioned tables only enforce uniqueness together with the partition key
+    uid = models.UUIDField(default=uuid4)
+
+    class Meta:
+        # Monthly range-partitioned by created_at on PostgreSQL (see partition_event_tables). The
+        # partitioned primary key is (id, created_at); rows are still addressed by id alone, which
+        # the shared id sequence keeps unique.
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notification_user_created_idx'),
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='notification_user_unread_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uid', 'created_at'], name='analytics_notification_uid_created_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} notification'
+
+class NotificationBlast(BaseModel):
+    """Delivery statistics of one push notification fan-out."""
+
+    class BLAST_STATUS(models.TextChoices):
+        SENDING = 'SENDING', 'SENDING'
+        COMPLETED = 'COMPLETED', 'COMPLETED'
+
+    target = models.CharField(max_length=50)
+    notification_type = models.CharField(max_length=50)
+    title = models.CharField(max_length=255)
+    # Set when the push went out as a single FCM topic message
+    topic = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=BLAST_STATUS.choices, default=BLAST_STATUS.SENDING)
+    shards = models.PositiveIntegerField(default=0)
+    notified_count = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    retried_count = models.PositiveIntegerField(default=0)
+    deactivated_count = models.PositiveIntegerField(default=0)
+    error_counts = models.JSONField(default=dict, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.notification_type} blast to {self.target}'
+
+
+class BroadcastNotification(BaseModel):
+    """A notification shown to a whole audience segment: one row instead of one per user."""
+
+    audience = models.CharField(max_length=100)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES.choices, default=Notification.NOTIFICATION_TYPES.SYSTEM)
+    target_video_slug = models.SlugField(null=True, blank=True)
+    target_url = models.URLField(null=True, blank=True)
+    blast = models.ForeignKey('analytics.NotificationBlast', related_name='broadcasts', on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['audience', 'created_at'], name='broadcast_audience_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.audience} broadcast'
+
+
+class BroadcastReadState(BaseModel):
+    """Per-user read/deleted flags of a broadcast; rows exist only once the user acted on it."""
+
+    broadcast = models.ForeignKey('analytics.BroadcastNotification', related_name='states', on_delete=models.CASCADE)
+    user = models.ForeignKey('authentication.User', related_name='broadcast_states', on_delete=models.CASCADE)
+    is_read = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('broadcast', 'user')
+
+    def __str__(self):
+        return f'{self.user} state of {self.broadcast}'
+
+
+class DailyRollup(BaseModel):
+    """Per-day client activity totals for the admin dashboard, maintained by ``refresh_rollups``."""
+
+    day = models.DateField(unique=True)
+    views = models.PositiveIntegerField(default=0)
+    watch_time_seconds = models.PositiveBigIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    registrations = models.PositiveIntegerField(default=0)
+    # Distinct clients with at least one view that day
+    active_users = models.PositiveIntegerField(default=0)
+    # Compressed HyperLogLog of those clients, merged for multi-day uniques
+    active_users_sketch = models.BinaryField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Rollup {self.day}'
+
+
+class ClientActivity(BaseModel):
+    """Per-user viewing totals the management client list sorts on, maintained by ``services.client_activity``."""
+
+    user = models.OneToOneField('authentication.User', related_name='activity', on_delete=models.CASCADE)
+    views_count = models.PositiveIntegerField(default=0)
+    watch_time = models.DurationField(default=timedelta(0))
+    # Latest view, or the join date without views
+    last_active = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['watch_time', 'user'], name='client_activity_watch_idx'),
+            models.Index(fields=['last_active', 'user'], name='client_activity_active_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.user} notification'
\ No newline at end of file
+        return f'{self.user} activity'
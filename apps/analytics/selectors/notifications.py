@@ -0,0 +1,128 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Exists, F, IntegerField, OuterRef, Q, QuerySet, Value
+
+from apps.analytics.models import BroadcastNotification, BroadcastReadState, Notification
+from apps.analytics.services.push_notifications import UserGroupTypes, category_followers
+from apps.authentication.models import Role, role_names
+
+# Inbox row kinds; the number is also the tie-breaker in the inbox ordering
+PERSONAL = 0
+BROADCAST = 1
+KIND_NAMES = {PERSONAL: 'personal', BROADCAST: 'broadcast'}
+# Personal and broadcast rows have separate id spaces; broadcast ids are prefixed in the inbox
+BROADCAST_ID_PREFIX = 'b-'
+
+INBOX_FIELDS = ('id', 'title', 'message', 'type', 'created_at', 'target_video_slug', 'target_url', 'kind', 'read')
+
+
+def get_broadcast_audiences(user) -> list:
+    """Audience segments whose broadcasts the user receives."""
+
+    audiences = [UserGroupTypes.ALL]
+    user_roles = role_names(user.role_mask)
+    if Role.ROLES.USER in user_roles:
+        audiences.append(UserGroupTypes.CLIENTS)
+    if Role.ROLES.ADMIN in user_roles:
+        audiences.append(UserGroupTypes.ADMINS)
+    if user.profile_id:
+        audiences.extend(
+            category_followers(category_id)
+            for category_id in user.profile.followed_categories.values_list('id', flat=True)
+        )
+    return audiences
+
+
+def get_user_broadcasts(user, audiences: list = None) -> QuerySet[BroadcastNotification]:
+    """Broadcasts sent to the user's segments since they joined and not deleted by them."""
+
+    states = BroadcastReadState.objects.filter(broadcast=OuterRef('pk'), user=user)
+    return (
+        BroadcastNotification.objects
+        .filter(audience__in=audiences or get_broadcast_audiences(user), created_at__gte=user.date_joined)
+        .exclude(Exists(states.filter(is_deleted=True)))
+    )
+
+
+def _personal_rows(user):
+    return (
+        Notification.objects
+        .filter(user=user)
+        .annotate(kind=Value(PERSONAL, output_field=IntegerField()), read=F('is_read'))
+    )
+
+
+def _broadcast_rows(user, audiences: list = None):
+    read_states = BroadcastReadState.objects.filter(broadcast=OuterRef('pk'), user=user, is_read=True)
+    return (
+        get_user_broadcasts(user, audiences)
+        .annotate(kind=Value(BROADCAST, output_field=IntegerField()), read=Exists(read_states))
+    )
+
+
+def get_unread_broadcasts(user, audiences: list = None) -> QuerySet[BroadcastNotification]:
+    return _broadcast_rows(user, audiences).filter(read=False)
+
+
+def get_broadcast_read(user, broadcast_id: int):
+    """Whether the user has read a broadcast, or None when it is not in their inbox."""
+
+    return _broadcast_rows(user).filter(id=broadcast_id).values_list('read', flat=True).first()
+
+
+def _after_cursor(queryset, kind: int, cursor: tuple):
+    """Rows ordered after ``cursor`` in (-created_at, -kind, -id) order."""
+
+    created_at, cursor_kind, cursor_id = cursor
+    if kind < cursor_kind:
+        return queryset.filter(created_at__lte=created_at)
+    if kind > cursor_kind:
+        return queryset.filter(created_at__lt=created_at)
+    return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=cursor_id))
+
+
+def get_inbox(user, cursor: tuple = None):
+    """Personal and broadcast notifications merged in one UNION query, newest first."""
+
+    personal = _personal_rows(user)
+    broadcasts = _broadcast_rows(user)
+    if cursor:
+        personal = _after_cursor(personal, PERSONAL, cursor)
+        broadcasts = _after_cursor(broadcasts, BROADCAST, cursor)
+
+    return (
+        personal.values(*INBOX_FIELDS)
+        .union(broadcasts.values(*INBOX_FIELDS), all=True)
+        .order_by('-created_at', '-kind', '-id')
+    )
+
+
+def encode_inbox_cursor(row: dict) -> str:
+    raw = f"{row['created_at'].isoformat()}|{row['kind']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_inbox_cursor(value: str) -> tuple:
+    """Parse a cursor from ``encode_inbox_cursor``; raises ``ValueError`` when malformed."""
+
+    try:
+        created_at, kind, row_id = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(kind), int(row_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def inbox_id(row: dict):
+    """Inbox id of a row: the personal ``Notification`` id, or ``b-<id>`` for a broadcast."""
+
+    return f"{BROADCAST_ID_PREFIX}{row['id']}" if row['kind'] == BROADCAST else row['id']
+
+
+def parse_inbox_id(value: str) -> tuple:
+    """``(kind, id)`` of an ``inbox_id``; raises ``ValueError`` when malformed."""
+
+    if value.startswith(BROADCAST_ID_PREFIX):
+        return BROADCAST, int(value[len(BROADCAST_ID_PREFIX):])
+    return PERSONAL, int(value)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.analytics.models import Notification
+from apps.analytics.selectors.notifications import KIND_NAMES, inbox_id
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -17,3 +18,23 @@ class NotificationSerializer(serializers.ModelSerializer):
             'target_video_slug',
             'target_url',
         ]
+
+
+class InboxNotificationSerializer(serializers.Serializer):
+    """Row of the merged personal + broadcast inbox (``get_inbox`` values)."""
+
+    id = serializers.SerializerMethodField()
+    kind = serializers.SerializerMethodField()
+    title = serializers.CharField()
+    body = serializers.CharField(source='message')
+    type = serializers.CharField()
+    is_read = serializers.BooleanField(source='read')
+    created_at = serializers.DateTimeField()
+    target_video_slug = serializers.CharField(allow_null=True)
+    target_url = serializers.CharField(allow_null=True)
+
+    def get_id(self, obj):
+        return inbox_id(obj)
+
+    def get_kind(self, obj):
+        return KIND_NAMES[obj['kind']]
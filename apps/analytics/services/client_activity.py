@@ -0,0 +1,103 @@
+"""
+Per-user viewing totals for the management client list.
+
+Sorting clients by watch time or last activity over ``View`` aggregates needs
+a GROUP BY over every client on each page. ``ClientActivity`` keeps the totals
+on one row per user instead, so the list is a plain indexed keyset scan:
+
+* a new user gets a row from the ``User`` signal;
+* a new view bumps its user's row with ``F()`` expressions;
+* an edited view recomputes its user's row; a deleted view is subtracted
+  (``last_active`` keeps the latest activity seen).
+
+``reconcile_client_activity`` periodically creates rows for users that were
+written without signals (bulk creates, fixtures).
+"""
+from datetime import timedelta
+
+from django.db.models import Count, DateTimeField, F, Max, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.analytics.models import ClientActivity
+from apps.authentication.models import User
+from apps.streaming.models import View
+
+RECONCILE_CHUNK_SIZE = 1000
+
+
+def create_client_activity(user) -> None:
+    ClientActivity.objects.get_or_create(user=user, defaults={'last_active': user.date_joined})
+
+
+def record_view(view) -> None:
+    """A view was created for ``view.user``."""
+
+    updated = ClientActivity.objects.filter(user_id=view.user_id).update(
+        views_count=F('views_count') + 1,
+        watch_time=F('watch_time') + (view.watch_time or timedelta(0)),
+        last_active=Greatest('last_active', Value(view.created_at, output_field=DateTimeField())),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        refresh_client_activity([view.user_id])
+
+
+def remove_view(view) -> None:
+    """A view of ``view.user`` was deleted."""
+
+    ClientActivity.objects.filter(user_id=view.user_id, views_count__gt=0).update(
+        views_count=F('views_count') - 1,
+        watch_time=F('watch_time') - (view.watch_time or timedelta(0)),
+        updated_at=timezone.now(),
+    )
+
+
+def refresh_client_activity(user_ids) -> int:
+    """Recompute the rows of ``user_ids`` from ``View``; returns the rows written."""
+
+    joined = dict(User.objects.filter(id__in=user_ids).values_list('id', 'date_joined'))
+    totals = {
+        row['user_id']: row
+        for row in View.objects
+        .filter(user_id__in=joined)
+        .values('user_id')
+        .annotate(views_count=Count('id'), watch_time=Sum('watch_time'), last_viewed=Max('created_at'))
+    }
+    existing = {activity.user_id: activity for activity in ClientActivity.objects.filter(user_id__in=joined)}
+
+    now = timezone.now()
+    for user_id, date_joined in joined.items():
+        row = totals.get(user_id, {})
+        activity = existing.setdefault(user_id, ClientActivity(user_id=user_id))
+        activity.views_count = row.get('views_count', 0)
+        activity.watch_time = row.get('watch_time') or timedelta(0)
+        activity.last_active = row.get('last_viewed') or date_joined
+        activity.updated_at = now
+
+    ClientActivity.objects.bulk_create(
+        [activity for activity in existing.values() if activity.pk is None], ignore_conflicts=True,
+    )
+    ClientActivity.objects.bulk_update(
+        [activity for activity in existing.values() if activity.pk is not None],
+        ['views_count', 'watch_time', 'last_active', 'updated_at'],
+    )
+    return len(existing)
+
+
+def reconcile_client_activity(chunk_size: int = RECONCILE_CHUNK_SIZE) -> int:
+    """Create the rows of users that have none; returns the rows created."""
+
+    created = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects
+            .filter(id__gt=last_id, activity__isnull=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return created
+        last_id = user_ids[-1]
+        created += refresh_client_activity(user_ids)
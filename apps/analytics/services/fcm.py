@@ -0,0 +1,115 @@
+"""
+Firebase Cloud Messaging client.
+
+Sends batches of up to ``FCM_BATCH_SIZE`` messages through the process-wide
+notification transport and classifies the per-token results.
+"""
+import logging
+
+from apps.analytics.services.transport import NotificationTransport, build_message, get_transport
+
+logger = logging.getLogger(__name__)
+
+# FCM rejects multicast/batch requests with more than 500 tokens or messages
+FCM_BATCH_SIZE = 500
+
+# Topic (un)subscribe calls accept at most 1000 tokens
+FCM_TOPIC_BATCH_SIZE = 1000
+
+
+class DeliveryErrors:
+    """Per-token FCM failure classes."""
+    UNREGISTERED = "unregistered"
+    INVALID = "invalid"
+    QUOTA = "quota"
+    UNAVAILABLE = "unavailable"
+    OTHER = "other"
+
+
+# Tokens that will never deliver again; their devices get deactivated
+DEAD_TOKEN_ERRORS = {DeliveryErrors.UNREGISTERED, DeliveryErrors.INVALID}
+
+# Transient failures worth another attempt after a backoff
+RETRYABLE_ERRORS = {DeliveryErrors.QUOTA, DeliveryErrors.UNAVAILABLE}
+
+
+def classify_error(error: Exception) -> str:
+    """Map a per-token (or whole-request) FCM exception to a ``DeliveryErrors`` value."""
+
+    from firebase_admin import exceptions, messaging
+
+    if isinstance(error, messaging.UnregisteredError):
+        return DeliveryErrors.UNREGISTERED
+    if isinstance(error, messaging.SenderIdMismatchError):
+        return DeliveryErrors.INVALID
+    # INVALID_ARGUMENT is also used for malformed payloads; only a bad token kills the device
+    if isinstance(error, exceptions.InvalidArgumentError) and 'registration token' in str(error).lower():
+        return DeliveryErrors.INVALID
+    if isinstance(error, exceptions.ResourceExhaustedError):
+        return DeliveryErrors.QUOTA
+    if isinstance(error, (exceptions.UnavailableError, exceptions.InternalError, exceptions.DeadlineExceededError)):
+        return DeliveryErrors.UNAVAILABLE
+    return DeliveryErrors.OTHER
+
+
+def retry_after_seconds(error: Exception):
+    """``Retry-After`` header of a throttled FCM response, if any."""
+
+    response = getattr(error, 'http_response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class FCMClient:
+    """Batch sender over the notification transport; topic management via ``firebase_admin.messaging``."""
+
+    def __init__(self, transport: NotificationTransport = None):
+        from firebase_admin import messaging
+
+        # None follows the process transport, which init_transport replaces in each worker
+        self._transport = transport
+        self.transport.start()
+        self.messaging = messaging
+
+    @property
+    def transport(self) -> NotificationTransport:
+        return self._transport or get_transport()
+
+    def send_multicast(self, tokens: list, title: str, body: str, data: dict = None):
+        """Send one payload to up to ``FCM_BATCH_SIZE`` tokens as one concurrent batch."""
+
+        return self.transport.send([build_message(title, body, data, token=token) for token in tokens])
+
+    def send_each(self, messages: list, data: dict = None):
+        """Send up to ``FCM_BATCH_SIZE`` ``(token, title, body)`` messages as one concurrent batch."""
+
+        return self.transport.send([build_message(title, body, data, token=token) for token, title, body in messages])
+
+    def send_to_topic(self, topic: str, title: str, body: str, data: dict = None) -> str:
+        """Send one payload to every device subscribed to ``topic``; returns the message id."""
+
+        response = self.transport.send([build_message(title, body, data, topic=topic)]).responses[0]
+        if not response.success:
+            raise response.exception
+        return response.message_id
+
+    def subscribe_to_topic(self, tokens: list, topic: str):
+        return self.messaging.subscribe_to_topic(tokens, topic, app=self.transport.app)
+
+    def unsubscribe_from_topic(self, tokens: list, topic: str):
+        return self.messaging.unsubscribe_from_topic(tokens, topic, app=self.transport.app)
+
+
+_client = None
+
+
+def get_fcm_client() -> FCMClient:
+    """Process-wide client over the process-wide transport."""
+
+    global _client
+    if _client is None:
+        _client = FCMClient()
+    return _client
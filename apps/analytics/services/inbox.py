@@ -0,0 +1,61 @@
+"""
+Inbox state changes for personal and broadcast notifications.
+
+Broadcast read/deleted flags live in ``BroadcastReadState`` rows that are
+created on first interaction, so sending a broadcast never writes per-user rows.
+"""
+from django.db.models import Exists, OuterRef
+
+from apps.analytics.models import BroadcastReadState, Notification
+from apps.analytics.selectors.notifications import get_broadcast_read, get_user_broadcasts
+from apps.analytics.services.unread_counts import decrement_broadcast_unread, reset_unread
+
+
+def _set_broadcast_state(user, broadcast_ids, **flags) -> None:
+    """Upsert the user's state rows for ``broadcast_ids`` with ``flags``."""
+
+    BroadcastReadState.objects.bulk_create(
+        [BroadcastReadState(broadcast_id=broadcast_id, user=user, **flags) for broadcast_id in broadcast_ids],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['broadcast', 'user'],
+        update_fields=list(flags) + ['updated_at'],
+    )
+
+
+def mark_broadcast_read(user, broadcast_id: int) -> bool:
+    """Mark one visible broadcast read; returns False when the user cannot see it."""
+
+    is_read = get_broadcast_read(user, broadcast_id)
+    if is_read is None:
+        return False
+    if not is_read:
+        _set_broadcast_state(user, [broadcast_id], is_read=True)
+        decrement_broadcast_unread(user)
+    return True
+
+
+def delete_broadcast(user, broadcast_id: int) -> bool:
+    """Hide one broadcast from the user's inbox; returns False when the user cannot see it."""
+
+    is_read = get_broadcast_read(user, broadcast_id)
+    if is_read is None:
+        return False
+    _set_broadcast_state(user, [broadcast_id], is_deleted=True)
+    if not is_read:
+        decrement_broadcast_unread(user)
+    return True
+
+
+def mark_all_read(user) -> None:
+    Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+    read = BroadcastReadState.objects.filter(broadcast=OuterRef('pk'), user=user, is_read=True)
+    unread = get_user_broadcasts(user).exclude(Exists(read)).values_list('id', flat=True)
+    _set_broadcast_state(user, list(unread), is_read=True)
+    reset_unread(user)
+
+
+def clear_all(user) -> None:
+    Notification.objects.filter(user=user).delete()
+    _set_broadcast_state(user, list(get_user_broadcasts(user).values_list('id', flat=True)), is_deleted=True)
+    reset_unread(user)
@@ -0,0 +1,64 @@
+"""
+Notification templates.
+
+Placeholders are written ``--name--``. Per-user placeholders (``USER_FIELDS``)
+are filled from the recipient's row; every other placeholder is a blast-level
+variable with a declared type, validated once when the blast is queued. A
+template without per-user placeholders renders to one payload for the whole
+audience, so it can go out as a multicast instead of one message per user.
+"""
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r'--([a-z_]+)--')
+
+# Per-user placeholder -> User column it is read from
+USER_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+}
+
+
+class NotificationTemplate:
+
+    def __init__(self, title: str, body: str, variables: dict = None):
+        self.title = title or ''
+        self.body = body or ''
+        # Blast-level placeholder name -> expected Python type
+        self.variables = variables or {}
+
+        self.placeholders = set(PLACEHOLDER_PATTERN.findall(self.title)) | set(PLACEHOLDER_PATTERN.findall(self.body))
+        self.user_fields = sorted(self.placeholders & USER_FIELDS.keys())
+
+    @property
+    def is_personalized(self) -> bool:
+        return bool(self.user_fields)
+
+    def validate(self, context: dict = None) -> dict:
+        """Check blast-level values against the declared types; raises ``ValueError``."""
+
+        context = context or {}
+        missing = sorted(self.placeholders - USER_FIELDS.keys() - context.keys())
+        if missing:
+            raise ValueError(f"Missing notification template values: {', '.join(missing)}")
+
+        for name, value in context.items():
+            expected = self.variables.get(name)
+            if expected is not None and not isinstance(value, expected):
+                raise ValueError(
+                    f"Notification template value '{name}' must be {expected.__name__}, got {type(value).__name__}"
+                )
+        return context
+
+    def render(self, context: dict = None, user: dict = None) -> tuple:
+        """Return ``(title, body)``; ``user`` maps ``USER_FIELDS`` names to values."""
+
+        values = dict(context or {})
+        values.update(user or {})
+
+        def substitute(match):
+            # Single pass: substituted values are never scanned for placeholders
+            value = values.get(match.group(1))
+            return match.group(0) if value is None else str(value)
+
+        return PLACEHOLDER_PATTERN.sub(substitute, self.title), PLACEHOLDER_PATTERN.sub(substitute, self.body)
@@ -0,0 +1,286 @@
+"""
+Monthly range partitions for the high-volume event tables (PostgreSQL only).
+
+``View`` and ``Notification`` grow by the month and are read by recent
+``created_at`` ranges, so on PostgreSQL they are declaratively partitioned
+by ``created_at``, one partition per calendar month (UTC bounds). The ORM is
+unaware of it and keeps reading and writing the parent table.
+
+Converting an existing table is a one-off (``partition_event_tables
+--convert``) split so that no step holds a long lock:
+
+1. with normal traffic running, concurrently build the ``(id, created_at)``
+   unique index the parent's primary key needs (PostgreSQL requires the
+   partition key in every unique index; the models already declare ``uid``
+   unique per ``(uid, created_at)``) and validate a ``created_at < cutover``
+   check, the cutover being two months ahead;
+2. in one short transaction, rename the table to ``<table>_legacy``, create
+   the partitioned parent under the old name with the legacy indexes and
+   foreign keys, and attach the legacy table as the partition of everything
+   before the cutover. The validated check and the prebuilt indexes let the
+   attach skip its scans.
+
+``ensure_partitions`` (beat, daily) then keeps ``PARTITION_MONTHS_AHEAD``
+months of partitions created ahead of the inserts. Each table also has a
+DEFAULT partition, so a row outside every month (a skewed clock, or the beat
+being down for months) is stored instead of failing the insert. Rows found
+there are logged as errors, and moved into their monthly partition when it
+is created.
+
+Notes for later migrations on these tables: unique constraints must
+include ``created_at``, and new indexes must use a plain ``AddIndex`` since
+PostgreSQL cannot build them concurrently on a parent.
+"""
+from datetime import datetime, timezone as dt_timezone
+import logging
+import re
+
+from django.db import connection, transaction
+
+from apps.analytics.models import Notification
+from apps.streaming.models import View
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_MODELS = (View, Notification)
+PARTITION_MONTHS_AHEAD = 3
+# Months between the conversion and the first monthly partition
+CONVERSION_CUTOVER_MONTHS = 2
+LOCK_TIMEOUT = '5s'
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def _month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f'{table}_p{month:%Y_%m}'
+
+
+def default_partition_name(table: str) -> str:
+    return f'{table}_default'
+
+
+def _q(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def _bound(moment: datetime) -> str:
+    # Partition bounds and DDL take literals, not bind parameters
+    return f"'{moment.isoformat()}'"
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def _covered_until(cursor, table: str):
+    """Upper bound of the newest partition of ``table`` (None without partitions)."""
+
+    cursor.execute(
+        "SELECT pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(%s)",
+        [table],
+    )
+    bounds = []
+    for (expression,) in cursor.fetchall():
+        match = _UPPER_BOUND.search(expression or '')
+        if match:
+            bounds.append(datetime.fromisoformat(match.group(1)))
+    return max(bounds) if bounds else None
+
+
+def _create_default_partition(cursor, table: str) -> None:
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {_q(default_partition_name(table))} PARTITION OF {_q(table)} DEFAULT")
+
+
+def _attach_from_default(cursor, table: str, name: str, month: datetime, upper: datetime) -> int:
+    """Create partition ``name`` with the rows of its month moved out of the default partition."""
+
+    default = default_partition_name(table)
+    cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    cursor.execute(f"CREATE TABLE {_q(name)} (LIKE {_q(table)} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {_q(default)} WHERE created_at >= %s AND created_at < %s RETURNING *) "
+        f"INSERT INTO {_q(name)} SELECT * FROM moved",
+        [month, upper],
+    )
+    moved = cursor.rowcount
+    cursor.execute(
+        f"ALTER TABLE {_q(table)} ATTACH PARTITION {_q(name)} FOR VALUES FROM ({_bound(month)}) TO ({_bound(upper)})"
+    )
+    return moved
+
+
+def _create_partitions(cursor, table: str, until: datetime) -> list:
+    created = []
+    default = default_partition_name(table)
+    month = _covered_until(cursor, table) or _month_start(datetime.now(dt_timezone.utc))
+    while month < until:
+        upper = _add_months(month, 1)
+        name = partition_name(table, month)
+        cursor.execute(
+            f"SELECT 1 FROM {_q(default)} WHERE created_at >= %s AND created_at < %s LIMIT 1", [month, upper]
+        )
+        if cursor.fetchone():
+            # A new range partition cannot overlap rows already in the default one
+            with transaction.atomic():
+                moved = _attach_from_default(cursor, table, name, month, upper)
+            logger.warning(f"Moved {moved} rows from {default} into {name}")
+        else:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {_q(name)} PARTITION OF {_q(table)} "
+                f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(upper)})"
+            )
+        created.append(name)
+        month = upper
+    return created
+
+
+def _check_default_partition(cursor, table: str) -> None:
+    default = default_partition_name(table)
+    cursor.execute(f"SELECT COUNT(*), MIN(created_at), MAX(created_at) FROM {_q(default)}")
+    rows, earliest, latest = cursor.fetchone()
+    if rows:
+        logger.error(
+            f"{rows} {table} rows outside the monthly partitions are in {default} "
+            f"(created_at {earliest} to {latest})"
+        )
+
+
+def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> list:
+    """
+    Create the monthly partitions up to ``months_ahead`` months out, and the
+    default partitions; returns the new monthly partition names. Rows left in
+    a default partition are logged as errors.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    until = _add_months(_month_start(datetime.now(dt_timezone.utc)), months_ahead + 1)
+    created = []
+    with connection.cursor() as cursor:
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            if is_partitioned(cursor, table):
+                _create_default_partition(cursor, table)
+                created += _create_partitions(cursor, table, until)
+                _check_default_partition(cursor, table)
+    if created:
+        logger.info(f"Created event partitions: {', '.join(created)}")
+    return created
+
+
+def _prepare(cursor, table: str, cutover: datetime) -> None:
+    """Step 1: concurrent index build and check validation, outside any transaction."""
+
+    check = f'{table}_partition_cutover'
+    cursor.execute(
+        "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s", [table, check]
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(
+            f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(check)} CHECK (created_at < {_bound(cutover)}) NOT VALID"
+        )
+    cursor.execute(f"ALTER TABLE {_q(table)} VALIDATE CONSTRAINT {_q(check)}")
+    cursor.execute(
+        f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {_q(table + '_legacy_id_created')} "
+        f"ON {_q(table)} (id, created_at)"
+    )
+
+
+def _swap(cursor, table: str, cutover: datetime) -> None:
+    """Step 2: replace ``table`` by a partitioned parent with the old table attached."""
+
+    legacy = f'{table}_legacy'
+    cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    cursor.execute(f"LOCK TABLE {_q(table)} IN ACCESS EXCLUSIVE MODE")
+
+    cursor.execute("SELECT 1 FROM pg_constraint WHERE contype = 'f' AND confrelid = to_regclass(%s)", [table])
+    if cursor.fetchone():
+        raise RuntimeError(f'{table} is referenced by foreign keys and cannot be partitioned')
+
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_q(table)}")
+    next_id = cursor.fetchone()[0] + 1
+    cursor.execute(
+        "SELECT attidentity FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = 'id'", [table]
+    )
+    identity = cursor.fetchone()[0]
+
+    # Constraint-backed indexes are relations, so free the names for the parent
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u')", [table]
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {_q(table)} RENAME CONSTRAINT {_q(name)} TO {_q(name[:56] + '_legacy')}")
+    cursor.execute(f"ALTER TABLE {_q(table)} RENAME TO {_q(legacy)}")
+    if identity:
+        cursor.execute(f"ALTER TABLE {_q(legacy)} ALTER COLUMN id DROP IDENTITY")
+    else:
+        cursor.execute(f"ALTER TABLE {_q(legacy)} ALTER COLUMN id DROP DEFAULT")
+
+    sequence = f'{table}_id_seq'
+    cursor.execute(f"DROP SEQUENCE IF EXISTS {_q(sequence)}")
+    cursor.execute(f"CREATE TABLE {_q(table)} (LIKE {_q(legacy)} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    cursor.execute(f"CREATE SEQUENCE {_q(sequence)} OWNED BY {_q(table)}.id START WITH {int(next_id)}")
+    cursor.execute(f"ALTER TABLE {_q(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+    cursor.execute(f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(table + '_pkey')} PRIMARY KEY (id, created_at)")
+    cursor.execute(f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(table + '_uid_created_key')} UNIQUE (uid, created_at)")
+
+    # Non-unique indexes: created on the parent only, then backed by the legacy ones
+    cursor.execute(
+        "SELECT index.relname, pg_get_indexdef(pg_index.indexrelid) FROM pg_index "
+        "JOIN pg_class index ON index.oid = pg_index.indexrelid "
+        "WHERE pg_index.indrelid = to_regclass(%s) AND NOT pg_index.indisunique",
+        [legacy],
+    )
+    for name, definition in cursor.fetchall():
+        renamed = name[:56] + '_legacy'
+        cursor.execute(f"ALTER INDEX {_q(name)} RENAME TO {_q(renamed)}")
+        cursor.execute(f"CREATE INDEX {_q(name)} ON ONLY {_q(table)} USING {definition.split(' USING ', 1)[1]}")
+        cursor.execute(f"ALTER INDEX {_q(name)} ATTACH PARTITION {_q(renamed)}")
+
+    # Foreign keys match the legacy ones, so attaching reuses them without validation
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [legacy],
+    )
+    for name, definition in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(name)} {definition}")
+
+    cursor.execute(
+        f"ALTER TABLE {_q(table)} ATTACH PARTITION {_q(legacy)} FOR VALUES FROM (MINVALUE) TO ({_bound(cutover)})"
+    )
+    cursor.execute(f"ALTER TABLE {_q(legacy)} DROP CONSTRAINT {_q(table + '_partition_cutover')}")
+    _create_default_partition(cursor, table)
+
+
+def convert_to_partitioned(months_ahead: int = PARTITION_MONTHS_AHEAD) -> list:
+    """One-off conversion of the event tables (see module docstring); returns the converted tables."""
+
+    if connection.vendor != 'postgresql':
+        return []
+    cutover = _add_months(_month_start(datetime.now(dt_timezone.utc)), CONVERSION_CUTOVER_MONTHS)
+    converted = []
+    for model in PARTITIONED_MODELS:
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if is_partitioned(cursor, table):
+                continue
+            _prepare(cursor, table, cutover)
+        with transaction.atomic(), connection.cursor() as cursor:
+            _swap(cursor, table, cutover)
+        converted.append(table)
+        logger.info(f"Partitioned {table} by month (legacy rows before {cutover:%Y-%m-%d})")
+    ensure_partitions(months_ahead)
+    return converted
@@ -0,0 +1,351 @@
+"""
+Push notification fan-out.
+
+A blast is split into shards of consecutive audience user ids. Each shard
+streams its device tokens, sends them to FCM in batches of ``FCM_BATCH_SIZE``
+and bulk-inserts the inbox rows, so the work per shard is a constant number
+of queries and ``tokens / 500`` HTTP calls.
+
+Per-token results feed back into the device table: tokens FCM reports as
+unregistered/invalid deactivate their devices so later blasts skip them.
+"""
+import logging
+import random
+import time
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.analytics.models import BroadcastNotification, Notification, NotificationBlast
+from apps.analytics.services.fcm import (
+    DEAD_TOKEN_ERRORS,
+    FCM_BATCH_SIZE,
+    RETRYABLE_ERRORS,
+    classify_error,
+    get_fcm_client,
+    retry_after_seconds,
+)
+from apps.analytics.services.notification_templates import USER_FIELDS, NotificationTemplate
+from apps.analytics.services.unread_counts import increment_unread, record_broadcast
+from apps.analytics.socket.utils import send_broadcast_notification, send_user_notifications
+from apps.authentication.models import Devices, Role, User
+
+logger = logging.getLogger(__name__)
+
+# Audience users handled by one sub-task
+USERS_PER_SHARD = 2000
+
+NOTIFICATION_INSERT_BATCH = 1000
+
+# Quota/unavailable retries within a shard: 1s, 2s, 4s (+ jitter, capped)
+MAX_SEND_ATTEMPTS = 4
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 30.0
+
+
+class UserGroupTypes:
+    ALL = "all"
+    CLIENTS = "clients"
+    ADMINS = "admins"
+    # Followers of a category: "category:<id>", see category_followers()
+    CATEGORY_FOLLOWERS = "category:"
+
+
+def category_followers(category_id: int) -> str:
+    """Audience target for the followers of a category."""
+    return f"{UserGroupTypes.CATEGORY_FOLLOWERS}{category_id}"
+
+
+def followed_category_id(target: str):
+    if target.startswith(UserGroupTypes.CATEGORY_FOLLOWERS):
+        return int(target[len(UserGroupTypes.CATEGORY_FOLLOWERS):])
+    return None
+
+
+class NotificationTypes:
+    NEW_VIDEO = "new_video"
+    COMMENT_REPLY = "comment_reply"
+
+
+def get_audience(target: str) -> QuerySet[User]:
+    if target == UserGroupTypes.ALL:
+        return User.objects.all()
+    elif target == UserGroupTypes.CLIENTS:
+        return User.objects.with_role(Role.ROLES.USER)
+    elif target == UserGroupTypes.ADMINS:
+        return User.objects.with_role(Role.ROLES.ADMIN)
+    elif followed_category_id(target) is not None:
+        return User.objects.filter(profile__followed_categories=followed_category_id(target))
+    else:
+        return User.objects.none()
+
+
+NOTIFICATION_TEMPLATES = {
+    NotificationTypes.NEW_VIDEO: NotificationTemplate(
+        title="--category-- | --video_title--",
+        body="We have a new --category-- video uploaded",
+        variables={'category': str, 'video_title': str},
+    ),
+    NotificationTypes.COMMENT_REPLY: NotificationTemplate(
+        title="You have a new comment reply",
+        body="--replier-- replied to your comment",
+        variables={'replier': str},
+    ),
+}
+
+
+def get_template(notification_type: str, title: str = None, message: str = None) -> NotificationTemplate:
+    """Registered template for the type, with an explicit title/message taking precedence."""
+
+    base = NOTIFICATION_TEMPLATES.get(notification_type)
+    return NotificationTemplate(
+        title=title or (base.title if base else ''),
+        body=message or (base.body if base else ''),
+        variables=base.variables if base else None,
+    )
+
+
+def inbox_type_for(notification_type: str) -> str:
+    if notification_type == NotificationTypes.NEW_VIDEO:
+        return Notification.NOTIFICATION_TYPES.VIDEO
+    return Notification.NOTIFICATION_TYPES.PROMO
+
+
+def iter_audience_shards(target: str, shard_size: int = None):
+    """Yield ``(first_user_id, last_user_id)`` ranges covering the audience."""
+
+    shard_size = shard_size or USERS_PER_SHARD
+    user_ids = (
+        get_audience(target)
+        .order_by('id')
+        .values_list('id', flat=True)
+        .distinct()
+        .iterator(chunk_size=shard_size)
+    )
+    first_id = last_id = None
+    count = 0
+    for user_id in user_ids:
+        if first_id is None:
+            first_id = user_id
+        last_id = user_id
+        count += 1
+        if count == shard_size:
+            yield first_id, last_id
+            first_id = None
+            count = 0
+    if first_id is not None:
+        yield first_id, last_id
+
+
+def store_inbox_rows(users, notification_type: str, user_columns: list, render) -> int:
+    """Bulk-insert one Notification per user in chunks; returns rows written."""
+
+    inbox_type = inbox_type_for(notification_type)
+    notified = 0
+    pending = []
+    rows = users.values_list('id', *user_columns).distinct().iterator(chunk_size=NOTIFICATION_INSERT_BATCH)
+    for user_id, *user_values in rows:
+        user_title, user_body = render(user_values)
+        pending.append(Notification(user_id=user_id, title=user_title, message=user_body, type=inbox_type))
+        if len(pending) == NOTIFICATION_INSERT_BATCH:
+            Notification.objects.bulk_create(pending)
+            increment_unread([notification.user_id for notification in pending])
+            send_user_notifications(pending)
+            notified += len(pending)
+            pending = []
+    if pending:
+        Notification.objects.bulk_create(pending)
+        increment_unread([notification.user_id for notification in pending])
+        send_user_notifications(pending)
+        notified += len(pending)
+    return notified
+
+
+def deliver_shard(target: str, notification_type: str, title: str, message: str, metadata: dict,
+                  first_user_id: int, last_user_id: int, client=None, context: dict = None,
+                  push: bool = True, store: bool = True) -> dict:
+    """
+    Deliver one shard of a blast: write its per-user inbox rows (``store``)
+    and send it to the shard's devices (``push``). Returns its delivery stats.
+    """
+
+    client = client or get_fcm_client()
+    template = get_template(notification_type, title, message)
+    personalized = template.is_personalized
+    user_columns = [USER_FIELDS[name] for name in template.user_fields]
+    users = get_audience(target).filter(id__gte=first_user_id, id__lte=last_user_id)
+
+    # Rendered once for the whole shard unless the template has per-user placeholders
+    shared_title, shared_body = template.render(context)
+
+    def render(user_values) -> tuple:
+        if not personalized:
+            return shared_title, shared_body
+        return template.render(context, dict(zip(template.user_fields, user_values)))
+
+    # Per-user inbox rows, only for personalized blasts (shared ones are a BroadcastNotification)
+    notified = store_inbox_rows(users, notification_type, user_columns, render) if store else 0
+
+    stats = new_delivery_stats()
+    stats['notified'] = notified
+    if not push:
+        return stats
+
+    # Device tokens, streamed and sent FCM_BATCH_SIZE at a time
+    tokens = (
+        User.devices.through.objects
+        .filter(user__in=users, devices__is_active=True)
+        .exclude(devices__fcm_token='')
+        .values_list('devices_id', 'devices__fcm_token', *[f'user__{column}' for column in user_columns])
+        .order_by('devices_id')
+        .iterator(chunk_size=FCM_BATCH_SIZE)
+    )
+    token_devices = {}
+    batch = []
+
+    for device_id, token, *user_values in tokens:
+        if not token:
+            continue
+        if token in token_devices:
+            token_devices[token].append(device_id)
+            continue
+        token_devices[token] = [device_id]
+        batch.append((token, *render(user_values)) if personalized else token)
+        if len(batch) == FCM_BATCH_SIZE:
+            send_batch(client, batch, shared_title, shared_body, metadata, personalized, token_devices, stats)
+            batch = []
+    if batch:
+        send_batch(client, batch, shared_title, shared_body, metadata, personalized, token_devices, stats)
+
+    logger.info(
+        f"Push shard {first_user_id}-{last_user_id}: sent {stats['sent']}, failed {stats['failed']}, "
+        f"deactivated {stats['deactivated']}, notified {notified}"
+    )
+    return stats
+
+
+def new_delivery_stats() -> dict:
+    return {'sent': 0, 'failed': 0, 'retried': 0, 'deactivated': 0, 'notified': 0, 'errors': {}}
+
+
+def retry_delay(attempt: int, errors: list) -> float:
+    """Exponential backoff with jitter, never shorter than FCM's Retry-After."""
+
+    delay = min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+    delay += random.uniform(0, RETRY_BASE_DELAY_SECONDS)
+    hinted = [seconds for seconds in map(retry_after_seconds, errors) if seconds is not None]
+    return max([delay] + hinted)
+
+
+def deactivate_devices(device_ids: list) -> int:
+    """Mark devices whose tokens FCM reported dead as inactive, in one UPDATE."""
+
+    if not device_ids:
+        return 0
+    return Devices.objects.filter(id__in=device_ids, is_active=True).update(is_active=False)
+
+
+def send_batch(client, batch: list, title: str, message: str, metadata: dict, personalized: bool,
+               token_devices: dict, stats: dict) -> None:
+    """
+    Send one batch, classifying every per-token result into ``stats``.
+
+    Dead tokens deactivate their devices; quota/unavailable failures are retried
+    with backoff up to ``MAX_SEND_ATTEMPTS`` times.
+    """
+
+    pending = batch
+    for attempt in range(MAX_SEND_ATTEMPTS):
+        try:
+            if personalized:
+                response = client.send_each(pending, data=metadata)
+            else:
+                response = client.send_multicast(pending, title, message, data=metadata)
+            results = [(item, None if result.success else result.exception)
+                       for item, result in zip(pending, response.responses)]
+        except Exception as e:
+            # The whole request failed (network, auth, throttling)
+            logger.warning(f"FCM batch request failed: {e}")
+            results = [(item, e) for item in pending]
+
+        retry = []
+        retry_errors = []
+        dead_devices = []
+        final_attempt = attempt + 1 == MAX_SEND_ATTEMPTS
+        for item, error in results:
+            if error is None:
+                stats['sent'] += 1
+                continue
+            kind = classify_error(error)
+            stats['errors'][kind] = stats['errors'].get(kind, 0) + 1
+            token = item[0] if personalized else item
+            if kind in DEAD_TOKEN_ERRORS:
+                dead_devices.extend(token_devices.get(token, []))
+                stats['failed'] += 1
+            elif kind in RETRYABLE_ERRORS and not final_attempt:
+                retry.append(item)
+                retry_errors.append(error)
+            else:
+                stats['failed'] += 1
+
+        stats['deactivated'] += deactivate_devices(dead_devices)
+        if not retry:
+            return
+        stats['retried'] += len(retry)
+        time.sleep(retry_delay(attempt, retry_errors))
+        pending = retry
+
+
+def merge_delivery_stats(results: list) -> dict:
+    totals = new_delivery_stats()
+    for result in results:
+        for key in ('sent', 'failed', 'retried', 'deactivated', 'notified'):
+            totals[key] += result.get(key, 0)
+        for kind, count in result.get('errors', {}).items():
+            totals['errors'][kind] = totals['errors'].get(kind, 0) + count
+    return totals
+
+
+def start_blast(target: str, notification_type: str, template: NotificationTemplate, context: dict = None,
+                topic: str = None) -> NotificationBlast:
+    return NotificationBlast.objects.create(
+        target=target,
+        notification_type=notification_type,
+        title=template.render(context)[0][:255],
+        topic=topic or '',
+    )
+
+
+def create_broadcast(target: str, notification_type: str, template: NotificationTemplate, context: dict = None,
+                     blast: NotificationBlast = None) -> BroadcastNotification:
+    """Store a non-personalized blast once for its whole audience."""
+
+    title, body = template.render(context)
+    broadcast = BroadcastNotification.objects.create(
+        audience=target,
+        title=title[:255],
+        message=body,
+        type=inbox_type_for(notification_type),
+        blast=blast,
+    )
+    record_broadcast(target)
+    send_broadcast_notification(broadcast)
+    return broadcast
+
+
+def complete_blast(blast_id: int, results: list, topic_stats: dict = None) -> dict:
+    """Store the merged shard (and topic send) stats on the blast row."""
+
+    totals = merge_delivery_stats(results + ([topic_stats] if topic_stats else []))
+    NotificationBlast.objects.filter(id=blast_id).update(
+        status=NotificationBlast.BLAST_STATUS.COMPLETED,
+        shards=len(results),
+        notified_count=totals['notified'],
+        sent_count=totals['sent'],
+        failed_count=totals['failed'],
+        retried_count=totals['retried'],
+        deactivated_count=totals['deactivated'],
+        error_counts=totals['errors'],
+        completed_at=timezone.now(),
+    )
+    return totals
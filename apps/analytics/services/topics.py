@@ -0,0 +1,221 @@
+"""
+FCM topic subscriptions per audience segment.
+
+Devices are subscribed when they register (``refresh``/``login_google``) and
+when their user follows a category, so a segment broadcast is a single topic
+send instead of a per-user fan-out.
+
+Membership is per token, so it is also taken away:
+
+* a replaced token leaves its topics when the device registers the new one;
+* a token registered by another user leaves the topics only its previous
+  users had;
+* role changes move the users' devices in or out of ``clients``.
+"""
+import logging
+import time
+
+from apps.analytics.services.fcm import FCM_TOPIC_BATCH_SIZE, RETRYABLE_ERRORS, classify_error, get_fcm_client
+from apps.analytics.services.push_notifications import (
+    MAX_SEND_ATTEMPTS,
+    UserGroupTypes,
+    deactivate_devices,
+    followed_category_id,
+    new_delivery_stats,
+    retry_delay,
+)
+from apps.authentication.models import Devices, Role, User, role_names
+
+logger = logging.getLogger(__name__)
+
+TOPIC_ALL = "all"
+TOPIC_CLIENTS = "clients"
+
+# Instance-ID API reasons meaning the token is gone for good
+DEAD_TOKEN_REASONS = {"NOT_FOUND", "INVALID_ARGUMENT"}
+
+
+def category_topic(category_id: int) -> str:
+    return f"category-{category_id}"
+
+
+def segment_topic(target: str):
+    """Topic covering an audience target, or None when it must be fanned out per token."""
+
+    if target == UserGroupTypes.ALL:
+        return TOPIC_ALL
+    if target == UserGroupTypes.CLIENTS:
+        return TOPIC_CLIENTS
+    category_id = followed_category_id(target)
+    if category_id is not None:
+        return category_topic(category_id)
+    return None
+
+
+def send_topic_broadcast(topic: str, title: str, body: str, data: dict = None, client=None) -> dict:
+    """One FCM message for the whole segment, retried on quota/unavailable errors."""
+
+    client = client or get_fcm_client()
+    stats = new_delivery_stats()
+    for attempt in range(MAX_SEND_ATTEMPTS):
+        try:
+            message_id = client.send_to_topic(topic, title, body, data=data)
+        except Exception as e:
+            kind = classify_error(e)
+            stats['errors'][kind] = stats['errors'].get(kind, 0) + 1
+            if kind in RETRYABLE_ERRORS and attempt + 1 < MAX_SEND_ATTEMPTS:
+                stats['retried'] += 1
+                time.sleep(retry_delay(attempt, [e]))
+                continue
+            logger.error(f"Topic '{topic}' broadcast failed: {e}")
+            stats['failed'] += 1
+            return stats
+
+        logger.info(f"Topic '{topic}' broadcast sent: {message_id}")
+        stats['sent'] += 1
+        return stats
+    return stats
+
+
+def user_topics(user: User) -> list:
+    """Every topic the user's devices should be subscribed to."""
+
+    topics = [TOPIC_ALL]
+    if Role.ROLES.USER in role_names(user.role_mask):
+        topics.append(TOPIC_CLIENTS)
+    if user.profile_id:
+        topics.extend(
+            category_topic(category_id)
+            for category_id in user.profile.followed_categories.values_list('id', flat=True)
+        )
+    return topics
+
+
+def _change_subscription(tokens_by_device: dict, topic: str, subscribe: bool, client=None,
+                         deactivate_dead: bool = True) -> int:
+    """(Un)subscribe tokens in batches; dead tokens deactivate their devices. Returns successes."""
+
+    client = client or get_fcm_client()
+    items = list(tokens_by_device.items())
+    succeeded = 0
+    for start in range(0, len(items), FCM_TOPIC_BATCH_SIZE):
+        batch = items[start:start + FCM_TOPIC_BATCH_SIZE]
+        tokens = [token for _, token in batch]
+        if subscribe:
+            response = client.subscribe_to_topic(tokens, topic)
+        else:
+            response = client.unsubscribe_from_topic(tokens, topic)
+        succeeded += response.success_count
+
+        if deactivate_dead:
+            dead_devices = [batch[error.index][0] for error in response.errors if error.reason in DEAD_TOKEN_REASONS]
+            deactivate_devices(dead_devices)
+        if response.failure_count:
+            logger.warning(f"Topic '{topic}': {response.failure_count} of {len(tokens)} tokens failed")
+    return succeeded
+
+
+def _active_tokens(devices) -> dict:
+    return dict(
+        devices
+        .filter(is_active=True)
+        .exclude(fcm_token='')
+        .values_list('id', 'fcm_token')
+    )
+
+
+def _users_topics(users) -> list:
+    topics = []
+    for user in users.select_related('profile'):
+        topics.extend(topic for topic in user_topics(user) if topic not in topics)
+    return topics
+
+
+def subscribe_device(device: Devices, previous_token: str = '', previous_user_ids=(), client=None) -> list:
+    """
+    Subscribe a freshly registered device to the topics of its users. The
+    token it replaced leaves those topics, and a token taken over from
+    ``previous_user_ids`` leaves the topics only they had. Returns the topics.
+    """
+    topics = _users_topics(device.users.all())
+    tokens = _active_tokens(Devices.objects.filter(id=device.id))
+
+    if previous_token and previous_token != device.fcm_token:
+        # The old token is usually dead already; its failures must not deactivate this device
+        for topic in topics:
+            _change_subscription({device.id: previous_token}, topic, subscribe=False, client=client,
+                                 deactivate_dead=False)
+    if tokens and previous_user_ids:
+        stale = [topic for topic in _users_topics(User.objects.filter(id__in=previous_user_ids)) if topic not in topics]
+        for topic in stale:
+            _change_subscription(tokens, topic, subscribe=False, client=client)
+    if not tokens:
+        return []
+
+    for topic in topics:
+        _change_subscription(tokens, topic, subscribe=True, client=client)
+    return topics
+
+
+def sync_client_topic(user_ids, client=None) -> int:
+    """Role change: move the users' devices in or out of ``clients``; a device stays while any owner is a client."""
+
+    memberships = User.devices.through.objects.filter(devices__is_active=True).exclude(devices__fcm_token='')
+    tokens = dict(
+        memberships.filter(user_id__in=user_ids).values_list('devices_id', 'devices__fcm_token').distinct()
+    )
+    if not tokens:
+        return 0
+
+    client_devices = set(
+        memberships
+        .filter(devices_id__in=list(tokens), user__in=User.objects.with_role(Role.ROLES.USER))
+        .values_list('devices_id', flat=True)
+    )
+    joined = {device_id: token for device_id, token in tokens.items() if device_id in client_devices}
+    left = {device_id: token for device_id, token in tokens.items() if device_id not in client_devices}
+    if joined:
+        _change_subscription(joined, TOPIC_CLIENTS, subscribe=True, client=client)
+    if left:
+        _change_subscription(left, TOPIC_CLIENTS, subscribe=False, client=client)
+    return len(tokens)
+
+
+def set_category_subscription(user: User, category_id: int, subscribe: bool, client=None) -> int:
+    """Follow/unfollow: move all of the user's active devices in or out of the category topic."""
+
+    tokens = _active_tokens(user.devices.all())
+    if not tokens:
+        return 0
+    return _change_subscription(tokens, category_topic(category_id), subscribe, client=client)
+
+
+def sync_all_subscriptions(client=None) -> int:
+    """Backfill: subscribe every active device to its users' topics. Returns devices processed."""
+
+    clients = set(User.objects.with_role(Role.ROLES.USER).values_list('id', flat=True))
+    followed = {}
+    follows = User.objects.filter(profile__followed_categories__isnull=False).values_list('id', 'profile__followed_categories')
+    for user_id, category_id in follows.iterator(chunk_size=5000):
+        followed.setdefault(user_id, []).append(category_id)
+
+    topic_tokens = {}
+    devices = (
+        User.devices.through.objects
+        .filter(devices__is_active=True)
+        .exclude(devices__fcm_token='')
+        .values_list('user_id', 'devices_id', 'devices__fcm_token')
+    )
+    processed = set()
+    for user_id, device_id, token in devices.iterator(chunk_size=5000):
+        processed.add(device_id)
+        topics = [TOPIC_ALL]
+        if user_id in clients:
+            topics.append(TOPIC_CLIENTS)
+        topics.extend(category_topic(category_id) for category_id in followed.get(user_id, []))
+        for topic in topics:
+            topic_tokens.setdefault(topic, {})[device_id] = token
+
+    for topic, tokens in topic_tokens.items():
+        _change_subscription(tokens, topic, subscribe=True, client=client)
+    return len(processed)
@@ -0,0 +1,322 @@
+"""
+Notification transport.
+
+Owns the per-process Firebase app and persistent HTTP/2 connections to the
+FCM v1 API (one client per sending thread). A batch of messages is sent as
+concurrent streams over one connection instead of a thread and a fresh HTTP session per message, and every
+send is recorded in ``TransportMetrics`` (latency histogram, sends/s).
+
+``init_transport`` is connected to Celery's ``worker_process_init`` so each
+prefork child initializes after the fork; other processes initialize lazily
+on first send.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import bisect
+import logging
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FCM_SEND_URL = 'https://fcm.googleapis.com/v1/projects/{}/messages:send'
+
+# Streams in flight on the shared connection during one batch
+MAX_CONCURRENT_SENDS = 100
+HTTP_TIMEOUT_SECONDS = 10.0
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _firebase_credentials():
+    from firebase_admin import credentials
+
+    return credentials.Certificate({
+        "type": "service_account",
+        "project_id": settings.FIREBASE_PROJECT_ID,
+        "private_key_id": settings.FIREBASE_PRIVATE_KEY_ID,
+        "private_key": settings.FIREBASE_PRIVATE_KEY,
+        "client_email": settings.FIREBASE_CLIENT_EMAIL,
+        "client_id": settings.FIREBASE_CLIENT_ID,
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+        "client_x509_cert_url": f"https://www.googleapis.com/robot/v1/metadata/x509/{settings.FIREBASE_CLIENT_EMAIL.replace('@', '%40')}",
+    })
+
+
+def get_firebase_app():
+    """The process' default Firebase app, initialized on first use."""
+
+    import firebase_admin
+
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        return firebase_admin.initialize_app(_firebase_credentials())
+
+
+def _string_data(data: dict = None) -> dict:
+    # FCM requires all data values to be strings
+    return {k: str(v) for k, v in (data or {}).items()}
+
+
+def build_message(title: str, body: str, data: dict = None, token: str = None, topic: str = None) -> dict:
+    """FCM v1 ``message`` for one token or one topic."""
+
+    message = {
+        'notification': {'title': title, 'body': body},
+        'data': _string_data(data),
+    }
+    if token:
+        message['token'] = token
+    else:
+        message['topic'] = topic
+    return message
+
+
+def _error_from_response(response: httpx.Response) -> Exception:
+    """Map an FCM v1 error response to the matching firebase_admin exception."""
+
+    from firebase_admin import exceptions, messaging
+
+    try:
+        error = response.json().get('error', {})
+    except ValueError:
+        error = {}
+    message = error.get('message') or f'FCM request failed with HTTP {response.status_code}'
+
+    fcm_code = None
+    for detail in error.get('details', []):
+        if detail.get('@type', '').endswith('google.firebase.fcm.v1.FcmError'):
+            fcm_code = detail.get('errorCode')
+
+    fcm_errors = {
+        'UNREGISTERED': messaging.UnregisteredError,
+        'QUOTA_EXCEEDED': messaging.QuotaExceededError,
+        'SENDER_ID_MISMATCH': messaging.SenderIdMismatchError,
+        'THIRD_PARTY_AUTH_ERROR': messaging.ThirdPartyAuthError,
+    }
+    status_errors = {
+        'INVALID_ARGUMENT': exceptions.InvalidArgumentError,
+        'NOT_FOUND': exceptions.NotFoundError,
+        'RESOURCE_EXHAUSTED': exceptions.ResourceExhaustedError,
+        'UNAVAILABLE': exceptions.UnavailableError,
+        'INTERNAL': exceptions.InternalError,
+        'DEADLINE_EXCEEDED': exceptions.DeadlineExceededError,
+        'UNAUTHENTICATED': exceptions.UnauthenticatedError,
+        'PERMISSION_DENIED': exceptions.PermissionDeniedError,
+    }
+    error_type = fcm_errors.get(fcm_code) or status_errors.get(error.get('status'))
+    if error_type is None:
+        error_type = exceptions.UnavailableError if response.status_code >= 500 else exceptions.UnknownError
+    return error_type(message, http_response=response)
+
+
+class TransportMetrics:
+    """Per-process send counters and latency histogram."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.sent = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    def observe(self, latency_seconds: float, success: bool):
+        with self._lock:
+            self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_seconds * 1000)] += 1
+            if success:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def observe_batch(self, elapsed_seconds: float):
+        with self._lock:
+            self.busy_seconds += elapsed_seconds
+
+    def _percentile(self, fraction: float):
+        total = sum(self.buckets)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets):
+            seen += count
+            if seen >= fraction * total:
+                return bound
+        return None
+
+    def snapshot(self) -> dict:
+        """Counters, sends/s while sending, and the histogram (bucket upper bound in ms -> count)."""
+
+        with self._lock:
+            total = self.sent + self.failed
+            histogram = {str(bound): count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)}
+            histogram['+inf'] = self.buckets[-1]
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'sends_per_second': round(total / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+                'latency_ms': histogram,
+                'p50_ms': self._percentile(0.5),
+                'p95_ms': self._percentile(0.95),
+            }
+
+
+class NotificationTransport:
+    """
+    Firebase app plus HTTP/2 clients, reused for every send in the process.
+
+    An ``httpx.AsyncClient`` is bound to the event loop it runs on, so each
+    sending thread gets its own loop and client (one per process in prefork
+    workers). Sends from a thread whose loop is already running (async
+    callers) are handed to a dedicated sender thread.
+    """
+
+    def __init__(self):
+        self.metrics = TransportMetrics()
+        self.app = None
+        self._credential = None
+        self._url = None
+        self._local = threading.local()
+        # (loop, client) of every thread, closed together by close()
+        self._clients = []
+        self._generation = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Initialize Firebase (idempotent); clients are opened per thread on first send."""
+
+        with self._lock:
+            if self._url is not None:
+                return
+            self.app = get_firebase_app()
+            self._credential = self.app.credential.get_credential()
+            self._url = FCM_SEND_URL.format(self.app.project_id)
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+
+    def _thread_client(self) -> tuple:
+        """This thread's ``(loop, client)``, created on first use."""
+
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.loop = asyncio.new_event_loop()
+            local.client = self._new_client()
+            local.generation = self._generation
+            with self._lock:
+                self._clients.append((local.loop, local.client))
+        return local.loop, local.client
+
+    def _headers(self) -> dict:
+        if not self._credential.valid:
+            from google.auth.transport.requests import Request
+
+            self._credential.refresh(Request())
+        return {
+            'Authorization': f'Bearer {self._credential.token}',
+            'X-GOOG-API-FORMAT-VERSION': '2',
+        }
+
+    async def _send_one(self, client: httpx.AsyncClient, message: dict, headers: dict, semaphore: asyncio.Semaphore):
+        from firebase_admin import exceptions, messaging
+
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(self._url, json={'message': message}, headers=headers)
+            except httpx.HTTPError as e:
+                result = messaging.SendResponse(None, exceptions.UnavailableError(str(e), cause=e))
+            else:
+                if response.is_success:
+                    result = messaging.SendResponse(response.json(), None)
+                else:
+                    result = messaging.SendResponse(None, _error_from_response(response))
+            self.metrics.observe(time.perf_counter() - started, result.success)
+            return result
+
+    async def send_async(self, messages: list, client: httpx.AsyncClient):
+        """Coroutine sending ``messages`` concurrently over ``client``, which must belong to the running loop."""
+
+        from firebase_admin import messaging
+
+        headers = self._headers()
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+        responses = await asyncio.gather(*(self._send_one(client, message, headers, semaphore) for message in messages))
+        return messaging.BatchResponse(list(responses))
+
+    def _send_from_thread(self, messages: list):
+        loop, client = self._thread_client()
+        return loop.run_until_complete(self.send_async(messages, client))
+
+    def _sender_thread(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notification-transport')
+            return self._executor
+
+    def send(self, messages: list):
+        """Send a batch of FCM v1 messages; returns a ``messaging.BatchResponse`` in input order."""
+
+        self.start()
+        started = time.perf_counter()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            response = self._send_from_thread(messages)
+        else:
+            # This thread's loop is busy (async caller), run the batch on the sender thread
+            response = self._sender_thread().submit(self._send_from_thread, messages).result()
+        self.metrics.observe_batch(time.perf_counter() - started)
+        return response
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, []
+            executor, self._executor = self._executor, None
+            self._generation += 1
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for loop, client in clients:
+            try:
+                loop.run_until_complete(client.aclose())
+                loop.close()
+            except RuntimeError as e:
+                logger.warning(f"Could not close a notification transport client: {e}")
+
+
+_transport = None
+
+
+def get_transport() -> NotificationTransport:
+    global _transport
+    if _transport is None:
+        _transport = NotificationTransport()
+    return _transport
+
+
+def init_transport(**kwargs):
+    """``worker_process_init`` handler: fresh Firebase app and connection per worker process."""
+
+    global _transport
+    _transport = NotificationTransport()
+    try:
+        _transport.start()
+    except Exception as e:
+        # Leave it to the first send to retry rather than failing the worker boot
+        logger.error(f"Notification transport init failed: {e}")
+        return
+    logger.info("Notification transport initialized")
@@ -0,0 +1,194 @@
+"""
+Cached unread-notification counts for the inbox badge.
+
+Per user, Redis holds:
+
+* ``personal`` - unread ``Notification`` rows, incremented as inbox rows are
+  written and decremented as they are read or deleted;
+* ``broadcasts`` - ``{'count': unread, 'marks': {audience: sequence}}``, the
+  unread broadcasts when the entry was built plus the audience sequences at
+  that time. It is only written when rebuilt;
+* ``broadcasts:read`` - broadcasts read or hidden since that build, bumped
+  with an atomic ``incr`` so concurrent reads on two devices both count.
+
+Each audience has a sequence equal to the number of broadcasts ever sent to
+it (broadcasts are never deleted, so the database count can re-seed it). New
+broadcasts only bump their audience sequence, so a broadcast never writes
+per-user keys. The unread broadcast count is ``count`` plus the sequences'
+growth past ``marks`` minus ``read``.
+
+Missing entries are recomputed from the database on read, and
+``reconcile_unread_counts`` periodically corrects drift from races.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from apps.analytics.models import BroadcastNotification, Notification
+from apps.authentication.models import User
+from core.utils.cache import incr_existing
+
+logger = logging.getLogger(__name__)
+
+UNREAD_TIMEOUT = 60 * 60 * 24
+RECONCILE_CHUNK_SIZE = 1000
+
+
+def _personal_key(user_id: int) -> str:
+    return f"notifications:unread:{user_id}:personal"
+
+
+def _broadcast_key(user_id: int) -> str:
+    return f"notifications:unread:{user_id}:broadcasts"
+
+
+def _broadcast_read_key(user_id: int) -> str:
+    return f"notifications:unread:{user_id}:broadcasts:read"
+
+
+def _audience_key(audience: str) -> str:
+    return f"notifications:broadcasts:{audience}:sequence"
+
+
+def increment_unread(user_ids: list, delta: int = 1) -> None:
+    """New personal inbox rows for ``user_ids``."""
+
+    incr_existing([_personal_key(user_id) for user_id in user_ids], delta)
+
+
+def decrement_unread(user) -> None:
+    """One of the user's unread personal rows was read or deleted."""
+
+    try:
+        cache.decr(_personal_key(user.id))
+    except ValueError:
+        pass
+
+
+def record_broadcast(audience: str) -> None:
+    """A broadcast was stored for ``audience``."""
+
+    try:
+        cache.incr(_audience_key(audience))
+    except ValueError:
+        # Seeded from the database, this broadcast included, on the next read
+        pass
+
+
+def decrement_broadcast_unread(user) -> None:
+    """One of the user's unread broadcasts was read or hidden."""
+
+    try:
+        cache.incr(_broadcast_read_key(user.id))
+    except ValueError:
+        # No read counter to subtract from: rebuild the broadcast part on next read
+        cache.delete(_broadcast_key(user.id))
+
+
+def reset_unread(user) -> None:
+    """Everything in the user's inbox was read or cleared."""
+
+    cache.set(_personal_key(user.id), 0, timeout=UNREAD_TIMEOUT)
+    cache.delete_many([_broadcast_key(user.id), _broadcast_read_key(user.id)])
+
+
+def invalidate_unread(user) -> None:
+    """The user's audiences changed (follow/unfollow); rebuild the broadcast part on next read."""
+
+    cache.delete_many([_broadcast_key(user.id), _broadcast_read_key(user.id)])
+
+
+def _audience_sequences(audiences: list) -> dict:
+    keys = {_audience_key(audience): audience for audience in audiences}
+    cached = cache.get_many(list(keys))
+    sequences = {keys[key]: value for key, value in cached.items()}
+
+    missing = [audience for audience in audiences if audience not in sequences]
+    if missing:
+        counts = dict(
+            BroadcastNotification.objects
+            .filter(audience__in=missing)
+            .values('audience')
+            .annotate(count=Count('id'))
+            .values_list('audience', 'count')
+        )
+        for audience in missing:
+            sequences[audience] = counts.get(audience, 0)
+            cache.add(_audience_key(audience), sequences[audience], timeout=None)
+    return sequences
+
+
+def _personal_unread(user) -> int:
+    key = _personal_key(user.id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user=user, is_read=False).count()
+        cache.add(key, count, timeout=UNREAD_TIMEOUT)
+    return max(count, 0)
+
+
+def _broadcast_unread(user) -> int:
+    # selectors import push_notifications, which records counts through this module
+    from apps.analytics.selectors.notifications import get_broadcast_audiences, get_unread_broadcasts
+
+    key, read_key = _broadcast_key(user.id), _broadcast_read_key(user.id)
+    cached = cache.get_many([key, read_key])
+    state, read = cached.get(key), cached.get(read_key)
+
+    if state is not None and read is not None:
+        sequences = _audience_sequences(list(state['marks']))
+        count = state['count'] - read + sum(
+            max(sequences[audience] - mark, 0) for audience, mark in state['marks'].items()
+        )
+        return max(count, 0)
+
+    audiences = get_broadcast_audiences(user)
+    sequences = _audience_sequences(audiences)
+    count = get_unread_broadcasts(user, audiences).count()
+    cache.set_many({key: {'count': count, 'marks': sequences}, read_key: 0}, timeout=UNREAD_TIMEOUT)
+    return max(count, 0)
+
+
+def get_unread_count(user) -> dict:
+    personal = _personal_unread(user)
+    broadcasts = _broadcast_unread(user)
+    return {'personal': personal, 'broadcasts': broadcasts, 'total': personal + broadcasts}
+
+
+def reconcile_unread_counts(chunk_size: int = RECONCILE_CHUNK_SIZE) -> int:
+    """
+    Correct cached personal counts against the database and drop the cached
+    broadcast parts so they are rebuilt on next read. Returns counters fixed.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return fixed
+        last_id = user_ids[-1]
+
+        keys = {_personal_key(user_id): user_id for user_id in user_ids}
+        cached = cache.get_many(list(keys))
+        if cached:
+            actual = dict(
+                Notification.objects
+                .filter(user_id__in=[keys[key] for key in cached], is_read=False)
+                .values('user_id')
+                .annotate(count=Count('id'))
+                .values_list('user_id', 'count')
+            )
+            corrections = {
+                key: actual.get(keys[key], 0)
+                for key, value in cached.items()
+                if value != actual.get(keys[key], 0)
+            }
+            if corrections:
+                cache.set_many(corrections, timeout=UNREAD_TIMEOUT)
+                fixed += len(corrections)
+        cache.delete_many(
+            [_broadcast_key(user_id) for user_id in user_ids] + [_broadcast_read_key(user_id) for user_id in user_ids]
+        )
@@ -0,0 +1,52 @@
+"""
+Flag rollup days whose source rows changed after the day was rolled up, and
+keep the per-user ``ClientActivity`` totals in step with ``View``.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.analytics.services.client_activity import (
+    create_client_activity,
+    record_view,
+    refresh_client_activity,
+    remove_view,
+)
+from apps.analytics.services.rollups import mark_day_dirty
+from apps.authentication.models import User
+from apps.streaming.models import Comment, Like, View
+
+
+@receiver(post_save, sender=View)
+@receiver(post_delete, sender=View)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def flag_activity_day(sender, instance, **kwargs):
+    mark_day_dirty(instance.created_at)
+
+
+@receiver(post_save, sender=View)
+def update_client_activity(sender, instance, created, **kwargs):
+    if created:
+        record_view(instance)
+    else:
+        refresh_client_activity([instance.user_id])
+
+
+@receiver(post_delete, sender=View)
+def subtract_client_activity(sender, instance, **kwargs):
+    remove_view(instance)
+
+
+@receiver(post_save, sender=User)
+def flag_registration_day(sender, instance, created, **kwargs):
+    # Later saves (logins, profile edits) leave the registration counts as they are
+    if created:
+        mark_day_dirty(instance.date_joined)
+        create_client_activity(instance)
+
+
+@receiver(post_delete, sender=User)
+def flag_unregistration_day(sender, instance, **kwargs):
+    mark_day_dirty(instance.date_joined)
@@ -0,0 +1,111 @@
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from django.db import close_old_connections
+from apps.analytics.selectors.notifications import get_broadcast_audiences
+from apps.analytics.services.unread_counts import get_unread_count
+from apps.analytics.socket.utils import audience_group, user_group
+from core.utils.websocket import JWTQueryAuthMixin
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationConsumer(JWTQueryAuthMixin, AsyncWebsocketConsumer):
+    """
+    Per-user in-app notification stream.
+
+    Joins the user's own group (personal notifications, unread count changes)
+    and one group per broadcast audience the user belongs to.
+
+    The unread count is read once on connect and then kept on the socket: new
+    notifications carry an ``unread_delta``, so a broadcast to a large
+    audience does not re-query every connected client's count.
+    """
+
+    async def connect(self):
+        await database_sync_to_async(close_old_connections)()
+
+        # Authenticate user from query string token
+        user = await self.authenticate()
+        if not user:
+            await self.close(code=4001)
+            return
+
+        self.user = user
+        self.joined_groups = []
+        self.unread_count = 0
+
+        try:
+            await self._join_groups()
+            await self.accept()
+
+            await self.send(json.dumps({
+                "type": "connection",
+                "status": "connected",
+                "message": "Connected to notifications",
+                "unread_count": await self._refresh_unread_count(),
+            }))
+
+            logger.info(f"NotificationConsumer connected: {self.channel_name}, user: {self.user.username}")
+        except Exception as e:
+            logger.error(f"Error in NotificationConsumer connect: {str(e)}")
+            await database_sync_to_async(close_old_connections)()
+            raise
+
+    async def disconnect(self, close_code):
+        for group in getattr(self, 'joined_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await database_sync_to_async(close_old_connections)()
+        logger.info(f"NotificationConsumer disconnected: {self.channel_name}")
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """``{"action": "unread_count"}`` re-syncs the badge, e.g. when the app returns to foreground."""
+        try:
+            message = json.loads(text_data or '')
+        except json.JSONDecodeError:
+            await self.send(json.dumps({"type": "error", "message": "Invalid JSON format"}))
+            return
+
+        if isinstance(message, dict) and message.get("action") == "unread_count":
+            await self.send(json.dumps({"type": "unread_count", "unread_count": await self._refresh_unread_count()}))
+
+    async def _join_groups(self):
+        audiences = await database_sync_to_async(get_broadcast_audiences)(self.user)
+        groups = [user_group(self.user.id)] + [audience_group(audience) for audience in audiences]
+
+        for group in set(self.joined_groups) - set(groups):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in set(groups) - set(self.joined_groups):
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.joined_groups = groups
+
+    async def _refresh_unread_count(self) -> int:
+        counts = await database_sync_to_async(get_unread_count)(self.user)
+        self.unread_count = counts['total']
+        return self.unread_count
+
+    async def notification_new(self, event):
+        """Handle a new personal or broadcast notification from channel layer."""
+        self.unread_count += event.get("unread_delta", 1)
+        await self.send(text_data=json.dumps({
+            "type": "notification",
+            "notification": event.get("notification"),
+            "unread_count": self.unread_count,
+        }))
+
+    async def notification_unread(self, event):
+        """Handle unread count changes (read/delete on another device)."""
+        self.unread_count = event.get("unread_count")
+        await self.send(text_data=json.dumps({
+            "type": "unread_count",
+            "unread_count": self.unread_count,
+        }))
+
+    async def notification_audiences(self, event):
+        """Handle follow/unfollow: re-join the broadcast audience groups and re-sync the count."""
+        await self._join_groups()
+        await self.send(text_data=json.dumps({
+            "type": "unread_count",
+            "unread_count": await self._refresh_unread_count(),
+        }))
@@ -0,0 +1,122 @@
+"""
+Utility functions for pushing in-app notifications to connected WebSocket clients.
+
+Every client joins its user group and one group per broadcast audience (see
+``NotificationConsumer``), so a broadcast is a single ``group_send`` however
+large the audience is. New notifications carry an ``unread_delta`` that open
+sockets add to the count they read on connect.
+"""
+import re
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+import logging
+
+from apps.analytics.services.unread_counts import get_unread_count
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id: int) -> str:
+    return f"notifications_user_{user_id}"
+
+
+def audience_group(audience: str) -> str:
+    # Group names only allow ASCII letters, digits, hyphens, underscores and periods
+    return f"notifications_audience_{re.sub(r'[^A-Za-z0-9_.-]', '_', audience)}"
+
+
+def _inbox_payloads(rows: list) -> list:
+    # selectors import push_notifications, which pushes through this module
+    from apps.analytics.serializers.notification import InboxNotificationSerializer
+
+    return [dict(payload) for payload in InboxNotificationSerializer(rows, many=True).data]
+
+
+def send_user_notifications(notifications: list):
+    """
+    Push newly stored personal notifications to their users' open sockets.
+
+    Args:
+        notifications: Saved ``Notification`` instances
+    """
+    from apps.analytics.selectors.notifications import PERSONAL
+
+    if not notifications:
+        return
+    rows = [
+        {
+            'id': notification.id,
+            'title': notification.title,
+            'message': notification.message,
+            'type': notification.type,
+            'created_at': notification.created_at,
+            'target_video_slug': notification.target_video_slug,
+            'target_url': notification.target_url,
+            'kind': PERSONAL,
+            'read': False,
+        }
+        for notification in notifications
+    ]
+
+    async def _send_all(channel_layer, payloads):
+        for notification, payload in zip(notifications, payloads):
+            await channel_layer.group_send(
+                user_group(notification.user_id),
+                {"type": "notification.new", "notification": payload, "unread_delta": 1},
+            )
+
+    try:
+        async_to_sync(_send_all)(get_channel_layer(), _inbox_payloads(rows))
+    except Exception as e:
+        logger.warning(f"Could not push {len(notifications)} notifications to sockets: {str(e)}")
+
+
+def send_broadcast_notification(broadcast):
+    """
+    Push a stored broadcast to every open socket of its audience.
+
+    Args:
+        broadcast: Saved ``BroadcastNotification``
+    """
+    from apps.analytics.selectors.notifications import BROADCAST
+
+    row = {
+        'id': broadcast.id,
+        'title': broadcast.title,
+        'message': broadcast.message,
+        'type': broadcast.type,
+        'created_at': broadcast.created_at,
+        'target_video_slug': broadcast.target_video_slug,
+        'target_url': broadcast.target_url,
+        'kind': BROADCAST,
+        'read': False,
+    }
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            audience_group(broadcast.audience),
+            {"type": "notification.new", "notification": _inbox_payloads([row])[0], "unread_delta": 1},
+        )
+    except Exception as e:
+        logger.warning(f"Could not push broadcast {broadcast.id} to sockets: {str(e)}")
+
+
+def send_unread_count(user):
+    """Push the user's current unread count, e.g. after reading on another device."""
+
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            user_group(user.id),
+            {"type": "notification.unread", "unread_count": get_unread_count(user)['total']},
+        )
+    except Exception as e:
+        logger.warning(f"Could not push unread count to user {user.id}: {str(e)}")
+
+
+def send_audiences_changed(user):
+    """Tell the user's open sockets to re-join their broadcast audience groups."""
+
+    try:
+        async_to_sync(get_channel_layer().group_send)(user_group(user.id), {"type": "notification.audiences"})
+    except Exception as e:
+        logger.warning(f"Could not refresh socket audiences for user {user.id}: {str(e)}")
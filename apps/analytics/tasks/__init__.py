@@ -0,0 +1,10 @@
+from .notifications import (
+    reconcile_notification_unread_counts,
+    send_push_notification_shard,
+    subscribe_device_topics,
+    summarize_push_notification,
+    sync_client_topic_subscriptions,
+    update_category_topic,
+)
+from .partitions import roll_event_partitions
+from .rollups import reconcile_client_activities, refresh_analytics_rollups
@@ -0,0 +1,82 @@
+"""
+Celery tasks for push notification fan-out.
+"""
+import logging
+
+from celery.signals import worker_process_init
+
+from apps.analytics.services.push_notifications import complete_blast, deliver_shard
+from apps.analytics.services.topics import set_category_subscription, subscribe_device, sync_client_topic
+from apps.analytics.services.transport import get_transport, init_transport
+from apps.analytics.services.unread_counts import reconcile_unread_counts
+from apps.authentication.models import Devices, User
+from farajayangu_be.celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+# One Firebase app and HTTP/2 connection per worker process, opened after the fork
+worker_process_init.connect(init_transport)
+
+
+@celery_app.task(bind=True)
+def send_push_notification_shard(self, target: str, notification_type: str, title: str, message: str,
+                                 metadata: dict, first_user_id: int, last_user_id: int, context: dict = None,
+                                 push: bool = True, store: bool = True):
+    """Deliver one shard (a range of audience user ids) of a push blast."""
+    stats = deliver_shard(target, notification_type, title, message, metadata, first_user_id, last_user_id,
+                          context=context, push=push, store=store)
+    if push:
+        logger.info(f"Notification transport: {get_transport().metrics.snapshot()}")
+    return stats
+
+
+@celery_app.task(bind=True)
+def summarize_push_notification(self, results: list, blast_id: int):
+    """Chord callback: record the merged per-shard delivery stats of a blast."""
+
+    totals = complete_blast(blast_id, results)
+    logger.info(
+        f"Push blast {blast_id}: sent {totals['sent']}, failed {totals['failed']}, "
+        f"retried {totals['retried']}, deactivated {totals['deactivated']}, "
+        f"inbox rows {totals['notified']}, shards {len(results)}"
+    )
+    return totals
+
+
+@celery_app.task(bind=True)
+def subscribe_device_topics(self, device_id: int, previous_token: str = '', previous_user_ids: list = None):
+    """Subscribe a newly registered/updated device to its users' FCM topics, dropping stale memberships."""
+
+    device = Devices.objects.filter(id=device_id).first()
+    if not device:
+        return {'success': False, 'error': 'Device not found'}
+    topics = subscribe_device(device, previous_token=previous_token, previous_user_ids=previous_user_ids or [])
+    return {'success': True, 'topics': topics}
+
+
+@celery_app.task(bind=True)
+def sync_client_topic_subscriptions(self, user_ids: list):
+    """Move the devices of users whose roles changed in or out of the clients topic."""
+
+    devices = sync_client_topic(user_ids)
+    return {'success': True, 'devices': devices}
+
+
+@celery_app.task(bind=True)
+def update_category_topic(self, user_id: int, category_id: int, subscribe: bool):
+    """Move a user's devices in or out of a category topic after follow/unfollow."""
+
+    user = User.objects.filter(id=user_id).first()
+    if not user:
+        return {'success': False, 'error': 'User not found'}
+    changed = set_category_subscription(user, category_id, subscribe)
+    return {'success': True, 'devices': changed}
+
+
+@celery_app.task(bind=True)
+def reconcile_notification_unread_counts(self):
+    """Periodic: correct cached unread badge counts against the database."""
+
+    fixed = reconcile_unread_counts()
+    logger.info(f"Unread notification counts reconciled, {fixed} corrected")
+    return {'success': True, 'corrected': fixed}
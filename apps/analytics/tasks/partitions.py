@@ -0,0 +1,18 @@
+"""
+Celery task keeping the event table partitions ahead of the inserts.
+"""
+import logging
+
+from apps.analytics.services.partitions import ensure_partitions
+from farajayangu_be.celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def roll_event_partitions(self):
+    """Periodic: create the upcoming monthly View/Notification partitions."""
+
+    created = ensure_partitions()
+    logger.info(f"Event partitions rolled, {len(created)} created")
+    return {'success': True, 'created': created}
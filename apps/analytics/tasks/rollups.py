@@ -0,0 +1,28 @@
+"""
+Celery tasks maintaining the dashboard rollup tables.
+"""
+import logging
+
+from apps.analytics.services.client_activity import reconcile_client_activity
+from apps.analytics.services.rollups import refresh_rollups
+from farajayangu_be.celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def refresh_analytics_rollups(self):
+    """Periodic: recompute the daily rollups of the days that changed."""
+
+    days = refresh_rollups()
+    logger.info(f"Analytics rollups refreshed for {len(days)} days")
+    return {'success': True, 'days': [day.isoformat() for day in days]}
+
+
+@celery_app.task(bind=True)
+def reconcile_client_activities(self):
+    """Periodic: create the client activity rows of users written without signals."""
+
+    created = reconcile_client_activity()
+    logger.info(f"Client activity rows created for {created} users")
+    return {'success': True, 'created': created}
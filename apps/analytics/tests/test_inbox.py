@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+import pytest
+
+from apps.analytics.models import BroadcastNotification, Notification
+from apps.analytics.services.push_notifications import UserGroupTypes
+from apps.analytics.services.unread_counts import increment_unread, reconcile_unread_counts, record_broadcast
+from apps.authentication.models import Role, User
+
+
+@pytest.mark.django_db
+class TestNotificationInbox:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="viewer", password="x")
+        self.user.roles.add(Role.objects.create(name=Role.ROLES.USER, description="client"))
+        self.client.force_authenticate(user=self.user)
+
+    def _broadcast(self, title, audience=UserGroupTypes.CLIENTS, created_at=None):
+        broadcast = BroadcastNotification.objects.create(audience=audience, title=title, message=title)
+        if created_at:
+            BroadcastNotification.objects.filter(id=broadcast.id).update(created_at=created_at)
+        return broadcast
+
+    def _inbox(self, **params):
+        return self.client.get(reverse("analytics:notifications-list"), params).data["data"]
+
+    def test_cursor_pages_through_personal_and_broadcast_rows(self):
+        for index in range(3):
+            Notification.objects.create(user=self.user, title=f"personal {index}", message="m")
+            self._broadcast(f"broadcast {index}")
+        self._broadcast("admins only", audience=UserGroupTypes.ADMINS)
+        self._broadcast("before joining", created_at=self.user.date_joined - timedelta(days=1))
+
+        titles = []
+        data = self._inbox(page_size=4)
+        titles += [row["title"] for row in data["results"]]
+        assert data["pagination"]["has_next"] is True
+
+        data = self._inbox(page_size=4, cursor=data["pagination"]["next_cursor"])
+        titles += [row["title"] for row in data["results"]]
+        assert data["pagination"]["has_next"] is False
+
+        assert sorted(titles) == sorted([f"personal {i}" for i in range(3)] + [f"broadcast {i}" for i in range(3)])
+
+    def test_broadcast_read_and_delete_are_per_user(self):
+        other = User.objects.create_user(username="other", password="x")
+        other.roles.add(Role.objects.get(name=Role.ROLES.USER))
+        broadcast = self._broadcast("new video")
+
+        response = self.client.patch(
+            reverse("analytics:notification-mark-read", kwargs={"pk": self._inbox()["results"][0]["id"]})
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert self._inbox()["results"][0]["is_read"] is True
+
+        self.client.delete(reverse("analytics:notification-delete", kwargs={"pk": f"b-{broadcast.id}"}))
+        assert self._inbox()["results"] == []
+
+        self.client.force_authenticate(user=other)
+        row = self._inbox()["results"][0]
+        assert (row["kind"], row["is_read"]) == ("broadcast", False)
+
+    def test_broadcast_ids_do_not_collide_with_personal_ids(self):
+        broadcast = self._broadcast("new video")
+        personal = Notification.objects.create(id=broadcast.id, user=self.user, title="personal", message="m")
+
+        rows = {row["kind"]: row for row in self._inbox()["results"]}
+        assert rows["broadcast"]["id"] == f"b-{broadcast.id}"
+        assert rows["personal"]["id"] == personal.id
+
+        self.client.delete(reverse("analytics:notification-delete", kwargs={"pk": rows["broadcast"]["id"]}))
+        assert Notification.objects.filter(id=personal.id).exists()
+        assert [row["kind"] for row in self._inbox()["results"]] == ["personal"]
+
+    def test_mark_all_read_covers_broadcasts(self):
+        Notification.objects.create(user=self.user, title="personal", message="m")
+        self._broadcast("new video", created_at=timezone.now())
+
+        self.client.post(reverse("analytics:notifications-mark-all-read"))
+
+        assert all(row["is_read"] for row in self._inbox()["results"])
+
+    def _unread(self):
+        return self.client.get(reverse("analytics:notifications-unread-count")).data["data"]["unread_count"]
+
+    def test_unread_count_tracks_sends_reads_and_deletes(self):
+        Notification.objects.create(user=self.user, title="seeded", message="m")
+        assert self._unread() == 1
+
+        personal = Notification.objects.create(user=self.user, title="personal", message="m")
+        increment_unread([self.user.id])
+        broadcast = self._broadcast("new video")
+        record_broadcast(UserGroupTypes.CLIENTS)
+        self._broadcast("admins only", audience=UserGroupTypes.ADMINS)
+        record_broadcast(UserGroupTypes.ADMINS)
+        assert self._unread() == 3
+
+        self.client.patch(reverse("analytics:notification-mark-read", kwargs={"pk": f"b-{broadcast.id}"}))
+        self.client.delete(reverse("analytics:notification-delete", kwargs={"pk": personal.id}))
+        assert self._unread() == 1
+
+        # Rows written behind the counter's back are picked up by reconciliation
+        Notification.objects.create(user=self.user, title="unseen", message="m")
+        assert self._unread() == 1
+        assert reconcile_unread_counts() == 1
+        assert self._unread() == 2
+
+        self.client.post(reverse("analytics:notifications-mark-all-read"))
+        assert self._unread() == 0
+
+    def test_broadcast_reads_only_bump_an_atomic_counter(self):
+        broadcasts = [self._broadcast(f"video {index}") for index in range(3)]
+        assert self._unread() == 3
+        base = cache.get(f"notifications:unread:{self.user.id}:broadcasts")
+
+        for broadcast in broadcasts[:2]:
+            self.client.patch(reverse("analytics:notification-mark-read", kwargs={"pk": f"b-{broadcast.id}"}))
+
+        # Concurrent reads cannot overwrite each other: the built entry is untouched
+        assert cache.get(f"notifications:unread:{self.user.id}:broadcasts") == base
+        assert cache.get(f"notifications:unread:{self.user.id}:broadcasts:read") == 2
+        assert self._unread() == 1
+
+        self._broadcast("another video")
+        record_broadcast(UserGroupTypes.CLIENTS)
+        assert self._unread() == 2
@@ -0,0 +1,72 @@
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+
+from apps.analytics.models import BroadcastNotification, Notification
+from apps.analytics.socket import consumers
+from apps.analytics.services.push_notifications import UserGroupTypes
+from apps.analytics.socket.utils import send_broadcast_notification, send_user_notifications
+from apps.authentication.models import Role, User
+from farajayangu_be.ws_urls import ws_urlpatterns
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNotificationConsumer:
+    def setup_method(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="viewer", password="x")
+        self.user.roles.add(Role.objects.create(name=Role.ROLES.USER, description="client"))
+
+    def _communicator(self, token):
+        return WebsocketCommunicator(URLRouter(ws_urlpatterns), f"/socket/notifications/?token={token}")
+
+    def test_rejects_missing_token(self):
+        async def scenario():
+            connected, code = await self._communicator("").connect()
+            return connected, code
+
+        assert async_to_sync(scenario)() == (False, 4001)
+
+    def test_delivers_personal_and_broadcast_notifications(self, monkeypatch):
+        count_reads = []
+        get_unread_count = consumers.get_unread_count
+        monkeypatch.setattr(
+            consumers, "get_unread_count", lambda user: count_reads.append(user) or get_unread_count(user)
+        )
+        Notification.objects.create(user=self.user, title="earlier", message="m")
+        token = str(AccessToken.for_user(self.user))
+
+        async def scenario():
+            communicator = self._communicator(token)
+            connected, _ = await communicator.connect()
+            assert connected
+            greeting = await communicator.receive_json_from()
+
+            notification = await Notification.objects.acreate(user=self.user, title="reply", message="m")
+            admins_only = await BroadcastNotification.objects.acreate(
+                audience=UserGroupTypes.ADMINS, title="admins", message="m"
+            )
+            broadcast = await BroadcastNotification.objects.acreate(
+                audience=UserGroupTypes.CLIENTS, title="new video", message="m"
+            )
+            await database_sync_to_async(send_user_notifications)([notification])
+            await database_sync_to_async(send_broadcast_notification)(admins_only)
+            await database_sync_to_async(send_broadcast_notification)(broadcast)
+
+            messages = [await communicator.receive_json_from(), await communicator.receive_json_from()]
+            assert await communicator.receive_nothing()
+            await communicator.disconnect()
+            return greeting, messages
+
+        greeting, messages = async_to_sync(scenario)()
+
+        assert greeting["unread_count"] == 1
+        assert [(m["notification"]["title"], m["notification"]["kind"], m["unread_count"]) for m in messages] == [
+            ("reply", "personal", 2), ("new video", "broadcast", 3),
+        ]
+        # Counted once on connect, then carried forward from the event deltas
+        assert len(count_reads) == 1
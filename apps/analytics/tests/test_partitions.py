@@ -0,0 +1,63 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection
+import pytest
+
+from apps.analytics.services.partitions import (
+    PARTITION_MONTHS_AHEAD, _add_months, _month_start, convert_to_partitioned, default_partition_name,
+    ensure_partitions, is_partitioned, partition_name,
+)
+from apps.authentication.models import User
+from apps.streaming.models import Category, Video, View
+
+pytestmark = pytest.mark.skipif(connection.vendor != 'postgresql', reason="Partitioning requires PostgreSQL")
+
+
+# The conversion builds indexes concurrently, which cannot run inside the test transaction
+@pytest.mark.django_db(transaction=True)
+class TestEventPartitions:
+    def setup_method(self):
+        self.user = User.objects.create_user(username="viewer", password="x")
+        category = Category.objects.create(name="Cat", description="d", slug="cat")
+        self.video = Video.objects.create(title="Video", description="desc", category=category, uploaded_by=self.user)
+        self.this_month = _month_start(datetime.now(dt_timezone.utc))
+
+    def _rows(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def _exists(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+            return cursor.fetchone()[0]
+
+    def test_conversion_keeps_rows_and_creates_partitions_ahead(self):
+        view = View.objects.create(video=self.video, user=self.user)
+
+        convert_to_partitioned()
+        ensure_partitions()
+
+        with connection.cursor() as cursor:
+            assert is_partitioned(cursor, View._meta.db_table)
+        for months in range(PARTITION_MONTHS_AHEAD + 1):
+            assert self._exists(partition_name(View._meta.db_table, _add_months(self.this_month, months)))
+        assert self._exists(default_partition_name(View._meta.db_table))
+        assert View.objects.filter(id=view.id).exists()
+        assert View.objects.create(video=self.video, user=self.user).id > view.id
+
+    def test_rows_in_the_default_partition_move_to_their_month(self):
+        convert_to_partitioned()
+        table = View._meta.db_table
+        later = _add_months(self.this_month, PARTITION_MONTHS_AHEAD + 3)
+        view = View.objects.create(video=self.video, user=self.user)
+        # Beyond every monthly partition, so the row lands in the default one
+        View.objects.filter(id=view.id).update(created_at=later)
+        assert self._rows(default_partition_name(table)) == 1
+
+        created = ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD + 3)
+
+        assert partition_name(table, later) in created
+        assert self._rows(default_partition_name(table)) == 0
+        assert self._rows(partition_name(table, later)) == 1
+        assert View.objects.get(id=view.id).created_at == later
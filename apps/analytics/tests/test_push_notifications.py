@@ -0,0 +1,248 @@
+
+from django.db import connection
+from firebase_admin import messaging
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+from apps.analytics.models import BroadcastNotification, Notification, NotificationBlast
+from apps.analytics.services import push_notifications, topics
+from apps.analytics.services.push_notifications import NotificationTypes, UserGroupTypes
+from apps.authentication.models import Devices, Profile, Role, User, role_mask
+from apps.authentication.services.devices import register_device
+from apps.streaming.models import Category
+from apps.streaming.tasks.tasks import send_push_notification
+
+
+class StubSendResponse:
+    def __init__(self, exception=None):
+        self.success = exception is None
+        self.exception = exception
+
+
+class StubBatchResponse:
+    def __init__(self, responses):
+        self.responses = responses
+        self.success_count = sum(1 for response in responses if response.success)
+        self.failure_count = len(responses) - self.success_count
+
+
+class StubFCMClient:
+    """Records batches instead of calling FCM; ``errors`` maps token -> exceptions to raise in order."""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.multicast_batches = []
+        self.personalized_batches = []
+        self.topic_messages = []
+        self.subscriptions = []
+        self.unsubscriptions = []
+
+    def _respond(self, tokens):
+        return StubBatchResponse([
+            StubSendResponse(self.errors[token].pop(0) if self.errors.get(token) else None)
+            for token in tokens
+        ])
+
+    def send_multicast(self, tokens, title, body, data=None):
+        self.multicast_batches.append(list(tokens))
+        return self._respond(tokens)
+
+    def send_each(self, messages, data=None):
+        self.personalized_batches.append(list(messages))
+        return self._respond([token for token, _, _ in messages])
+
+    def send_to_topic(self, topic, title, body, data=None):
+        self.topic_messages.append((topic, title, body))
+        return f"projects/test/messages/{len(self.topic_messages)}"
+
+    def subscribe_to_topic(self, tokens, topic):
+        self.subscriptions.append((topic, list(tokens)))
+        return StubTopicResponse(len(tokens))
+
+    def unsubscribe_from_topic(self, tokens, topic):
+        self.unsubscriptions.append((topic, list(tokens)))
+        return StubTopicResponse(len(tokens))
+
+
+class StubTopicResponse:
+    def __init__(self, size):
+        self.success_count = size
+        self.failure_count = 0
+        self.errors = []
+
+
+@pytest.mark.django_db
+class TestPushNotificationFanOut:
+    def setup_method(self):
+        self.fcm = StubFCMClient()
+
+    def _create_clients(self, count, role_name=Role.ROLES.ADMIN):
+        role, _ = Role.objects.get_or_create(name=role_name, defaults={"description": role_name})
+        # Bulk inserts skip the role signals, so set the denormalized mask directly
+        users = User.objects.bulk_create([
+            User(username=f"client{index}", role_mask=role_mask([role_name])) for index in range(count)
+        ])
+        devices = Devices.objects.bulk_create([
+            Devices(device_os="android", device_id=str(index), device_type="phone", app_version="1", fcm_token=f"token-{index}")
+            for index in range(count)
+        ])
+        User.roles.through.objects.bulk_create([User.roles.through(user=user, role=role) for user in users])
+        User.devices.through.objects.bulk_create([
+            User.devices.through(user=user, devices=device) for user, device in zip(users, devices)
+        ])
+        return users
+
+    def _blast(self, monkeypatch, message, shard_size, notification_type=NotificationTypes.NEW_VIDEO, title="New video",
+               context=None, target=UserGroupTypes.ADMINS):
+        monkeypatch.setattr(push_notifications, "get_fcm_client", lambda: self.fcm)
+        monkeypatch.setattr(topics, "get_fcm_client", lambda: self.fcm)
+        monkeypatch.setattr(push_notifications, "USERS_PER_SHARD", shard_size)
+        monkeypatch.setattr(push_notifications.time, "sleep", lambda seconds: None)
+        with CaptureQueriesContext(connection) as queries:
+            send_push_notification(target, notification_type, title, message, {"video_id": 1}, context=context)
+        return len(queries)
+
+    def test_shared_payload_is_sent_in_multicast_batches(self, monkeypatch):
+        self._create_clients(1200)
+
+        self._blast(monkeypatch, "We have a new video", shard_size=1200)
+
+        assert [len(batch) for batch in self.fcm.multicast_batches] == [500, 500, 200]
+        assert self.fcm.personalized_batches == []
+        # Shared payloads are stored once, not per user
+        assert not Notification.objects.exists()
+        assert BroadcastNotification.objects.get().audience == UserGroupTypes.ADMINS
+
+    def test_personalized_message_is_rendered_per_user(self, monkeypatch):
+        self._create_clients(3, role_name=Role.ROLES.USER)
+
+        # Personalized bodies cannot use the clients topic
+        self._blast(monkeypatch, "Hi, --username--!", shard_size=2, target=UserGroupTypes.CLIENTS)
+
+        messages = set(Notification.objects.values_list("message", flat=True))
+        assert messages == {"Hi, client0!", "Hi, client1!", "Hi, client2!"}
+        bodies = sorted(body for batch in self.fcm.personalized_batches for _, _, body in batch)
+        assert bodies == ["Hi, client0!", "Hi, client1!", "Hi, client2!"]
+
+    def test_blast_level_placeholders_keep_one_multicast_payload(self, monkeypatch):
+        self._create_clients(3)
+
+        self._blast(
+            monkeypatch,
+            "New in --category--",
+            shard_size=10,
+            title=None,
+            notification_type=NotificationTypes.COMMENT_REPLY,
+            context={"category": "Music --username--"},
+        )
+
+        assert self.fcm.personalized_batches == []
+        assert len(self.fcm.multicast_batches) == 1
+        # Substituted values are not scanned for placeholders again
+        assert set(BroadcastNotification.objects.values_list("title", "message")) == {
+            ("You have a new comment reply", "New in Music --username--"),
+        }
+
+    def test_template_values_are_type_checked_before_queueing(self, monkeypatch):
+        self._create_clients(1)
+
+        with pytest.raises(ValueError):
+            self._blast(monkeypatch, None, shard_size=10, title=None, context={"category": "Music", "video_title": 42})
+
+        assert not Notification.objects.exists()
+        assert not NotificationBlast.objects.exists()
+
+    def test_fan_out_query_budget(self, monkeypatch):
+        self._create_clients(2000)
+
+        query_count = self._blast(monkeypatch, "We have a new video", shard_size=1000)
+
+        # Per shard: a streamed token query and the batch updates; no per-user rows
+        assert query_count <= 6
+        assert len(self.fcm.multicast_batches) == 4
+        assert BroadcastNotification.objects.count() == 1
+
+    def test_dead_tokens_are_deactivated_and_quota_errors_retried(self, monkeypatch):
+        self._create_clients(4)
+        self.fcm = StubFCMClient(errors={
+            "token-0": [messaging.UnregisteredError("gone")],
+            "token-1": [messaging.QuotaExceededError("slow down")],
+            "token-2": [messaging.QuotaExceededError("slow down")] * 4,
+        })
+
+        self._blast(monkeypatch, "We have a new video", shard_size=10)
+
+        assert list(Devices.objects.filter(is_active=False).values_list("fcm_token", flat=True)) == ["token-0"]
+        blast = NotificationBlast.objects.get()
+        assert blast.status == NotificationBlast.BLAST_STATUS.COMPLETED
+        # token-1 succeeds on retry, token-2 exhausts its attempts
+        assert (blast.sent_count, blast.failed_count, blast.deactivated_count) == (2, 2, 1)
+        assert blast.error_counts == {"unregistered": 1, "quota": 5}
+
+        # The next blast no longer pays for the dead token
+        self.fcm = StubFCMClient()
+        self._blast(monkeypatch, "Another video", shard_size=10)
+        assert "token-0" not in self.fcm.multicast_batches[0]
+
+    def test_clients_broadcast_is_one_topic_message(self, monkeypatch):
+        self._create_clients(1200, role_name=Role.ROLES.USER)
+
+        self._blast(
+            monkeypatch,
+            None,
+            shard_size=500,
+            title=None,
+            target=UserGroupTypes.CLIENTS,
+            context={"category": "Music", "video_title": "Live"},
+        )
+
+        assert self.fcm.topic_messages == [("clients", "Music | Live", "We have a new Music video uploaded")]
+        assert self.fcm.multicast_batches == []
+        assert not Notification.objects.exists()
+        assert BroadcastNotification.objects.count() == 1
+        blast = NotificationBlast.objects.get()
+        assert (blast.topic, blast.sent_count, blast.shards) == ("clients", 1, 0)
+
+    def test_registered_device_joins_segment_and_category_topics(self, monkeypatch):
+        monkeypatch.setattr(topics, "get_fcm_client", lambda: self.fcm)
+        user = self._create_clients(1, role_name=Role.ROLES.USER)[0]
+        user.profile = Profile.objects.create()
+        user.save()
+        category = Category.objects.create(name="Music", description="d", slug="music")
+        user.profile.followed_categories.add(category)
+
+        register_device(user, "phone-2", fcm_token="fresh-token", device_type="android", app_version="2")
+
+        subscribed = {topic for topic, tokens in self.fcm.subscriptions if tokens == ["fresh-token"]}
+        assert subscribed == {"all", "clients", f"category-{category.id}"}
+
+    def _left(self, token):
+        return {topic for topic, tokens in self.fcm.unsubscriptions if tokens == [token]}
+
+    def test_replaced_and_reassigned_tokens_leave_old_topics(self, monkeypatch):
+        monkeypatch.setattr(topics, "get_fcm_client", lambda: self.fcm)
+        owner, other = self._create_clients(2, role_name=Role.ROLES.USER)
+        owner.profile = Profile.objects.create()
+        owner.save()
+        category = Category.objects.create(name="Music", description="d", slug="music")
+        owner.profile.followed_categories.add(category)
+        register_device(owner, "phone", fcm_token="old-token")
+
+        register_device(owner, "phone", fcm_token="new-token")
+        assert self._left("old-token") == {"all", "clients", f"category-{category.id}"}
+
+        # The install is signed into another account: only the category was the old owner's alone
+        register_device(other, "phone", fcm_token="new-token")
+        assert self._left("new-token") == {f"category-{category.id}"}
+        assert not owner.devices.get(device_id="phone").is_active
+
+    def test_role_changes_move_devices_in_and_out_of_clients(self, monkeypatch):
+        monkeypatch.setattr(topics, "get_fcm_client", lambda: self.fcm)
+        user = self._create_clients(1, role_name=Role.ROLES.USER)[0]
+        client_role = Role.objects.get(name=Role.ROLES.USER)
+
+        user.roles.remove(client_role)
+        assert self._left("token-0") == {"clients"}
+
+        user.roles.add(client_role)
+        assert ("clients", ["token-0"]) in self.fcm.subscriptions
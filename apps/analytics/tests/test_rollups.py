@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+import pytest
+
+from apps.analytics.models import DailyRollup
+from apps.analytics.services.rollups import refresh_rollups
+from apps.authentication.models import Role, User
+from apps.streaming.models import Category, Like, Video, View
+from core.utils.hll import HLL_RELATIVE_ERROR, HyperLogLog
+
+
+@pytest.mark.django_db
+class TestDailyRollups:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        self.viewer = User.objects.create_user(username="viewer", password="x")
+        self.viewer.roles.add(Role.objects.create(name=Role.ROLES.USER, description="client"))
+        admin = User.objects.create_user(username="admin", password="x")
+        self.client.force_authenticate(user=admin)
+        category = Category.objects.create(name="Cat", description="d", slug="cat")
+        self.video = Video.objects.create(title="Video", description="desc", category=category, uploaded_by=admin)
+
+    def _backdate(self, obj, days):
+        type(obj).objects.filter(id=obj.id).update(created_at=timezone.now() - timedelta(days=days))
+
+    def _summary(self):
+        return self.client.get(reverse("management:get-dashboard-summary")).data["data"]
+
+    def test_dashboard_reads_rollups_and_refresh_only_touches_changed_days(self):
+        View.objects.create(video=self.video, user=self.viewer, watch_time=timedelta(minutes=2))
+        old_view = View.objects.create(video=self.video, user=self.viewer, watch_time=timedelta(minutes=1))
+        self._backdate(old_view, days=40)
+        old_like = Like.objects.create(video=self.video, user=self.viewer)
+        self._backdate(old_like, days=40)
+
+        refresh_rollups()
+        summary = self._summary()
+        assert (summary["views"]["total"], summary["views"]["today"]) == (2, 1)
+        assert summary["watch_time"]["total"] == 180
+        assert summary["likes"]["total"] == 1
+
+        # Steady state: only today and yesterday are recomputed
+        assert len(refresh_rollups()) == 2
+
+        Like.objects.get(id=old_like.id).delete()
+        old_day = timezone.localdate() - timedelta(days=40)
+        assert old_day in refresh_rollups()
+        assert DailyRollup.objects.get(day=old_day).likes == 0
+        assert self._summary()["likes"]["total"] == 0
+
+    def test_logins_do_not_flag_the_registration_day(self):
+        old_day = timezone.localdate() - timedelta(days=40)
+        User.objects.filter(id=self.viewer.id).update(date_joined=timezone.now() - timedelta(days=40))
+        self.viewer.refresh_from_db()
+        refresh_rollups()
+
+        update_last_login(None, self.viewer)
+        self.viewer.first_name = "Renamed"
+        self.viewer.save()
+        assert old_day not in refresh_rollups()
+
+        self.viewer.delete()
+        assert old_day in refresh_rollups()
+
+    def test_active_users_merge_day_sketches(self):
+        others = [User.objects.create_user(username=f"client{i}", password="x") for i in range(3)]
+        role = Role.objects.get(name=Role.ROLES.USER)
+        for user in others:
+            user.roles.add(role)
+        View.objects.create(video=self.video, user=self.viewer)
+        for days, user in enumerate(others, start=3):
+            self._backdate(View.objects.create(video=self.video, user=user), days=days * 10)
+        # The same viewer again 20 days ago is counted once
+        self._backdate(View.objects.create(video=self.video, user=self.viewer), days=20)
+
+        refresh_rollups()
+        summary = self._summary()
+        assert summary["active_users"]["today"] == 1
+        assert summary["active_users"]["total"] == 4
+        assert summary["retention"]["active_last_30_days"] == 2
+        assert summary["retention"]["active_last_7_days"] == 1
+
+    def test_sketch_estimate_within_error_bound(self):
+        left = HyperLogLog().update(range(0, 60000))
+        right = HyperLogLog.from_bytes(HyperLogLog().update(range(40000, 100000)).to_bytes())
+        estimate = HyperLogLog.union([left, right]).count()
+        assert abs(estimate - 100000) <= 100000 * 3 * HLL_RELATIVE_ERROR
+
+    def test_closed_month_chart_is_cached_until_its_rows_change(self):
+        today = timezone.localdate()
+        last_month = today.replace(day=1) - timedelta(days=40)
+        view = View.objects.create(video=self.video, user=self.viewer, watch_time=timedelta(seconds=30))
+        self._backdate(view, days=(today - last_month).days)
+        params = {"year": last_month.year, "month": last_month.month}
+        url = reverse("management:get-dashboard-analytics-chart")
+
+        data = self.client.get(url, params).data["data"]["data"]
+        assert sum(data["views"]) == 1 and sum(data["watch_time"]) == 30
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, params)
+        assert not [q for q in queries if 'streaming_view' in q["sql"]]
+
+        # A backdated like saved through the ORM flags its day and drops the cached month
+        like = Like.objects.create(video=self.video, user=self.viewer)
+        self._backdate(like, days=(today - last_month).days)
+        Like.objects.get(id=like.id).save()
+        assert sum(self.client.get(url, params).data["data"]["data"]["likes"]) == 1
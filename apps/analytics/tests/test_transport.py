@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+
+from firebase_admin import messaging
+import httpx
+
+from apps.analytics.services import transport as transport_module
+from apps.analytics.services.fcm import DeliveryErrors, FCMClient, classify_error
+from apps.analytics.services.transport import NotificationTransport, build_message
+
+
+class StubCredential:
+    valid = True
+    token = "access-token"
+
+
+def _fcm_handler(request):
+    token = json.loads(request.content)["message"]["token"]
+    if token == "dead":
+        return httpx.Response(404, json={"error": {
+            "status": "NOT_FOUND",
+            "message": "Requested entity was not found.",
+            "details": [{"@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError", "errorCode": "UNREGISTERED"}],
+        }})
+    if token == "busy":
+        return httpx.Response(429, headers={"Retry-After": "3"}, json={"error": {"status": "RESOURCE_EXHAUSTED"}})
+    return httpx.Response(200, json={"name": f"projects/test/messages/{token}"})
+
+
+class TestNotificationTransport:
+    def setup_method(self):
+        self.transport = NotificationTransport()
+        # Pre-started: skip Firebase and route the HTTP/2 client to a local handler
+        self.transport._credential = StubCredential()
+        self.transport._url = "https://fcm.test/v1/projects/test/messages:send"
+        self.transport._new_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(_fcm_handler))
+
+    def teardown_method(self):
+        self.transport.close()
+
+    def test_batch_keeps_order_and_maps_errors(self):
+        tokens = ["a", "dead", "b", "busy"]
+        response = self.transport.send([build_message("t", "b", {"video_id": 7}, token=token) for token in tokens])
+
+        assert [r.success for r in response.responses] == [True, False, True, False]
+        assert response.responses[0].message_id == "projects/test/messages/a"
+        assert isinstance(response.responses[1].exception, messaging.UnregisteredError)
+        assert classify_error(response.responses[1].exception) == DeliveryErrors.UNREGISTERED
+        assert classify_error(response.responses[3].exception) == DeliveryErrors.QUOTA
+
+    def test_metrics_record_every_send(self):
+        self.transport.send([build_message("t", "b", token=str(i)) for i in range(50)])
+
+        snapshot = self.transport.metrics.snapshot()
+        assert (snapshot["sent"], snapshot["failed"]) == (50, 0)
+        assert sum(snapshot["latency_ms"].values()) == 50
+        assert snapshot["sends_per_second"] > 0
+
+    def test_sends_from_threads_and_running_loops(self):
+        def send_batch(prefix):
+            response = self.transport.send([build_message("t", "b", token=f"{prefix}{i}") for i in range(5)])
+            return [r.message_id.rsplit("/", 1)[1] for r in response.responses]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            batches = list(pool.map(send_batch, ["a", "b", "c", "d"]))
+        assert batches[2] == ["c0", "c1", "c2", "c3", "c4"]
+
+        async def async_caller():
+            return send_batch("async")
+
+        assert asyncio.run(async_caller())[0] == "async0"
+        assert self.transport.metrics.snapshot()["sent"] == 25
+
+    def test_client_follows_the_replaced_process_transport(self, monkeypatch):
+        monkeypatch.setattr(transport_module, "_transport", self.transport)
+        client = FCMClient()
+
+        replacement = NotificationTransport()
+        replacement._url = self.transport._url
+        monkeypatch.setattr(transport_module, "_transport", replacement)
+        assert client.transport is replacement
@@ -5,63 +5,139 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 from core.response_wrapper import success_response, error_response
 from apps.analytics.models import Notification
-from apps.analytics.serializers.notification import NotificationSerializer
+from apps.analytics.selectors.notifications import (
+    BROADCAST,
+    KIND_NAMES,
+    decode_inbox_cursor,
+    encode_inbox_cursor,
+    get_inbox,
+    inbox_id,
+    parse_inbox_id,
+)
+from apps.analytics.serializers.notification import InboxNotificationSerializer
+from apps.analytics.services.inbox import clear_all, delete_broadcast, mark_all_read, mark_broadcast_read
+from apps.analytics.services.unread_counts import decrement_unread, get_unread_count
+from apps.analytics.socket.utils import send_unread_count
+
+
+INBOX_DEFAULT_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_notifications(request):
+    """
+    Merged personal + broadcast inbox, newest first.
+
+    Pass ``cursor`` (from ``pagination.next_cursor``) to page forward; the
+    legacy ``page`` parameter is still accepted for page-number pagination.
+    """
     user = request.user
 
     page_param = request.GET.get('page')
     page_size_param = request.GET.get('page_size')
-
-    if not page_param or not page_size_param:
-        return error_response('Invalid query parameters', code=400)
+    cursor_param = request.GET.get('cursor')
 
     try:
-        page = int(page_param)
-        page_size = int(page_size_param)
-        if page < 1 or page_size < 1:
+        page_size = int(page_size_param) if page_size_param else INBOX_DEFAULT_PAGE_SIZE
+        page = int(page_param) if page_param else None
+        cursor = decode_inbox_cursor(cursor_param) if cursor_param else None
+        if page_size < 1 or (page is not None and page < 1):
             raise ValueError
     except (TypeError, ValueError):
         return error_response('Invalid query parameters', code=400)
 
-    queryset = Notification.objects.filter(user=user).order_by('-created_at')
-
-    paginator = Paginator(queryset, page_size)
-
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        page = 1
-        page_obj = paginator.page(page)
-    except EmptyPage:
-        page_obj = []
-
-    if page_obj:
-        objects = getattr(page_obj, 'object_list', page_obj)
-        serializer = NotificationSerializer(objects, many=True)
-        results = serializer.data
-        has_next = getattr(page_obj, 'has_next', lambda: False)()
-    else:
-        results = []
-        has_next = False
+    page_size = min(page_size, INBOX_MAX_PAGE_SIZE)
+
+    if page is not None and cursor is None:
+        paginator = Paginator(get_inbox(user), page_size)
+
+        try:
+            page_obj = paginator.page(page)
+        except PageNotAnInteger:
+            page = 1
+            page_obj = paginator.page(page)
+        except EmptyPage:
+            page_obj = []
+
+        if page_obj:
+            objects = getattr(page_obj, 'object_list', page_obj)
+            serializer = InboxNotificationSerializer(objects, many=True)
+            results = serializer.data
+            has_next = getattr(page_obj, 'has_next', lambda: False)()
+        else:
+            results = []
+            has_next = False
+
+        return success_response({
+            'results': results,
+            'pagination': {
+                'page': page,
+                'page_size': page_size,
+                'has_next': has_next,
+                'total': paginator.count,
+            },
+        }, message='Notifications loaded successfully.')
+
+    rows = list(get_inbox(user, cursor=cursor)[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
 
     return success_response({
-        'results': results,
+        'results': InboxNotificationSerializer(rows, many=True).data,
         'pagination': {
-            'page': page,
             'page_size': page_size,
             'has_next': has_next,
-            'total': paginator.count,
+            'next_cursor': encode_inbox_cursor(rows[-1]) if has_next else None,
         },
     }, message='Notifications loaded successfully.')
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def unread_notification_count(request):
+    """Unread badge count, personal and broadcast, served from the cached counters."""
+
+    counts = get_unread_count(request.user)
+    return success_response({
+        'unread_count': counts['total'],
+        'personal': counts['personal'],
+        'broadcasts': counts['broadcasts'],
+    }, message='Unread count loaded successfully.')
+
+
+def _parse_pk(request, pk: str):
+    """``(kind, id)`` of an inbox id, also accepting ``?kind=broadcast`` with a bare id; None when malformed."""
+
+    try:
+        kind, row_id = parse_inbox_id(pk)
+    except ValueError:
+        return None
+    if request.GET.get('kind') == KIND_NAMES[BROADCAST]:
+        kind = BROADCAST
+    return kind, row_id
+
+
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
 def mark_notification_read(request, pk):
+    """Mark a notification read; broadcast rows are addressed by their ``b-<id>`` inbox id."""
+
+    parsed = _parse_pk(request, pk)
+    if parsed is None:
+        return error_response('Notification not found', code=404)
+    kind, pk = parsed
+
+    if kind == BROADCAST:
+        if not mark_broadcast_read(request.user, pk):
+            return error_response('Notification not found', code=404)
+        send_unread_count(request.user)
+        return success_response({
+            'id': inbox_id({'id': pk, 'kind': BROADCAST}),
+            'is_read': True,
+        }, message='Notification marked as read.')
+
     try:
         notification = Notification.objects.get(pk=pk, user=request.user)
     except Notification.DoesNotExist:
@@ -70,6 +146,8 @@ def mark_notification_read(request, pk):
     if not notification.is_read:
         notification.is_read = True
         notification.save(update_fields=['is_read'])
+        decrement_unread(request.user)
+        send_unread_count(request.user)
 
     return success_response({
         'id': notification.id,
@@ -80,19 +158,36 @@ def mark_notification_read(request, pk):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_all_notifications_read(request):
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    mark_all_read(request.user)
+    send_unread_count(request.user)
     return success_response(None, message='All notifications marked as read.')
 
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_notification(request, pk):
+    """Delete a notification; broadcast rows are hidden, addressed by their ``b-<id>`` inbox id."""
+
+    parsed = _parse_pk(request, pk)
+    if parsed is None:
+        return error_response('Notification not found', code=404)
+    kind, pk = parsed
+
+    if kind == BROADCAST:
+        if not delete_broadcast(request.user, pk):
+            return error_response('Notification not found', code=404)
+        send_unread_count(request.user)
+        return success_response(None, message='Notification deleted.')
+
     try:
         notification = Notification.objects.get(pk=pk, user=request.user)
     except Notification.DoesNotExist:
         return error_response('Notification not found', code=404)
 
     notification.delete()
+    if not notification.is_read:
+        decrement_unread(request.user)
+        send_unread_count(request.user)
     return success_response(None, message='Notification deleted.')
 
 
@@ -100,10 +195,6 @@ def delete_notification(request, pk):
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def clear_all_notification(request):
-    try:
-        notification = Notification.objects.filter(user=request.user)
-    except Notification.DoesNotExist:
-        return error_response('Notification not found', code=404)
-
-    notification.delete()
-    return success_response(None, message='Notifications deleted.')
\ No newline at end of file
+    clear_all(request.user)
+    send_unread_count(request.user)
+    return success_response(None, message='Notifications deleted.')
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_devices_user_devices'),
+        ('streaming', '0015_relatedvideolist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followed_categories',
+            field=models.ManyToManyField(blank=True, related_name='followers', to='streaming.category'),
+        ),
+    ]
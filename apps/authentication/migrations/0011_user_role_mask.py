@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:26
+
+import apps.authentication.models
+from django.db import migrations, models
+from django.db.models import F
+
+# ROLE_BITS at the time of this migration
+ROLE_BITS = {'ADMIN': 1, 'USER': 2, 'EDITOR': 4}
+
+
+def backfill_role_mask(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    for name, bit in ROLE_BITS.items():
+        User.objects.filter(roles__name=name).update(role_mask=F('role_mask').bitor(bit))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_profile_followed_categories'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', apps.authentication.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='role_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_role_mask, migrations.RunPython.noop),
+    ]
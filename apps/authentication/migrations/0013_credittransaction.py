@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:52
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    # Existing balances become the opening entry of each profile's ledger
+    Profile = apps.get_model('authentication', 'Profile')
+    CreditTransaction = apps.get_model('authentication', 'CreditTransaction')
+    balances = Profile.objects.exclude(credit_accumulation=0).values_list('id', 'credit_accumulation')
+    entries = [
+        CreditTransaction(profile_id=profile_id, amount=balance, reason='OPENING')
+        for profile_id, balance in balances.iterator(chunk_size=2000)
+    ]
+    CreditTransaction.objects.bulk_create(entries, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertising', '0005_ad_clicks_count_ad_impressions_count_addailystat'),
+        ('authentication', '0012_user_user_joined_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditTransaction',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('amount', models.IntegerField()),
+                ('reason', models.CharField(choices=[('OPENING', 'Opening'), ('AD_REWARD', 'Ad Reward'), ('DOWNLOAD', 'Download'), ('ADJUSTMENT', 'Adjustment')], max_length=20)),
+                ('idempotency_key', models.CharField(blank=True, max_length=100, null=True)),
+                ('ad', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_transactions', to='advertising.ad')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_transactions', to='authentication.profile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('profile', 'idempotency_key'), name='credit_txn_idempotency_uniq')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from core.base_model import BaseModel
 
 # Create your models here.
@@ -13,6 +13,38 @@ class Role(BaseModel):
     
     name = models.CharField(max_length=255, choices=ROLES.choices, default=ROLES.USER)
     description = models.TextField()
+
+
+# Bit of each role in ``User.role_mask``
+ROLE_BITS = {
+    Role.ROLES.ADMIN: 1,
+    Role.ROLES.USER: 2,
+    Role.ROLES.EDITOR: 4,
+}
+
+
+def role_mask(role_names) -> int:
+    mask = 0
+    for name in role_names:
+        mask |= ROLE_BITS.get(name, 0)
+    return mask
+
+
+def role_names(mask: int) -> list:
+    return [name for name, bit in ROLE_BITS.items() if mask & bit]
+
+
+class UserQuerySet(models.QuerySet):
+
+    def with_role(self, *names):
+        """Users holding any of ``names``; an indexed IN over the masks that contain them."""
+        wanted = role_mask(names)
+        masks = [mask for mask in range(1 << len(ROLE_BITS)) if mask & wanted]
+        return self.filter(role_mask__in=masks)
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
     
 class Profile(BaseModel):
     bio = models.TextField(null=True, blank=True)
@@ -30,6 +62,7 @@ class Profile(BaseModel):
     ads_clicked = models.ManyToManyField('advertising.Ad', related_name='clicked_by', blank=True)
     favorite_videos = models.ManyToManyField('streaming.Video', related_name='favorited_by', blank=True)
     downloaded_videos = models.ManyToManyField('streaming.Video', related_name='downloaded_by', blank=True)
+    followed_categories = models.ManyToManyField('streaming.Category', related_name='followers', blank=True)
     
     @property
     def videos_watched_count(self):
@@ -47,6 +80,35 @@ class Profile(BaseModel):
     def favorite_videos_count(self):
         return self.favorite_videos.count()
 
+
+class CreditTransaction(BaseModel):
+    """
+    Append-only ledger of ``Profile.credit_accumulation``: the balance is the
+    sum of its entries (checked by ``reconcile_credit_balances``). Entries are
+    written with ``apps.authentication.services.credits.apply_credit`` only.
+    """
+
+    class REASONS(models.TextChoices):
+        OPENING = 'OPENING'
+        AD_REWARD = 'AD_REWARD'
+        DOWNLOAD = 'DOWNLOAD'
+        ADJUSTMENT = 'ADJUSTMENT'
+
+    profile = models.ForeignKey(Profile, related_name='credit_transactions', on_delete=models.CASCADE)
+    amount = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASONS.choices)
+    ad = models.ForeignKey('advertising.Ad', related_name='credit_transactions', on_delete=models.SET_NULL, null=True, blank=True)
+    # Repeats of a key (e.g. one ad impression claimed twice) are not applied again
+    idempotency_key = models.CharField(max_length=100, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'idempotency_key'], name='credit_txn_idempotency_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.amount:+d} credits for profile {self.profile_id} ({self.reason})'
+
 class Devices(BaseModel):
     device_os = models.CharField(max_length=255)
     device_id = models.CharField(max_length=255)
@@ -64,7 +126,17 @@ class User(AbstractUser):
     last_login = models.DateTimeField(auto_now=True)
     auth_provider = models.CharField(max_length=255)
     roles = models.ManyToManyField('authentication.Role', related_name='users', default=Role.ROLES.USER)
+    # ROLE_BITS of ``roles``, kept in sync by apps.authentication.signals
+    role_mask = models.PositiveSmallIntegerField(default=0, db_index=True)
     devices = models.ManyToManyField('authentication.Devices', related_name='users', blank=True)
+
+    objects = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pages of the management client list
+            models.Index(fields=['date_joined', 'id'], name='user_joined_idx'),
+        ]
     
 class OTP(BaseModel):
     user = models.OneToOneField('authentication.User', related_name='otp', on_delete=models.CASCADE)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from apps.analytics.services.unread_counts import get_unread_count
 from apps.authentication.models import Profile
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -8,9 +9,11 @@ class ProfileSerializer(serializers.ModelSerializer):
     def get_notification_count(self, obj):
         """Return count of unread notifications for this profile's user."""
         if hasattr(obj, 'user') and obj.user:
-            return obj.user.notifications.filter(is_read=False).count()
+            return get_unread_count(obj.user)['total']
         return 0
 
     class Meta:
         model = Profile
         fields = '__all__'
+        # Only moved through the credit ledger (apps.authentication.services.credits)
+        read_only_fields = ('credit_accumulation',)
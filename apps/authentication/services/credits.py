@@ -0,0 +1,83 @@
+"""
+Credit ledger.
+
+Every change to ``Profile.credit_accumulation`` goes through ``apply_credit``:
+it appends a ``CreditTransaction`` and moves the balance with a single
+``UPDATE ... SET credit_accumulation = credit_accumulation + n`` in the same
+transaction, so concurrent claims never overwrite each other. An entry with an
+``idempotency_key`` already used by the profile is rejected by the unique
+constraint, which makes retried claims of one ad impression credit once.
+
+``reconcile_credit_balances`` (beat, hourly) checks each balance against the
+sum of its ledger and resets the ones that drifted.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.authentication.models import CreditTransaction, Profile
+
+logger = logging.getLogger(__name__)
+
+
+def apply_credit(profile_id: int, amount: int, reason: str, idempotency_key: str = None,
+                 ad_id: int = None) -> dict:
+    """
+    Credit (or debit, with a negative ``amount``) a profile; returns
+    ``{'applied', 'amount', 'balance'}``. When ``idempotency_key`` was already
+    applied nothing changes, and ``amount`` is the one originally applied.
+    """
+    try:
+        with transaction.atomic():
+            CreditTransaction.objects.create(
+                profile_id=profile_id, amount=amount, reason=reason,
+                idempotency_key=idempotency_key, ad_id=ad_id,
+            )
+            Profile.objects.filter(id=profile_id).update(credit_accumulation=F('credit_accumulation') + amount)
+        applied = True
+    except IntegrityError:
+        original = None
+        if idempotency_key:
+            original = CreditTransaction.objects.filter(
+                profile_id=profile_id, idempotency_key=idempotency_key
+            ).values_list('amount', flat=True).first()
+        if original is None:
+            raise
+        applied, amount = False, original
+
+    balance = Profile.objects.values_list('credit_accumulation', flat=True).get(id=profile_id)
+    return {'applied': applied, 'amount': amount, 'balance': balance}
+
+
+def _ledger_total():
+    return Coalesce(
+        Subquery(
+            CreditTransaction.objects.filter(profile=OuterRef('pk'))
+            .values('profile').annotate(total=Sum('amount')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def reconcile_credit_balances(fix: bool = True) -> list:
+    """
+    Profiles whose balance differs from their ledger, as
+    ``(profile id, balance, ledger total)``; with ``fix`` the balances are
+    reset to the ledger totals.
+    """
+    drifted = list(
+        Profile.objects.annotate(ledger_total=_ledger_total())
+        .exclude(credit_accumulation=F('ledger_total'))
+        .values_list('id', 'credit_accumulation', 'ledger_total')
+    )
+    for profile_id, balance, ledger_total in drifted:
+        logger.warning(f"Profile {profile_id} credit balance {balance} does not match its ledger ({ledger_total})")
+
+    if fix and drifted:
+        Profile.objects.filter(id__in=[profile_id for profile_id, _, _ in drifted]).update(
+            credit_accumulation=_ledger_total()
+        )
+    return drifted
@@ -0,0 +1,52 @@
+from apps.analytics.tasks.notifications import subscribe_device_topics
+from apps.authentication.models import Devices, User
+
+
+def register_device(user: User, device_id: str, fcm_token: str = None, device_type: str = None,
+                    app_version: str = None, device_os: str = None):
+    """
+    Create or update the user's device and queue its FCM topic subscriptions
+    whenever the push token is new or changed. The replaced token, and a token
+    still held by other users' devices (which are deactivated), leave their
+    old topics. Returns the device, or None when no device id was sent.
+    """
+    if not device_id:
+        return None
+
+    previous_token = ''
+    device = user.devices.filter(device_id=device_id).first()
+    if device:
+        previous_token = device.fcm_token
+        token_changed = device.fcm_token != (fcm_token or '') or not device.is_active
+        device.fcm_token = fcm_token or ''
+        device.device_type = device_type or device.device_type
+        device.app_version = app_version or device.app_version
+        device.device_os = device_os or device.device_os
+        device.is_active = True
+        device.save()
+    else:
+        device = user.devices.create(
+            device_id=device_id,
+            device_type=device_type or '',
+            app_version=app_version or '',
+            device_os=device_os or '',
+            fcm_token=fcm_token or '',
+        )
+        token_changed = True
+
+    previous_user_ids = []
+    if device.fcm_token:
+        # The app install now belongs to this user
+        taken = Devices.objects.filter(fcm_token=device.fcm_token, is_active=True).exclude(id=device.id)
+        previous_user_ids = list(
+            User.devices.through.objects
+            .filter(devices__in=taken)
+            .exclude(user=user)
+            .values_list('user_id', flat=True)
+            .distinct()
+        )
+        taken.update(is_active=False)
+
+    if token_changed and (device.fcm_token or previous_token) or previous_user_ids:
+        subscribe_device_topics.delay(device.id, previous_token, previous_user_ids)
+    return device
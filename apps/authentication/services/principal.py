@@ -0,0 +1,128 @@
+"""
+Cached authentication principals.
+
+Every ``auth_user`` column but the password hash is cached per user id in
+Redis for ``PRINCIPAL_TIMEOUT`` seconds and in a per-process LRU for
+``LOCAL_TIMEOUT`` seconds, so a cache hit skips the ``auth_user`` query.
+``principal_user`` turns a principal into a full ``User``: only ``password``
+is deferred, so views serializing ``request.user`` do not reload columns one
+by one. Views that check or set the password load the user themselves.
+
+Saving/deleting a user or changing its roles invalidates the Redis entry
+(see ``apps.authentication.signals``), as does ``sync_role_masks``; other
+processes drop their local copy within ``LOCAL_TIMEOUT``. Other queryset
+``.update()`` calls on ``User`` bypass the signals and must call
+``invalidate_principal`` for the rows they change, or the old values are
+served for up to ``PRINCIPAL_TIMEOUT``.
+"""
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+
+from apps.authentication.models import User
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_TIMEOUT = 300
+LOCAL_TIMEOUT = 15
+LOCAL_MAX_SIZE = 10000
+
+# Columns kept in the principal; only the password hash stays deferred
+PRINCIPAL_FIELDS = tuple(field.attname for field in User._meta.concrete_fields if field.attname != 'password')
+
+
+class _LocalLRU:
+    """Per-process LRU of principals with a short TTL."""
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.timeout:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_local = _LocalLRU(LOCAL_MAX_SIZE, LOCAL_TIMEOUT)
+
+
+def _principal_key(user_id) -> str:
+    return f"auth:principal:{user_id}"
+
+
+def _load_principal(user_id):
+    return User.objects.filter(id=user_id).values(*PRINCIPAL_FIELDS).first()
+
+
+def get_principal(user_id):
+    """Cached ``PRINCIPAL_FIELDS`` values for ``user_id``, or None if there is no such user."""
+
+    user_id = int(user_id)
+    principal = _local.get(user_id)
+    if principal is not None:
+        return principal
+
+    key = _principal_key(user_id)
+    try:
+        principal = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Principal cache unavailable: {str(e)}")
+        return _load_principal(user_id)
+
+    if principal is None:
+        principal = _load_principal(user_id)
+        if principal is None:
+            return None
+        cache.set(key, principal, timeout=PRINCIPAL_TIMEOUT)
+
+    _local.set(user_id, principal)
+    return principal
+
+
+def principal_user(principal) -> User:
+    """``User`` built from a principal without a query; only ``password`` loads on access."""
+
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in principal]
+    return User.from_db('default', names, [principal[name] for name in names])
+
+
+def get_principal_user(user_id):
+    principal = get_principal(user_id)
+    return principal_user(principal) if principal is not None else None
+
+
+def invalidate_principal(*user_ids) -> None:
+    for user_id in user_ids:
+        _local.delete(int(user_id))
+    try:
+        cache.delete_many([_principal_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"Could not invalidate principals {user_ids}: {str(e)}")
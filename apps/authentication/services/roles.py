@@ -0,0 +1,57 @@
+"""
+Denormalized user roles.
+
+``User.role_mask`` mirrors the ``roles`` M2M as ``ROLE_BITS`` so role filters
+(``User.objects.with_role(...)``) are single-table, indexed lookups and role
+checks need no join. M2M changes keep it in sync through signals; bulk
+inserts into the through table bypass them and must call ``sync_role_masks``.
+The tiny ``Role`` table is cached in memory for responses that still list
+full role rows.
+"""
+from apps.authentication.models import Role, User, role_mask, role_names
+from apps.authentication.services.principal import invalidate_principal
+from core.utils.cache import VersionedCache
+
+ROLES_TIMEOUT = 3600
+
+_roles_cache = VersionedCache('authentication:roles', timeout=ROLES_TIMEOUT)
+
+
+def sync_role_masks(user_ids) -> dict:
+    """
+    Recompute ``role_mask`` for ``user_ids`` from their role rows and drop
+    their cached principals; returns ``{user_id: mask}``.
+    """
+
+    names = {user_id: [] for user_id in user_ids}
+    memberships = User.roles.through.objects.filter(user_id__in=list(names)).values_list('user_id', 'role__name')
+    for user_id, name in memberships:
+        names[user_id].append(name)
+
+    masks = {user_id: role_mask(user_names) for user_id, user_names in names.items()}
+    by_mask = {}
+    for user_id, mask in masks.items():
+        by_mask.setdefault(mask, []).append(user_id)
+    for mask, ids in by_mask.items():
+        User.objects.filter(id__in=ids).update(role_mask=mask)
+    # The update bypasses the User signals
+    invalidate_principal(*masks)
+    return masks
+
+
+def _build_roles() -> dict:
+    roles = {}
+    for role in Role.objects.order_by('id').values():
+        roles.setdefault(role['name'], role)
+    return roles
+
+
+def invalidate_roles() -> None:
+    _roles_cache.bump()
+
+
+def get_user_roles(user) -> list:
+    """The user's role rows (as ``Role.objects.values()`` dicts) without joining the M2M."""
+
+    roles = _roles_cache.get(_build_roles)
+    return [roles[name] for name in role_names(user.role_mask) if name in roles]
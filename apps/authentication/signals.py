@@ -0,0 +1,89 @@
+"""
+Keep denormalized role masks, cached authentication principals and the
+``clients`` FCM topic in sync with users and roles.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.analytics.tasks.notifications import sync_client_topic_subscriptions
+from apps.authentication.models import Role, User
+from apps.authentication.services.principal import invalidate_principal
+from apps.authentication.services.roles import invalidate_roles, sync_role_masks
+
+
+# Users per mask update and per queued topic re-sync
+SYNC_CHUNK_SIZE = 1000
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.id)
+
+
+def _sync_members(user_ids) -> dict:
+    user_ids = list(user_ids)
+    masks = {}
+    for start in range(0, len(user_ids), SYNC_CHUNK_SIZE):
+        chunk = user_ids[start:start + SYNC_CHUNK_SIZE]
+        masks.update(sync_role_masks(chunk))
+        sync_client_topic_subscriptions.delay(chunk)
+    return masks
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def sync_role_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # role.users.clear(): remember the members before the rows go
+        instance._cleared_user_ids = list(instance.users.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        # Keep the in-memory user in step so a later user.save() does not write a stale mask
+        instance.role_mask = _sync_members([instance.id])[instance.id]
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_user_ids', [])
+        if user_ids:
+            _sync_members(user_ids)
+    elif pk_set:
+        # role.users.add(...)/remove(...): pk_set holds the user ids
+        _sync_members(list(pk_set))
+
+
+@receiver(pre_save, sender=Role)
+def remember_role_name(sender, instance, **kwargs):
+    instance._previous_name = (
+        Role.objects.filter(pk=instance.pk).values_list('name', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Role)
+def sync_renamed_role(sender, instance, created, **kwargs):
+    invalidate_roles()
+    # Only the name feeds the masks; description edits leave the members alone
+    if created or instance._previous_name == instance.name:
+        return
+    last_id = 0
+    while True:
+        user_ids = list(
+            instance.users.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:SYNC_CHUNK_SIZE]
+        )
+        if not user_ids:
+            return
+        last_id = user_ids[-1]
+        _sync_members(user_ids)
+
+
+@receiver(pre_delete, sender=Role)
+def remember_role_members(sender, instance, **kwargs):
+    instance._deleted_user_ids = list(instance.users.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Role)
+def sync_deleted_role(sender, instance, **kwargs):
+    invalidate_roles()
+    user_ids = getattr(instance, '_deleted_user_ids', [])
+    if user_ids:
+        _sync_members(user_ids)
@@ -0,0 +1 @@
+from .credits import reconcile_credits
@@ -0,0 +1,19 @@
+"""
+Celery task reconciling credit balances with the credit ledger.
+"""
+import logging
+
+from apps.authentication.services.credits import reconcile_credit_balances
+from farajayangu_be.celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def reconcile_credits(self):
+    """Periodic: reset profile balances that drifted from their ledger."""
+
+    drifted = reconcile_credit_balances()
+    if drifted:
+        logger.info(f"Reconciled {len(drifted)} credit balances with the ledger")
+    return {'success': True, 'reconciled': len(drifted)}
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytest
+
+from apps.advertising.models import Ad
+from apps.authentication.models import CreditTransaction, Profile, User
+from apps.authentication.services.credits import reconcile_credit_balances
+from apps.profile.serializers.profile import ProfileDetailSerializer
+
+
+@pytest.mark.django_db
+class TestCreditLedger:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        self.profile = Profile.objects.create()
+        self.user = User.objects.create_user(username="viewer", password="x", profile=self.profile)
+        self.client.force_authenticate(user=self.user)
+        self.ad = Ad.objects.create(name="Ad", uploaded_by=self.user, is_published=True)
+
+    def claim(self, **extra):
+        payload = {"time_spent_seconds": 30, "ad_id": self.ad.id, **extra}
+        return self.client.post(reverse("advertising:claim-reward"), payload, format="json")
+
+    def test_retried_claim_is_credited_once(self):
+        first = self.claim(impression_id="imp-1")
+        retry = self.claim(impression_id="imp-1")
+        other = self.client.post(
+            reverse("advertising:claim-reward"), {"time_spent_seconds": 30},
+            format="json", HTTP_IDEMPOTENCY_KEY="imp-2",
+        )
+
+        assert first.data["data"] == {"credits_earned": 10, "new_balance": 10}
+        assert retry.data["data"] == {"credits_earned": 10, "new_balance": 10}
+        assert other.data["data"]["new_balance"] == 20
+        self.profile.refresh_from_db()
+        assert self.profile.credit_accumulation == 20
+        assert list(self.profile.credit_transactions.values_list("amount", flat=True)) == [10, 10]
+
+    def test_reconciliation_resets_drifted_balances(self):
+        self.claim(impression_id="imp-1")
+        Profile.objects.filter(id=self.profile.id).update(credit_accumulation=55)
+
+        assert reconcile_credit_balances() == [(self.profile.id, 55, 10)]
+        self.profile.refresh_from_db()
+        assert self.profile.credit_accumulation == 10
+        assert reconcile_credit_balances() == []
+        assert CreditTransaction.objects.count() == 1
+
+    def test_profile_updates_cannot_write_the_balance(self):
+        self.claim(impression_id="imp-1")
+        stale = Profile.objects.get(id=self.profile.id)
+        self.claim(impression_id="imp-2")
+
+        response = self.client.post(
+            reverse("profile:profile-upload"), {"bio": "Hello", "credit_accumulation": 5000}, format="json"
+        )
+        assert response.data["data"]["profile"]["credit_accumulation"] == 20
+        # A save from an instance loaded before the last credit keeps that credit
+        serializer = ProfileDetailSerializer(stale, data={"location": "Nairobi"}, partial=True)
+        serializer.is_valid()
+        serializer.save()
+
+        self.profile.refresh_from_db()
+        assert (self.profile.bio, self.profile.location, self.profile.credit_accumulation) == ("Hello", "Nairobi", 20)
+        assert reconcile_credit_balances() == []
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+
+from apps.authentication.models import Profile, Role, User, role_names
+from apps.authentication.services import principal
+from apps.authentication.services.principal import get_principal_user
+
+
+@pytest.mark.django_db
+class TestCachedPrincipal:
+    def setup_method(self):
+        cache.clear()
+        principal._local.clear()
+        self.user = User.objects.create_user(username="viewer", password="x")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def _user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("analytics:notifications-unread-count"))
+        assert response.status_code == status.HTTP_200_OK
+        return [q["sql"] for q in queries if 'FROM "authentication_user"' in q["sql"]]
+
+    def test_repeat_requests_skip_user_lookup(self):
+        assert self._user_queries()
+        assert self._user_queries() == []
+
+    def test_role_change_and_deactivation_invalidate(self):
+        assert role_names(get_principal_user(self.user.id).role_mask) == []
+
+        self.user.roles.add(Role.objects.create(name=Role.ROLES.ADMIN, description="admin"))
+        assert role_names(get_principal_user(self.user.id).role_mask) == [Role.ROLES.ADMIN]
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse("analytics:notifications-unread-count"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_profile_is_served_without_reloading_user_columns(self):
+        self.user.profile = Profile.objects.create()
+        self.user.save()
+        self.client.get(reverse("profile:profile"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("profile:profile"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["data"]["username"] == "viewer"
+        assert not [q["sql"] for q in queries if 'FROM "authentication_user"' in q["sql"]]
+        # The profile row, the role rows and the two profile counters; no per-column reloads
+        assert len(queries) == 4
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+import pytest
+
+from apps.authentication.models import Role, User
+from apps.authentication.services.roles import get_user_roles
+
+
+@pytest.mark.django_db
+class TestRoleMask:
+    def setup_method(self):
+        cache.clear()
+        self.admin = Role.objects.create(name=Role.ROLES.ADMIN, description="admin")
+        self.client_role = Role.objects.create(name=Role.ROLES.USER, description="client")
+        self.user = User.objects.create_user(username="viewer", password="x")
+
+    def _mask(self, user):
+        return User.objects.values_list('role_mask', flat=True).get(id=user.id)
+
+    def test_mask_follows_role_changes(self):
+        self.user.roles.add(self.client_role)
+        # A save after roles.add must not write back a stale mask
+        self.user.save()
+        assert list(User.objects.with_role(Role.ROLES.USER)) == [self.user]
+
+        self.admin.users.add(self.user)
+        assert set(User.objects.with_role(Role.ROLES.ADMIN, Role.ROLES.EDITOR)) == {self.user}
+
+        self.user.roles.remove(self.client_role)
+        assert not User.objects.with_role(Role.ROLES.USER).exists()
+
+        self.admin.delete()
+        assert self._mask(self.user) == 0
+
+    def test_login_roles_come_from_mask(self):
+        self.user.roles.add(self.client_role)
+
+        roles = get_user_roles(User.objects.get(id=self.user.id))
+
+        assert [(role['id'], role['name']) for role in roles] == [(self.client_role.id, Role.ROLES.USER)]
+
+    def test_only_renames_resync_members(self, monkeypatch):
+        self.user.roles.add(self.client_role)
+        synced = []
+        monkeypatch.setattr("apps.authentication.signals.sync_role_masks", lambda ids: synced.append(ids) or {})
+
+        self.client_role.description = "viewers"
+        self.client_role.save()
+        assert synced == []
+
+        self.client_role.name = Role.ROLES.EDITOR
+        self.client_role.save()
+        assert synced == [[self.user.id]]
@@ -12,6 +12,8 @@ from rest_framework.decorators import permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from apps.authentication.models import OTP, Role, User, Profile
 from apps.authentication.serializers.user import UserSerializer
+from apps.authentication.services.devices import register_device
+from apps.authentication.services.roles import get_user_roles
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
@@ -56,7 +58,7 @@ def login(request):
                 'email': user.email,
                 'first_name': user.first_name,
                 'last_name': user.last_name,
-                'roles': user.roles.all().values(),
+                'roles': get_user_roles(user),
             }
         },
         message='Login successful'
@@ -117,7 +119,7 @@ def profile(request):
         'email': user.email,
         'first_name': user.first_name,
         'last_name': user.last_name,
-        'roles': user.roles.all().values(),
+        'roles': get_user_roles(user),
         'profile': ProfileSerializer(user.profile).data,
         'notification_count': User.notifications.filter(is_read=False).count()
     })
@@ -175,7 +177,7 @@ def verify_phone(request):
         return error_response(message='Profile not found')
     
     user.profile.is_phone_verified = True
-    user.profile.save()
+    user.profile.save(update_fields=['is_phone_verified', 'updated_at'])
     
     return success_response(data={})
 # ////////////////////////////////////////////////////////////////////////////////////////////////// #
@@ -288,6 +290,15 @@ def login_google(request):
         if not user.is_active:
             return error_response(message='User account is deactivated', code=403)
         
+        # Register the device so it joins its notification topics
+        register_device(
+            user,
+            request.data.get('device_id'),
+            fcm_token=request.data.get('fcm_token'),
+            device_type=request.data.get('device_type') or device,
+            app_version=request.data.get('app_version'),
+        )
+        
         # Generate JWT tokens
         refresh = RefreshToken.for_user(user)
         access_token = refresh.access_token
@@ -301,7 +312,7 @@ def login_google(request):
                     'email': user.email,
                     'first_name': user.first_name,
                     'last_name': user.last_name,
-                    'roles': list(user.roles.all().values()),
+                    'roles': get_user_roles(user),
                     'is_new_user': not user.profile or not user.profile.id,
                 },
                 'device': device,
@@ -458,16 +469,7 @@ def refresh(request):
     user_id = refresh['user_id']
     user = User.objects.get(id=user_id)
     
-    if device_id:
-        if user.devices.filter(device_id=device_id).count():
-            user.devices.update(fcm_token=fcm_token, device_type=device_type, app_version=app_version)
-        else:
-            user.devices.create(
-                device_id=device_id,
-                device_type=device_type,
-                app_version=app_version,
-                fcm_token=fcm_token
-            )
+    register_device(user, device_id, fcm_token=fcm_token, device_type=device_type, app_version=app_version)
     
     response = success_response(data={
         'access_token': str(access_token),
@@ -0,0 +1,113 @@
+import base64
+import binascii
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DurationField, F, Q, QuerySet, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.authentication.models import Role, User
+from apps.streaming.models import View
+
+# sort name: annotated/model field it orders by (ties broken by id); the
+# annotations read ClientActivity columns, so no sort aggregates views
+CLIENT_SORTS = {
+    'joined': 'date_joined',
+    'watch_time': 'watch_time_total',
+    'last_active': 'last_active',
+}
+DEFAULT_CLIENT_SORT = 'joined'
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_clients(
+    search: str = None,
+    provider: str = None,
+    joined_after=None,
+    joined_before=None,
+    active_since=None,
+) -> QuerySet[User]:
+    """
+    Clients with their viewing totals, read from ``ClientActivity`` (one join,
+    no GROUP BY): ``views_count``, ``watch_time_total`` and ``last_active``
+    (latest view, or the join date without views). Users written without
+    signals have no activity row until ``reconcile_client_activities`` runs;
+    they read as having no views, so they still sort and page.
+    """
+    clients = User.objects.with_role(Role.ROLES.USER)
+    if search:
+        clients = clients.filter(
+            Q(username__icontains=search) | Q(email__icontains=search)
+            | Q(first_name__icontains=search) | Q(last_name__icontains=search)
+        )
+    if provider:
+        clients = clients.filter(auth_provider=provider)
+    if joined_after:
+        clients = clients.filter(date_joined__gte=_day_start(joined_after))
+    if joined_before:
+        clients = clients.filter(date_joined__lt=_day_start(joined_before + timedelta(days=1)))
+
+    clients = clients.annotate(
+        views_count=Coalesce(F('activity__views_count'), 0),
+        watch_time_total=Coalesce(F('activity__watch_time'), Value(timedelta(0)), output_field=DurationField()),
+        last_active=Coalesce(F('activity__last_active'), F('date_joined')),
+    )
+    if active_since:
+        clients = clients.filter(last_active__gte=_day_start(active_since))
+    return clients
+
+
+def count_views_today(user_ids=None) -> dict:
+    """``{user id: views today}`` for ``user_ids`` (every user when None), in one grouped query."""
+
+    views = View.objects.filter(created_at__gte=_day_start(timezone.localdate()))
+    if user_ids is not None:
+        views = views.filter(user_id__in=user_ids)
+    return dict(views.values('user').annotate(count=Count('id')).values_list('user', 'count'))
+
+
+def with_watched_today(clients: list, counts: dict = None) -> list:
+    """Set ``watched_today`` on clients from ``counts``, by default counted for just these clients."""
+
+    if counts is None:
+        counts = count_views_today([client.id for client in clients])
+    for client in clients:
+        client.watched_today = counts.get(client.id, 0)
+    return clients
+
+
+def order_clients(queryset, sort: str = DEFAULT_CLIENT_SORT, descending: bool = True, cursor: tuple = None):
+    """Keyset page order on ``(sort key, id)``, starting after ``cursor`` when given."""
+
+    field = CLIENT_SORTS[sort]
+    if cursor:
+        value, client_id = cursor
+        after = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{after}': value}) | Q(**{field: value, f'id__{after}': client_id})
+        )
+    prefix = '-' if descending else ''
+    return queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+
+def encode_client_cursor(client, sort: str) -> str:
+    value = getattr(client, CLIENT_SORTS[sort])
+    raw_value = str(int(value.total_seconds() * 1_000_000)) if isinstance(value, timedelta) else value.isoformat()
+    return base64.urlsafe_b64encode(f'{sort}|{raw_value}|{client.id}'.encode()).decode()
+
+
+def decode_client_cursor(value: str, sort: str) -> tuple:
+    """Parse a cursor from ``encode_client_cursor`` for ``sort``; raises ``ValueError`` when malformed."""
+
+    try:
+        cursor_sort, raw_value, client_id = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+    if cursor_sort != sort:
+        raise ValueError('Cursor belongs to another sort')
+    if sort == 'watch_time':
+        return timedelta(microseconds=int(raw_value)), int(client_id)
+    return datetime.fromisoformat(raw_value), int(client_id)
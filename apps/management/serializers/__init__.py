@@ -1,2 +1,2 @@
-from apps.management.serializers.clients import ClientSerializer
+from apps.management.serializers.clients import ClientListSerializer, ClientSerializer
 from apps.management.serializers.video_ad_slot import VideoAdSlotSerializer, VideoAdSlotCreateSerializer
\ No newline at end of file
@@ -33,6 +33,28 @@ class ClientSerializer(serializers.ModelSerializer):
         return timezone.localtime(obj.date_joined).date() == local_today
 
     def get_watched_video_count_today(self, obj: User) -> int:
+        if hasattr(obj, 'watched_today'):
+            # Set by apps.management.selectors.clients.with_watched_today
+            return obj.watched_today
         today = timezone.localdate()
         # View inherits from BaseModel, which likely has a created_at field
-        return View.objects.filter(user=obj, created_at__date=today).count()
\ No newline at end of file
+        return View.objects.filter(user=obj, created_at__date=today).count()
+
+
+class ClientListSerializer(ClientSerializer):
+    """Client row of the paginated management list; reads the ``get_clients`` annotations only."""
+
+    views_count = serializers.IntegerField()
+    watch_time_seconds = serializers.SerializerMethodField()
+    last_active = serializers.DateTimeField()
+
+    class Meta(ClientSerializer.Meta):
+        fields = ClientSerializer.Meta.fields + [
+            "is_active",
+            "views_count",
+            "watch_time_seconds",
+            "last_active",
+        ]
+
+    def get_watch_time_seconds(self, obj: User) -> int:
+        return int(obj.watch_time_total.total_seconds())
@@ -30,6 +30,7 @@ class VideoAdSlotSerializer(serializers.ModelSerializer):
             'media_file_url',
             'redirect_link',
             'display_duration',
+            'weight',
             'start_time',
             'end_time',
             'created_at',
@@ -61,6 +62,7 @@ class VideoAdSlotCreateSerializer(serializers.ModelSerializer):
             'media_file',
             'redirect_link',
             'display_duration',
+            'weight',
             'start_time',
             'end_time',
             'created_at',
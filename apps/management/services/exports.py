@@ -0,0 +1,181 @@
+"""
+Analytics exports for the CMS.
+
+Exports read their rows with ``.iterator(chunk_size=EXPORT_CHUNK_SIZE)`` so
+memory stays flat however many rows there are. They are delivered either as a
+CSV streamed straight from the request (``stream_csv``) or as a CSV/Parquet
+file written by a Celery task to the default storage (``write_export``),
+which the CMS downloads through a signed link.
+"""
+from datetime import datetime, time
+import csv
+import io
+import tempfile
+import uuid
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.analytics.models import DailyRollup
+from apps.analytics.services.rollups import ROLLUP_COUNTERS
+from apps.authentication.models import Role, User
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'parquet')
+EXPORT_PATH = 'exports'
+# How long the CMS can poll a queued export
+EXPORT_TASK_TIMEOUT = 24 * 60 * 60
+
+
+def _client_rows():
+    today = timezone.localdate()
+    today_start = timezone.make_aware(datetime.combine(today, time.min))
+    clients = (
+        User.objects.with_role(Role.ROLES.USER)
+        .annotate(watched_today=Count('views', filter=Q(views__created_at__gte=today_start)))
+        .order_by('id')
+        .values_list(
+            'id', 'first_name', 'last_name', 'username', 'email', 'auth_provider',
+            'watched_today', 'date_joined', 'last_login',
+        )
+    )
+    for user_id, first_name, last_name, username, email, provider, watched_today, date_joined, last_login in (
+        clients.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ):
+        registered_today = bool(date_joined) and timezone.localtime(date_joined).date() == today
+        full_name = f'{first_name} {last_name}'.strip() or username
+        yield (user_id, full_name, email, registered_today, provider, watched_today, date_joined, last_login)
+
+
+def _daily_rollup_rows():
+    rows = DailyRollup.objects.order_by('day').values_list('day', *ROLLUP_COUNTERS)
+    yield from rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+# name: (columns as (column, type), row generator); types map to Parquet columns
+EXPORTS = {
+    'clients': (
+        (
+            ('id', 'int'), ('full_name', 'str'), ('email', 'str'), ('is_registered_today', 'bool'),
+            ('provider', 'str'), ('watched_video_count_today', 'int'), ('date_joined', 'datetime'),
+            ('last_login', 'datetime'),
+        ),
+        _client_rows,
+    ),
+    'daily_rollups': (
+        (('day', 'date'),) + tuple((counter, 'int') for counter in ROLLUP_COUNTERS),
+        _daily_rollup_rows,
+    ),
+}
+
+
+def export_columns(name: str) -> list:
+    return [column for column, _ in EXPORTS[name][0]]
+
+
+def iter_export_rows(name: str):
+    return EXPORTS[name][1]()
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, so ``csv.writer`` yields lines."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(name: str):
+    """CSV lines of export ``name`` (header first), for a ``StreamingHttpResponse``."""
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(export_columns(name))
+    for row in iter_export_rows(name):
+        yield writer.writerow(row)
+
+
+def _write_csv(name: str, file) -> int:
+    writer = csv.writer(file)
+    writer.writerow(export_columns(name))
+    rows = 0
+    for row in iter_export_rows(name):
+        writer.writerow(row)
+        rows += 1
+    return rows
+
+
+def _write_parquet(name: str, file) -> int:
+    import pyarrow
+    import pyarrow.parquet
+
+    types = {
+        'int': pyarrow.int64(), 'str': pyarrow.string(), 'bool': pyarrow.bool_(),
+        'date': pyarrow.date32(), 'datetime': pyarrow.timestamp('us', tz='UTC'),
+    }
+    schema = pyarrow.schema([(column, types[kind]) for column, kind in EXPORTS[name][0]])
+
+    def write_chunk(writer, chunk):
+        columns = list(zip(*chunk))
+        writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        ))
+
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(file, schema) as writer:
+        chunk = []
+        for row in iter_export_rows(name):
+            chunk.append(row)
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                write_chunk(writer, chunk)
+                rows += len(chunk)
+                chunk = []
+        if chunk:
+            write_chunk(writer, chunk)
+            rows += len(chunk)
+    return rows
+
+
+def write_export(name: str, export_format: str) -> dict:
+    """Write export ``name`` to the default storage; returns ``{'path', 'rows'}``."""
+
+    if name not in EXPORTS or export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export {name}.{export_format}')
+
+    filename = f"{name}-{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.{export_format}"
+    with tempfile.TemporaryFile() as file:
+        if export_format == 'csv':
+            text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+            rows = _write_csv(name, text)
+            text.flush()
+            text.detach()
+        else:
+            rows = _write_parquet(name, file)
+        file.seek(0)
+        path = default_storage.save(f'{EXPORT_PATH}/{name}/{filename}', File(file, name=filename))
+    return {'path': path, 'rows': rows}
+
+
+def _export_task_key(task_id: str) -> str:
+    return f'management:exports:{task_id}'
+
+
+def register_export_task(task_id: str, user_id: int, name: str, export_format: str) -> None:
+    """Remember an export queued by ``user_id``; only registered tasks can be polled."""
+
+    cache.set(
+        _export_task_key(task_id),
+        {'user_id': user_id, 'export': name, 'format': export_format},
+        timeout=EXPORT_TASK_TIMEOUT,
+    )
+
+
+def get_export_task(task_id: str, user_id: int):
+    """The registered export ``task_id`` of ``user_id``, or None."""
+
+    export_task = cache.get(_export_task_key(task_id))
+    if export_task is None or export_task['user_id'] != user_id:
+        return None
+    return export_task
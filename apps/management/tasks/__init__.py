@@ -0,0 +1 @@
+from .exports import generate_analytics_export
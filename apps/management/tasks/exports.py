@@ -0,0 +1,18 @@
+"""
+Celery task writing analytics exports to object storage.
+"""
+import logging
+
+from apps.management.services.exports import write_export
+from farajayangu_be.celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def generate_analytics_export(self, name, export_format):
+    """Write export ``name`` as ``export_format``; the result holds the storage path."""
+
+    export = write_export(name, export_format)
+    logger.info(f"Export {name}.{export_format} written to {export['path']} ({export['rows']} rows)")
+    return {'success': True, **export}
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytest
+
+from apps.analytics.models import ClientActivity
+from apps.authentication.models import Role, User
+from apps.streaming.models import Category, Video, View
+
+
+@pytest.mark.django_db
+class TestClientList:
+    def setup_method(self):
+        self.client = APIClient()
+        admin = User.objects.create_user(username="admin", password="x")
+        self.client.force_authenticate(user=admin)
+        role = Role.objects.create(name=Role.ROLES.USER, description="client")
+        category = Category.objects.create(name="Cat", description="d", slug="cat")
+        video = Video.objects.create(title="Video", description="desc", category=category, uploaded_by=admin)
+        self.clients = []
+        for index in range(5):
+            user = User.objects.create_user(username=f"client{index}", password="x", email=f"c{index}@x.com")
+            user.roles.add(role)
+            for _ in range(index):
+                View.objects.create(video=video, user=user, watch_time=timedelta(minutes=index))
+            self.clients.append(user)
+
+    def _list(self, **params):
+        return self.client.get(reverse("management:list-clients"), params).data["data"]
+
+    def test_keyset_pages_sorted_by_watch_time_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self._list(sort="watch_time", page_size=2)
+        # The page itself, sorted on ClientActivity without aggregating views, then today's views of the page
+        assert len(queries) == 2
+        assert "GROUP BY" not in queries[0]["sql"]
+        second = self._list(sort="watch_time", page_size=2, cursor=first["pagination"]["next_cursor"])
+        last = self._list(sort="watch_time", page_size=2, cursor=second["pagination"]["next_cursor"])
+
+        rows = first["results"] + second["results"] + last["results"]
+        assert [row["full_name"] for row in rows] == [
+            "client4", "client3", "client2", "client1", "client0",
+        ]
+        assert rows[0]["watch_time_seconds"] == 4 * 4 * 60 and rows[0]["views_count"] == 4
+        assert last["pagination"]["has_next"] is False
+
+    def test_filters_and_invalid_cursor(self):
+        data = self._list(search="client3", sort="last_active")
+        assert [row["id"] for row in data["results"]] == [self.clients[3].id]
+
+        response = self.client.get(reverse("management:list-clients"), {"sort": "joined", "cursor": "bad"})
+        assert response.status_code == 400
+
+    def test_activity_follows_view_writes(self):
+        view = View.objects.filter(user=self.clients[2]).first()
+        view.watch_time = timedelta(minutes=20)
+        view.save()
+        View.objects.filter(user=self.clients[4]).first().delete()
+
+        rows = self._list(sort="watch_time")["results"]
+        assert [(row["full_name"], row["views_count"]) for row in rows[:2]] == [("client2", 2), ("client4", 3)]
+        assert [row["watch_time_seconds"] for row in rows[:2]] == [22 * 60, 12 * 60]
+
+    def test_clients_without_activity_rows_still_page(self):
+        ClientActivity.objects.filter(user=self.clients[0]).delete()
+
+        for sort in ("watch_time", "last_active"):
+            rows = []
+            cursor = None
+            while True:
+                params = {"sort": sort, "order": "asc", "page_size": 1}
+                if cursor:
+                    params["cursor"] = cursor
+                data = self._list(**params)
+                rows += data["results"]
+                cursor = data["pagination"]["next_cursor"]
+                if not cursor:
+                    break
+            assert sorted(row["id"] for row in rows) == sorted(client.id for client in self.clients)
+            missing = next(row for row in rows if row["id"] == self.clients[0].id)
+            assert (missing["views_count"], missing["watch_time_seconds"]) == (0, 0)
+
+    def test_dashboard_client_stats_keep_their_list_shape(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.client.get(reverse("management:get-dashboard-client-stats")).data["data"]
+
+        # The clients, then today's views of all of them
+        assert len(queries) == 2
+        by_id = {row["id"]: row for row in rows}
+        assert set(by_id) == {client.id for client in self.clients}
+        assert by_id[self.clients[4].id]["watched_video_count_today"] == 4
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytest
+
+from apps.authentication.models import Role, User
+from apps.management import views
+from apps.management.services.exports import write_export
+
+IN_MEMORY_STORAGES = {**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"}}
+
+
+@pytest.mark.django_db
+class TestAnalyticsExports:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        role = Role.objects.create(name=Role.ROLES.USER, description="client")
+        for index in range(3):
+            User.objects.create_user(username=f"client{index}", password="x", email=f"c{index}@x.com").roles.add(role)
+        self.admin = User.objects.create_user(username="admin", password="x")
+        self.client.force_authenticate(user=self.admin)
+
+    def test_clients_csv_is_streamed(self):
+        response = self.client.get(reverse("management:stream-analytics-export", args=["clients"]))
+
+        assert response.streaming
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert lines[0].startswith("id,full_name,email")
+        assert len(lines) == 4
+
+    @override_settings(STORAGES=IN_MEMORY_STORAGES)
+    def test_export_written_to_storage(self):
+        export = write_export("clients", "csv")
+
+        assert export["rows"] == 3
+        with default_storage.open(export["path"]) as file:
+            assert file.read().decode().count("@x.com") == 3
+
+    @override_settings(STORAGES=IN_MEMORY_STORAGES)
+    def test_only_own_queued_exports_can_be_polled(self, monkeypatch):
+        response = self.client.post(reverse("management:create-analytics-export"), {"export": "clients"}, format="json")
+        task_id = response.data["data"]["task_id"]
+
+        # Eager tasks (see conftest) store no result, so stand in for the result backend
+        class Result:
+            state = "SUCCESS"
+            result = write_export("clients", "csv")
+
+            def __init__(self, task_id, app=None):
+                pass
+
+            def successful(self):
+                return True
+
+            def failed(self):
+                return False
+
+        monkeypatch.setattr(views, "AsyncResult", Result)
+        export = self.client.get(reverse("management:get-analytics-export", args=[task_id])).data["data"]
+        assert (export["export"], export["status"], export["rows"]) == ("clients", "SUCCESS", 3)
+
+        unknown = self.client.get(reverse("management:get-analytics-export", args=["some-other-task"]))
+        assert unknown.status_code == 404
+        self.client.force_authenticate(user=User.objects.create_user(username="other", password="x"))
+        assert self.client.get(reverse("management:get-analytics-export", args=[task_id])).status_code == 404
+
+    def test_queueing_failure_is_reported_as_unavailable(self, monkeypatch):
+        def broker_down(*args, **kwargs):
+            raise ConnectionError("broker down")
+
+        monkeypatch.setattr(views.generate_analytics_export, "delay", broker_down)
+        response = self.client.post(reverse("management:create-analytics-export"), {"export": "clients"}, format="json")
+
+        assert response.status_code == 503
+        assert response.data["message"] == "Could not queue the export. Please try again later."
@@ -6,7 +6,11 @@ app_name = 'management'
 urlpatterns = [
     path('summary/', views.get_dashboard_summary, name='get-dashboard-summary'),
     path('clients-stats/', views.get_dashboard_client_stats, name='get-dashboard-client-stats'),
+    path('clients/', views.list_clients, name='list-clients'),
     path('dashboard-analytics-chart/', views.get_dashboard_analytics_chart, name='get-dashboard-analytics-chart'),
+    path('exports/', views.create_analytics_export, name='create-analytics-export'),
+    path('exports/<str:name>/csv/', views.stream_analytics_export, name='stream-analytics-export'),
+    path('exports/tasks/<str:task_id>/', views.get_analytics_export, name='get-analytics-export'),
     
     path('interceptor/ads/', views.get_interceptor_ads, name='get-interceptor-ads'),
     path('interceptor/ads/create/', views.create_interceptor_ad, name='create-interceptor-ad'),
@@ -1,5 +1,5 @@
-from datetime import date, timedelta
-import calendar
+
+from datetime import date
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -8,13 +8,44 @@ from core.response_wrapper import success_response, error_response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from django.utils import timezone
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Sum
+from django.http import StreamingHttpResponse
+from django.core.files.storage import default_storage
+from celery.result import AsyncResult
+import logging
 
 from apps.authentication.models import User, Role, Devices
-from apps.management.serializers import ClientSerializer, VideoAdSlotSerializer, VideoAdSlotCreateSerializer
-from apps.streaming.models import VideoAdSlot, View, Like, Comment
+from apps.management.serializers import ClientListSerializer, ClientSerializer, VideoAdSlotSerializer, VideoAdSlotCreateSerializer
+from apps.management.selectors.clients import (
+    CLIENT_SORTS,
+    DEFAULT_CLIENT_SORT,
+    count_views_today,
+    decode_client_cursor,
+    encode_client_cursor,
+    get_clients,
+    order_clients,
+    with_watched_today,
+)
+from apps.streaming.models import VideoAdSlot
 from apps.advertising.models import Ad
+from apps.advertising.services.decisions import invalidate_ad_inventory
 from apps.analytics.models import Analytics, Report, Notification
+from apps.analytics.services.rollups import get_active_user_counts, get_month_chart, get_rollup_totals
+from apps.management.services.exports import (
+    EXPORT_FORMATS,
+    EXPORTS,
+    get_export_task,
+    register_export_task,
+    stream_csv,
+)
+from apps.management.tasks.exports import generate_analytics_export
+from core.utils.hll import HLL_RELATIVE_ERROR
+from farajayangu_be.celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+CLIENTS_DEFAULT_PAGE_SIZE = 25
+CLIENTS_MAX_PAGE_SIZE = 100
 
 
 # Create your views here.
@@ -26,7 +57,7 @@ def get_dashboard_summary(request):
     """Return high-level dashboard summary stats.
 
     Includes total and period-based (year, month, today) counts for:
-    - clients (users with role USER/role id 2)
+    - clients (users with role USER)
     - views (watch events)
     - watch_time (seconds)
     - likes
@@ -37,63 +68,25 @@ def get_dashboard_summary(request):
     """
 
     today = timezone.localdate()
-    year_start = date(today.year, 1, 1)
-    month_start = date(today.year, today.month, 1)
 
-    # Base client queryset (role id 2 as in get_dashboard_client_stats)
-    clients_qs = User.objects.filter(roles__in=[2])
+    # Base client queryset
+    clients_qs = User.objects.with_role(Role.ROLES.USER)
     total_clients = clients_qs.count()
 
-    # Helper to build period stats for models using created_at
-    def period_counts_for_created(model_qs):
-        base = model_qs
-        return {
-            "total": base.count(),
-            "year": base.filter(created_at__date__gte=year_start).count(),
-            "month": base.filter(created_at__date__gte=month_start).count(),
-            "today": base.filter(created_at__date=today).count(),
-        }
-
-    # Clients / registrations use date_joined on User
-    registrations = {
-        "total": total_clients,
-        "year": clients_qs.filter(date_joined__date__gte=year_start).count(),
-        "month": clients_qs.filter(date_joined__date__gte=month_start).count(),
-        "today": clients_qs.filter(date_joined__date=today).count(),
-    }
-
-    # Views, Likes, Comments restricted to client users
-    views_qs = View.objects.filter(user__in=clients_qs)
-    likes_qs = Like.objects.filter(user__in=clients_qs)
-    comments_qs = Comment.objects.filter(user__in=clients_qs)
-
-    views = period_counts_for_created(views_qs)
-    likes = period_counts_for_created(likes_qs)
-    comments = period_counts_for_created(comments_qs)
-
-    # Active users per period (distinct viewers)
-    def active_users_counts(qs):
-        return {
-            "total": qs.values("user").distinct().count(),
-            "year": qs.filter(created_at__date__gte=year_start).values("user").distinct().count(),
-            "month": qs.filter(created_at__date__gte=month_start).values("user").distinct().count(),
-            "today": qs.filter(created_at__date=today).values("user").distinct().count(),
-        }
-
-    active_users = active_users_counts(views_qs)
+    # Views, likes, comments, watch time and registrations come from the
+    # daily rollups (one query), refreshed every few minutes by the beat job
+    rollups = get_rollup_totals(today)
 
-    # Watch time (seconds) by period
-    def watch_time_seconds(qs):
-        agg = qs.aggregate(total=Sum("watch_time"))
-        total = agg["total"]
-        return int(total.total_seconds()) if total else 0
+    registrations = {**rollups["registrations"], "total": total_clients}
+    views = rollups["views"]
+    likes = rollups["likes"]
+    comments = rollups["comments"]
+    watch_time = rollups["watch_time_seconds"]
 
-    watch_time = {
-        "total": watch_time_seconds(views_qs),
-        "year": watch_time_seconds(views_qs.filter(created_at__date__gte=year_start)),
-        "month": watch_time_seconds(views_qs.filter(created_at__date__gte=month_start)),
-        "today": watch_time_seconds(views_qs.filter(created_at__date=today)),
-    }
+    # Active users per period (distinct client viewers), merged from the
+    # rollups' HyperLogLog sketches; multi-day figures are estimates
+    active_counts = get_active_user_counts(today)
+    active_users = {period: active_counts[period] for period in ("total", "year", "month", "today")}
 
     # Average watch time per active user (seconds)
     def safe_div(num, denom):
@@ -118,27 +111,15 @@ def get_dashboard_summary(request):
     }
 
     # Retention-style metrics based on recent activity
-    last_7_start = today - timedelta(days=7)
-    last_30_start = today - timedelta(days=30)
-
-    active_last_7_days = (
-        views_qs.filter(created_at__date__gte=last_7_start)
-        .values("user")
-        .distinct()
-        .count()
-    )
-    active_last_30_days = (
-        views_qs.filter(created_at__date__gte=last_30_start)
-        .values("user")
-        .distinct()
-        .count()
-    )
+    active_last_7_days = active_counts["last_7_days"]
+    active_last_30_days = active_counts["last_30_days"]
 
     retention = {
         "active_last_7_days": active_last_7_days,
         "active_last_30_days": active_last_30_days,
         "active_last_7_days_pct": safe_div(active_last_7_days * 100, total_clients) if total_clients else 0,
         "active_last_30_days_pct": safe_div(active_last_30_days * 100, total_clients) if total_clients else 0,
+        "relative_error": round(HLL_RELATIVE_ERROR, 4),
     }
 
     # Advertising metrics
@@ -234,11 +215,119 @@ def get_dashboard_summary(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_dashboard_client_stats(request):
-    users = User.objects.filter(roles__in=[2])
+    """
+    Every client, as the bare list the CMS dashboard reads. Kept for that
+    caller; new callers page through ``list_clients`` (``management/clients/``).
+    """
+    users = list(User.objects.with_role(Role.ROLES.USER))
+    # Today's views of every client in one grouped query, not one count per row
+    with_watched_today(users, count_views_today())
     serializer = ClientSerializer(users, many=True)
     return success_response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_clients(request):
+    """
+    Clients with viewing totals, keyset-paginated.
+
+    Query parameters: ``sort`` (joined, watch_time, last_active), ``order``
+    (asc, desc), ``search``, ``provider``, ``joined_after``/``joined_before``
+    and ``active_since`` (YYYY-MM-DD), ``page_size`` and ``cursor`` (from
+    ``pagination.next_cursor``).
+    """
+    params = request.GET
+    sort = params.get('sort', DEFAULT_CLIENT_SORT)
+    order = params.get('order', 'desc')
+
+    try:
+        if sort not in CLIENT_SORTS or order not in ('asc', 'desc'):
+            raise ValueError
+        page_size = int(params.get('page_size', CLIENTS_DEFAULT_PAGE_SIZE))
+        if page_size < 1:
+            raise ValueError
+        cursor = decode_client_cursor(params['cursor'], sort) if params.get('cursor') else None
+        dates = {
+            key: date.fromisoformat(params[key]) if params.get(key) else None
+            for key in ('joined_after', 'joined_before', 'active_since')
+        }
+    except (TypeError, ValueError):
+        return error_response('Invalid query parameters', code=400)
+
+    page_size = min(page_size, CLIENTS_MAX_PAGE_SIZE)
+    clients = get_clients(search=params.get('search'), provider=params.get('provider'), **dates)
+    rows = list(order_clients(clients, sort, descending=order == 'desc', cursor=cursor)[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = with_watched_today(rows[:page_size])
+
+    return success_response({
+        'results': ClientListSerializer(rows, many=True).data,
+        'pagination': {
+            'page_size': page_size,
+            'has_next': has_next,
+            'next_cursor': encode_client_cursor(rows[-1], sort) if has_next else None,
+        },
+    }, message='Clients loaded successfully.')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stream_analytics_export(request, name):
+    """Stream export ``name`` as CSV, row by row, without building it in memory."""
+
+    if name not in EXPORTS:
+        return error_response(f'Unknown export {name}')
+
+    filename = f"{name}-{timezone.localdate().isoformat()}.csv"
+    response = StreamingHttpResponse(stream_csv(name), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_analytics_export(request):
+    """Queue a CSV/Parquet export to storage; poll ``get_analytics_export`` for the link."""
+
+    name = request.data.get('export')
+    export_format = request.data.get('format', 'csv')
+    if name not in EXPORTS:
+        return error_response(f"Unknown export, expected one of: {', '.join(EXPORTS)}")
+    if export_format not in EXPORT_FORMATS:
+        return error_response(f"Unknown format, expected one of: {', '.join(EXPORT_FORMATS)}")
+
+    try:
+        task = generate_analytics_export.delay(name, export_format)
+    except Exception as e:
+        logger.error(f"Could not queue export {name}.{export_format}: {str(e)}", exc_info=True)
+        return error_response('Could not queue the export. Please try again later.', code=503)
+
+    register_export_task(task.id, request.user.id, name, export_format)
+    return success_response({'task_id': task.id, 'export': name, 'format': export_format}, message='Export queued')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_analytics_export(request, task_id):
+    """Status of a queued export, with a fresh signed download link once it is written."""
+
+    export_task = get_export_task(task_id, request.user.id)
+    if export_task is None:
+        return error_response('Export not found', code=404)
+
+    result = AsyncResult(task_id, app=celery_app)
+    payload = {'task_id': task_id, **export_task, 'status': result.state, 'url': None, 'rows': None}
+    payload.pop('user_id')
+    if result.successful() and isinstance(result.result, dict) and 'path' in result.result:
+        export = result.result
+        payload.update(url=default_storage.url(export['path']), rows=export['rows'])
+    elif result.failed():
+        logger.error(f"Export task {task_id} failed: {result.result}")
+        payload['error'] = 'Export failed'
+    return success_response(payload)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_dashboard_analytics_chart(request):
@@ -247,66 +336,8 @@ def get_dashboard_analytics_chart(request):
     year = int(request.query_params.get("year", today.year))
     month = int(request.query_params.get("month", today.month))
 
-    # Compute first and last day of month
-    first_day = date(year, month, 1)
-    days_in_month = calendar.monthrange(year, month)[1]
-    last_day = date(year, month, days_in_month)
-
-    # Base filter by created_at date range
-    date_range = {"created_at__date__gte": first_day, "created_at__date__lte": last_day}
-
-    # Aggregate Views (count + watch time) per day
-    views_qs = (
-        View.objects.filter(**date_range)
-        .values("created_at__date")
-        .annotate(count=Count("id"), watch_time_sum=Sum("watch_time"))
-    )
-    views_by_day = {row["created_at__date"]: row["count"] for row in views_qs}
-    watch_time_by_day = {
-        row["created_at__date"]: (row["watch_time_sum"].total_seconds() if row["watch_time_sum"] else 0)
-        for row in views_qs
-    }
-
-    # Aggregate Likes per day
-    likes_qs = (
-        Like.objects.filter(**date_range)
-        .values("created_at__date")
-        .annotate(count=Count("id"))
-    )
-    likes_by_day = {row["created_at__date"]: row["count"] for row in likes_qs}
-
-    # Aggregate Comments per day
-    comments_qs = (
-        Comment.objects.filter(**date_range)
-        .values("created_at__date")
-        .annotate(count=Count("id"))
-    )
-    comments_by_day = {row["created_at__date"]: row["count"] for row in comments_qs}
-
-    # Active users per day (users with at least one view that day)
-    active_qs = (
-        View.objects.filter(**date_range)
-        .values("created_at__date")
-        .annotate(count=Count("user", distinct=True))
-    )
-    active_by_day = {row["created_at__date"]: row["count"] for row in active_qs}
-
-    # Build labels (days of month) and aligned series
-    labels = []
-    views_series = []
-    likes_series = []
-    comments_series = []
-    watch_time_series = []
-    active_users_series = []
-
-    for day in range(1, days_in_month + 1):
-        current = date(year, month, day)
-        labels.append(day)
-        views_series.append(views_by_day.get(current, 0))
-        likes_series.append(likes_by_day.get(current, 0))
-        comments_series.append(comments_by_day.get(current, 0))
-        watch_time_series.append(watch_time_by_day.get(current, 0))
-        active_users_series.append(active_by_day.get(current, 0))
+    # One grouped query per table; closed months are served from cache
+    chart = get_month_chart(year, month, today)
 
     # Month names for selector
     months = [
@@ -320,14 +351,8 @@ def get_dashboard_analytics_chart(request):
     payload = {
         "current_date": today.isoformat(),
         "months": months,
-        "labels": labels,
-        "data": {
-            "views": views_series,
-            "likes": likes_series,
-            "comments": comments_series,
-            "watch_time": watch_time_series,
-            "active_users": active_users_series,
-        },
+        "labels": chart["labels"],
+        "data": chart["data"],
         "year": year,
         "month": month,
     }
@@ -369,6 +394,7 @@ def create_interceptor_ad(request):
     serializer = VideoAdSlotCreateSerializer(data=request.data)
     if serializer.is_valid():
         ad_slot = serializer.save()
+        invalidate_ad_inventory()
         # Return full details with media URL
         response_serializer = VideoAdSlotSerializer(ad_slot, context={'request': request})
         return success_response(response_serializer.data, message='Interceptor ad created successfully')
@@ -402,6 +428,7 @@ def update_interceptor_ad(request, pk):
     serializer = VideoAdSlotCreateSerializer(ad_slot, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        invalidate_ad_inventory()
         response_serializer = VideoAdSlotSerializer(ad_slot, context={'request': request})
         return success_response(response_serializer.data, message='Interceptor ad updated successfully')
     
@@ -439,6 +466,7 @@ def delete_interceptor_ad(request, pk):
         return error_response('Interceptor ad not found', code=404)
     
     ad_slot.delete()
+    invalidate_ad_inventory()
     return success_response(message='Interceptor ad deleted successfully')
 
 
@@ -459,6 +487,7 @@ def toggle_interceptor_ad(request, pk):
     
     ad_slot.is_active = not ad_slot.is_active
     ad_slot.save(update_fields=['is_active', 'updated_at'])
+    invalidate_ad_inventory()
     
     serializer = VideoAdSlotSerializer(ad_slot, context={'request': request})
     status = 'activated' if ad_slot.is_active else 'deactivated'
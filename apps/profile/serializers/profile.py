@@ -29,6 +29,15 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
             "credit_accumulation",
             "avatar",
         )
+        # Only moved through the credit ledger (apps.authentication.services.credits)
+        read_only_fields = ("credit_accumulation",)
+
+    def update(self, instance, validated_data):
+        # Write only the sent fields, so a concurrent credit update is never overwritten
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
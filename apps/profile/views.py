@@ -49,7 +49,7 @@ def upload_profile(request):
 
         profile = Profile.objects.create()
         user.profile = profile
-        user.save()
+        user.save(update_fields=['profile'])
     else:
         profile = user.profile
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StreamingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.streaming'
+
+    def ready(self):
+        from apps.streaming import signals  # noqa: F401
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.streaming.services.comments import backfill_comment_roots
+
+
+class Command(BaseCommand):
+    help = 'Set the thread root on replies created without one (e.g. by workers still running old code during a deploy)'
+
+    def handle(self, *args, **options):
+        updated = backfill_comment_roots()
+        self.stdout.write(
+            self.style.SUCCESS(f'Backfilled thread root on {updated} replies')
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_replies_count(apps, schema_editor):
+    Comment = apps.get_model('streaming', 'Comment')
+    counts = (
+        Comment.objects
+        .filter(reply_to=OuterRef('pk'))
+        .order_by()
+        .values('reply_to')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Comment.objects.update(replies_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0011_videoadslot_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_replies_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_comment_roots(apps, schema_editor):
+    Comment = apps.get_model('streaming', 'Comment')
+
+    # Direct replies to top-level comments
+    Comment.objects.filter(
+        root__isnull=True, reply_to__isnull=False, reply_to__reply_to__isnull=True,
+    ).update(root_id=F('reply_to_id'))
+
+    # Deeper replies inherit their parent's root, one nesting level per pass
+    parent_root = Comment.objects.filter(pk=OuterRef('reply_to_id')).values('root_id')[:1]
+    while Comment.objects.filter(root__isnull=True, reply_to__root__isnull=False).update(
+        root_id=Subquery(parent_root)
+    ):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0013_commentlike_comment_likes_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='root',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_comments', to='streaming.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['root', 'created_at'], name='comment_root_created_idx'),
+        ),
+        migrations.RunPython(backfill_comment_roots, migrations.RunPython.noop),
+    ]
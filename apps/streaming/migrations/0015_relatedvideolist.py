@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:59
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0014_comment_root'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedVideoList',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('related_ids', models.JSONField(default=list)),
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='related_list', to='streaming.video')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def dedupe(apps, schema_editor):
+    """Keep the oldest Like/Dislike per (video, user) before the unique constraints are added."""
+
+    Video = apps.get_model('streaming', 'Video')
+    if schema_editor.connection.vendor == 'postgresql':
+        # Held until the constraints below commit, so no duplicate can be written in between
+        for model_name in ('Like', 'Dislike'):
+            table = schema_editor.quote_name(apps.get_model('streaming', model_name)._meta.db_table)
+            schema_editor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+    for model_name, counter in (('Like', 'likes_count'), ('Dislike', 'dislikes_count')):
+        model = apps.get_model('streaming', model_name)
+        duplicates = (
+            model.objects
+            .values('video_id', 'user_id')
+            .annotate(keep=Min('id'), rows=Count('id'))
+            .filter(rows__gt=1)
+            .order_by()
+        )
+        video_ids = set()
+        for row in duplicates.iterator():
+            model.objects.filter(video_id=row['video_id'], user_id=row['user_id']).exclude(id=row['keep']).delete()
+            video_ids.add(row['video_id'])
+        for video_id in video_ids:
+            Video.objects.filter(id=video_id).update(**{counter: model.objects.filter(video_id=video_id).count()})
+
+
+class Migration(migrations.Migration):
+    # Dedupe and constraints run in one transaction, with Like/Dislike writes blocked throughout
+
+    dependencies = [
+        ('streaming', '0015_relatedvideolist'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dislike',
+            constraint=models.UniqueConstraint(fields=('video', 'user'), name='dislike_video_user_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('video', 'user'), name='like_video_user_uniq'),
+        ),
+    ]
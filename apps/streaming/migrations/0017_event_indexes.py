@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+from core.utils.migrations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Concurrent index builds cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('streaming', '0016_dedupe_likes_dislikes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['video', 'created_at'], name='comment_video_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['user', 'created_at'], name='comment_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['created_at'], name='comment_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='dislike',
+            index=models.Index(fields=['user', 'created_at'], name='dislike_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='like',
+            index=models.Index(fields=['user', 'created_at'], name='like_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='like',
+            index=models.Index(fields=['video', 'created_at'], name='like_video_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='like',
+            index=models.Index(fields=['created_at'], name='like_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='view',
+            index=models.Index(fields=['video', 'user'], name='view_video_user_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='view',
+            index=models.Index(fields=['user', 'created_at'], name='view_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='view',
+            index=models.Index(fields=['video', 'created_at'], name='view_video_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='view',
+            index=models.Index(fields=['created_at'], name='view_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0017_event_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoadslot',
+            name='weight',
+            field=models.PositiveIntegerField(default=1, help_text='Relative share of ad breaks; 0 pauses the ad'),
+        ),
+    ]
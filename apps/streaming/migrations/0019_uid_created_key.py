@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:52
+
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+from core.utils.migrations import AddUniqueConstraintConcurrently
+
+
+class Migration(migrations.Migration):
+    # Concurrent index builds cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('streaming', '0018_videoadslot_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # uid is unique per created_at, as a partitioned table can enforce it; built before
+        # the uid-only constraint is dropped
+        AddUniqueConstraintConcurrently(
+            model_name='view',
+            constraint=models.UniqueConstraint(fields=('uid', 'created_at'), name='streaming_view_uid_created_key'),
+        ),
+        migrations.AlterField(
+            model_name='view',
+            name='uid',
+            field=models.UUIDField(default=uuid.uuid4),
+        ),
+    ]
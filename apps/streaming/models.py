@@ -1,3 +1,5 @@
+from uuid import uuid4
+
 from django.db import models
 from apps.common.models import TimeStampedModel
 from core.base_model import BaseModel
@@ -73,16 +75,51 @@ class Comment(BaseModel):
     user = models.ForeignKey('authentication.User', related_name='comments', on_delete=models.CASCADE)
     comment = models.TextField()
     reply_to = models.ForeignKey('self', related_name='replies', on_delete=models.CASCADE, null=True, blank=True)
+    # Top-level comment of the thread (null for top-level comments), lets a
+    # whole thread be loaded with one ordered query
+    root = models.ForeignKey('self', related_name='thread_comments', on_delete=models.CASCADE, null=True, blank=True)
     interaction_time = models.DurationField(null=True, blank=True)
+    # Denormalized, kept in sync when replies/likes are created/deleted
+    replies_count = models.PositiveIntegerField(default=0)
+    likes_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['root', 'created_at'], name='comment_root_created_idx'),
+            models.Index(fields=['video', 'created_at'], name='comment_video_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='comment_user_created_idx'),
+            models.Index(fields=['created_at'], name='comment_created_idx'),
+        ]
     
     def __str__(self):
         return self.comment
+
+
+class CommentLike(BaseModel):
+    comment = models.ForeignKey(Comment, related_name='likes', on_delete=models.CASCADE)
+    user = models.ForeignKey('authentication.User', related_name='comment_likes', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('comment', 'user')
+
+    def __str__(self):
+        return f'{self.user} likes comment {self.comment_id}'
     
 
 class Like(BaseModel):
     video = models.ForeignKey(Video, related_name='likes', on_delete=models.CASCADE)
     user = models.ForeignKey('authentication.User', related_name='likes', on_delete=models.CASCADE)
     interaction_time = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'user'], name='like_video_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='like_user_created_idx'),
+            models.Index(fields=['video', 'created_at'], name='like_video_created_idx'),
+            models.Index(fields=['created_at'], name='like_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.user} likes {self.video}'
@@ -91,6 +128,14 @@ class Dislike(BaseModel):
     video = models.ForeignKey(Video, related_name='dislikes', on_delete=models.CASCADE)
     user = models.ForeignKey('authentication.User', related_name='dislikes', on_delete=models.CASCADE)
     interaction_time = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'user'], name='dislike_video_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='dislike_user_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.user} dislikes {self.video}'
@@ -100,10 +145,35 @@ class View(BaseModel):
     video = models.ForeignKey(Video, related_name='views', on_delete=models.CASCADE)
     user = models.ForeignKey('authentication.User', related_name='views', on_delete=models.CASCADE)
     watch_time = models.DurationField(null=True, blank=True)
+    # Partitioned tables only enforce uniqueness together with the partition key
+    uid = models.UUIDField(default=uuid4)
+
+    class Meta:
+        # Monthly range-partitioned by created_at on PostgreSQL (see partition_event_tables). The
+        # partitioned primary key is (id, created_at); rows are still addressed by id alone, which
+        # the shared id sequence keeps unique.
+        indexes = [
+            models.Index(fields=['video', 'user'], name='view_video_user_idx'),
+            models.Index(fields=['user', 'created_at'], name='view_user_created_idx'),
+            models.Index(fields=['video', 'created_at'], name='view_video_created_idx'),
+            models.Index(fields=['created_at'], name='view_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uid', 'created_at'], name='streaming_view_uid_created_key'),
+        ]
     
     def __str__(self):
         return f'{self.user} views {self.video}'
 
+class RelatedVideoList(BaseModel):
+    """Precomputed related-video neighbors (top-K video ids, best first)."""
+
+    video = models.OneToOneField(Video, related_name='related_list', on_delete=models.CASCADE)
+    related_ids = models.JSONField(default=list)
+
+    def __str__(self):
+        return f'{self.video} related videos'
+
 class VideoAdSlot(BaseModel):
     """Interceptor ad slot - defines when an ad break should occur during video playback."""
     
@@ -128,6 +198,7 @@ class VideoAdSlot(BaseModel):
                                     help_text='URL to redirect when ad is clicked')
     display_duration = models.PositiveIntegerField(default=5,
                                                    help_text='Duration in seconds to display the ad (for images)')
+    weight = models.PositiveIntegerField(default=1, help_text='Relative share of ad breaks; 0 pauses the ad')
     
     # Timing fields
     start_time = models.TimeField(help_text='When the ad should appear during video playback')
@@ -0,0 +1,62 @@
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from apps.streaming.models import Comment, CommentLike, Video
+
+
+def get_top_level_comments(video: Video) -> QuerySet[Comment]:
+    """Top-level comments for a video with author and avatar joined in."""
+    return (
+        Comment.objects
+        .filter(video=video, reply_to__isnull=True)
+        .select_related('user__profile')
+        .order_by('-created_at')
+    )
+
+
+def get_comment_replies(comment: Comment) -> QuerySet[Comment]:
+    """Direct replies to a comment with author and avatar joined in."""
+    return (
+        Comment.objects
+        .filter(reply_to=comment)
+        .select_related('user__profile')
+        .order_by('created_at')
+    )
+
+
+
+def get_thread_comments(root: Comment) -> QuerySet[Comment]:
+    """Every reply in a thread (any depth), oldest first, in one query."""
+    return (
+        Comment.objects
+        .filter(root=root)
+        .select_related('user__profile')
+        .order_by('created_at', 'id')
+    )
+
+
+def get_thread_previews(root_ids, replies_per_thread: int) -> QuerySet[Comment]:
+    """The first ``replies_per_thread`` replies of each thread in ``root_ids``, in one query."""
+    return (
+        Comment.objects
+        .filter(root_id__in=root_ids)
+        .select_related('user__profile')
+        .annotate(thread_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('root_id')],
+            order_by=[F('created_at').asc(), F('id').asc()],
+        ))
+        .filter(thread_rank__lte=replies_per_thread)
+        .order_by('root_id', 'thread_rank')
+    )
+
+
+def get_liked_comment_ids(user, comment_ids) -> set:
+    """Return which of ``comment_ids`` the user liked, in a single IN query."""
+    if not comment_ids or not getattr(user, 'is_authenticated', False):
+        return set()
+    return set(
+        CommentLike.objects
+        .filter(user=user, comment_id__in=comment_ids)
+        .values_list('comment_id', flat=True)
+    )
@@ -22,6 +22,9 @@ class CategorySerializer(serializers.ModelSerializer):
     
     def get_video_count(self, obj):
         """Return total number of published videos in this category"""
+        published_video_count = getattr(obj, 'published_video_count', None)
+        if published_video_count is not None:
+            return published_video_count
         return obj.videos.filter(is_published=True, processing_status='completed').count()
     
     def get_videos(self, obj):
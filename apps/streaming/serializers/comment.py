@@ -6,9 +6,7 @@ from apps.streaming.models import Comment
 class CommentSerializer(serializers.ModelSerializer):
     author_name = serializers.SerializerMethodField()
     author_avatar = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
-    replies_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
@@ -40,14 +38,10 @@ class CommentSerializer(serializers.ModelSerializer):
         except ValueError:
             return None
 
-    def get_likes_count(self, obj):  # placeholder, no comment-like model yet
-        return 0
-
-    def get_is_liked(self, obj):  # placeholder, frontend can treat as false
-        return False
-
-    def get_replies_count(self, obj):
-        return obj.replies.count()
+    def get_is_liked(self, obj):
+        # Resolved in one batch by the view (see get_liked_comment_ids)
+        liked_comment_ids = self.context.get("liked_comment_ids")
+        return obj.id in liked_comment_ids if liked_comment_ids else False
 
 
 class ReplySerializer(CommentSerializer):
@@ -62,3 +56,10 @@ class ReplySerializer(CommentSerializer):
             "likes_count",
             "is_liked",
         )
+
+
+class ThreadReplySerializer(ReplySerializer):
+    """Reply inside a thread; ``reply_to`` lets the client nest deeper replies."""
+
+    class Meta(ReplySerializer.Meta):
+        fields = ReplySerializer.Meta.fields + ("reply_to",)
@@ -0,0 +1,129 @@
+"""
+Cached category tree.
+
+Categories change rarely but are read on nearly every app screen, so the whole
+tree (with published video counts and the most viewed videos per category) is
+built in a handful of queries and kept in memory behind a version key.
+"""
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from apps.streaming.models import Category, Video
+from apps.streaming.serializers.category import CategorySerializer
+from apps.streaming.serializers.video import VideoLightSerializer
+from core.utils.cache import SIGNED_URL_CACHE_TIMEOUT, VersionedCache
+
+# Most viewed videos kept per category; larger requests fall back to the DB
+CATEGORY_TREE_VIDEO_LIMIT = 50
+
+CATEGORY_TREE_TIMEOUT = SIGNED_URL_CACHE_TIMEOUT
+
+_category_tree_cache = VersionedCache('streaming:category_tree', timeout=CATEGORY_TREE_TIMEOUT)
+
+PUBLISHED_VIDEOS = Q(videos__is_published=True, videos__processing_status='completed')
+
+
+def _build_category_tree() -> dict:
+    """Build the denormalized tree: one query for categories, one for top videos."""
+
+    categories = (
+        Category.objects
+        .select_related('parent')
+        .annotate(published_video_count=Count('videos', filter=PUBLISHED_VIDEOS))
+        .order_by('id')
+    )
+    payloads = CategorySerializer(categories, many=True).data
+
+    top_videos = (
+        Video.objects
+        .filter(is_published=True, processing_status='completed', category__isnull=False)
+        .annotate(rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('category_id')],
+            order_by=F('views_count').desc(),
+        ))
+        .filter(rank__lte=CATEGORY_TREE_VIDEO_LIMIT)
+        .order_by('category_id', 'rank')
+    )
+
+    videos_by_category = {}
+    for video, data in zip(top_videos, VideoLightSerializer(top_videos, many=True).data):
+        videos_by_category.setdefault(video.category_id, []).append(dict(data))
+
+    nodes = {}
+    children = {}
+    for payload in payloads:
+        payload = dict(payload)
+        nodes[payload['id']] = payload
+        children.setdefault(payload['parent'], []).append(payload['id'])
+
+    return {
+        'order': list(nodes.keys()),
+        'nodes': nodes,
+        'children': children,
+        'videos': videos_by_category,
+    }
+
+
+def get_category_tree() -> dict:
+    """Return the cached category tree, rebuilding it when the version changed."""
+    return _category_tree_cache.get(_build_category_tree)
+
+
+def invalidate_category_tree() -> None:
+    """Bump the tree version after category or video publish/delete changes."""
+    _category_tree_cache.bump()
+
+
+def _render_node(tree: dict, category_id: int, include_videos: bool = False, video_count: int = 10,
+                 parents: bool = False) -> dict:
+    """Copy a node and attach videos/subcategories the way CategorySerializer does."""
+
+    node = dict(tree['nodes'][category_id])
+    node['videos'] = tree['videos'].get(category_id, [])[:video_count] if include_videos else None
+    node['subcategories'] = [
+        _render_node(tree, child_id, include_videos=True, video_count=video_count)
+        for child_id in tree['children'].get(category_id, [])
+    ] if parents else None
+    return node
+
+
+def list_categories(category_type: str = 'all') -> list:
+    """List categories from the cache ('all', 'parent' or 'child')."""
+
+    tree = get_category_tree()
+    nodes = (tree['nodes'][category_id] for category_id in tree['order'])
+
+    if category_type == 'parent':
+        return [dict(node) for node in nodes if node['parent'] is None]
+    if category_type == 'child':
+        return [dict(node) for node in nodes if node['parent'] is not None]
+    return [dict(node) for node in nodes]
+
+
+def get_category_payload(category_id: int, include_videos: bool = False, video_count: int = 10,
+                         parents: bool = False):
+    """Return a single category payload, or None when it does not exist."""
+
+    if include_videos and video_count > CATEGORY_TREE_VIDEO_LIMIT:
+        category = Category.objects.filter(pk=category_id).first()
+        if not category:
+            return None
+        return CategorySerializer(
+            category,
+            include_videos=include_videos,
+            video_count=video_count,
+            parents=parents,
+        ).data
+
+    tree = get_category_tree()
+    if category_id not in tree['nodes']:
+        return None
+    return _render_node(tree, category_id, include_videos=include_videos, video_count=video_count, parents=parents)
+
+
+def list_subcategories(category_id: int) -> list:
+    """Return the direct subcategories of a category from the cache."""
+
+    tree = get_category_tree()
+    return [dict(tree['nodes'][child_id]) for child_id in tree['children'].get(category_id, [])]
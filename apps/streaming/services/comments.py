@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from apps.authentication.models import User
+from apps.streaming.models import Comment, CommentLike
+
+
+def create_reply(parent: Comment, user: User, content: str) -> Comment:
+    """Create a reply and bump the parent's denormalized replies counter."""
+    with transaction.atomic():
+        reply = Comment.objects.create(
+            video_id=parent.video_id,
+            user=user,
+            comment=content,
+            reply_to=parent,
+            root_id=parent.root_id or parent.id,
+        )
+        Comment.objects.filter(id=parent.id).update(replies_count=F('replies_count') + 1)
+    return reply
+
+
+def delete_comment(comment: Comment) -> None:
+    """Delete a comment (or reply) and keep the parent's replies counter in sync."""
+    with transaction.atomic():
+        parent_id = comment.reply_to_id
+        comment.delete()
+        if parent_id:
+            Comment.objects.filter(id=parent_id, replies_count__gt=0).update(
+                replies_count=F('replies_count') - 1
+            )
+
+
+def add_comment_like(comment: Comment, user: User) -> bool:
+    """Like a comment once per user; returns True when a new like was recorded."""
+    with transaction.atomic():
+        _, created = CommentLike.objects.get_or_create(comment=comment, user=user)
+        if created:
+            Comment.objects.filter(id=comment.id).update(likes_count=F('likes_count') + 1)
+    return created
+
+
+def remove_comment_like(comment: Comment, user: User) -> bool:
+    """Remove a user's like; returns True when a like was actually removed."""
+    with transaction.atomic():
+        deleted, _ = CommentLike.objects.filter(comment=comment, user=user).delete()
+        if deleted:
+            Comment.objects.filter(id=comment.id, likes_count__gt=0).update(
+                likes_count=F('likes_count') - 1
+            )
+    return bool(deleted)
+
+
+def backfill_comment_roots() -> int:
+    """Set ``root`` on replies written without it; returns the number of rows updated."""
+    updated = Comment.objects.filter(
+        root__isnull=True, reply_to__isnull=False, reply_to__reply_to__isnull=True,
+    ).update(root_id=F('reply_to_id'))
+
+    # Deeper replies inherit their parent's root, one nesting level per pass
+    parent_root = Comment.objects.filter(pk=OuterRef('reply_to_id')).values('root_id')[:1]
+    while True:
+        level_updated = Comment.objects.filter(root__isnull=True, reply_to__root__isnull=False).update(
+            root_id=Subquery(parent_root)
+        )
+        if not level_updated:
+            break
+        updated += level_updated
+
+    return updated
@@ -0,0 +1,336 @@
+"""
+Related-videos engine.
+
+Neighbor lists are computed offline (see ``compute_related_videos`` task) from
+co-watch data, title-token similarity and category, and stored as the top-K
+video ids per video. Serving a related list is then one neighbor lookup, one
+``id__in`` fetch for cache misses and two small IN queries for the user's
+like/dislike flags.
+"""
+import logging
+import re
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from scipy import sparse
+
+from apps.authentication.models import Profile, User
+from apps.streaming.models import Dislike, Like, RelatedVideoList, Video, View
+from core.utils.cache import SIGNED_URL_CACHE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+RELATED_VIDEOS_TOP_K = 20
+
+# Only recent co-watch behaviour is considered
+CO_WATCH_WINDOW_DAYS = 180
+
+# Score weights (co-watch and title scores are cosine similarities in [0, 1])
+CO_WATCH_WEIGHT = 1.0
+TITLE_WEIGHT = 0.5
+SAME_CATEGORY_BONUS = 0.3
+SAME_PARENT_CATEGORY_BONUS = 0.1
+
+# Tokens present in more than this share of titles carry no signal
+MAX_TOKEN_DOCUMENT_RATIO = 0.1
+
+# Similarities are computed for this many videos at a time and only the best
+# SIMILAR_CANDIDATES per video are kept, so memory stays O(videos x candidates)
+SIMILARITY_BLOCK_SIZE = 500
+SIMILAR_CANDIDATES = 5 * RELATED_VIDEOS_TOP_K
+# Users who watched more videos than this (bulk watchers, crawlers) add
+# quadratically many co-watch pairs and little signal, so they are left out
+CO_WATCH_MAX_USER_VIDEOS = 500
+
+TOKEN_PATTERN = re.compile(r'\w{3,}', re.UNICODE)
+
+# Shared part of a related-video card (embeds signed storage URLs)
+VIDEO_CARD_TIMEOUT = min(10 * 60, SIGNED_URL_CACHE_TIMEOUT)
+VIDEO_CARD_KEY = 'streaming:video_card:{}'
+
+
+def _published_videos():
+    return Video.objects.filter(is_published=True, processing_status='completed')
+
+
+def _co_watch_matrix(video_index: dict, since) -> sparse.csr_matrix:
+    """
+    Binary users x videos matrix from View rows and Profile.videos_watched,
+    without the users whose history cannot or should not pair videos.
+    """
+
+    user_index = {}
+    rows = []
+    cols = []
+
+    def add(user_id, video_id):
+        col = video_index.get(video_id)
+        if col is None:
+            return
+        rows.append(user_index.setdefault(user_id, len(user_index)))
+        cols.append(col)
+
+    views = (
+        View.objects
+        .filter(created_at__gte=since)
+        .values_list('user_id', 'video_id')
+        .distinct()
+    )
+    for user_id, video_id in views.iterator(chunk_size=10000):
+        add(user_id, video_id)
+
+    profile_users = dict(User.objects.filter(profile__isnull=False).values_list('profile_id', 'id'))
+    watched = Profile.videos_watched.through.objects.values_list('profile_id', 'video_id')
+    for profile_id, video_id in watched.iterator(chunk_size=10000):
+        user_id = profile_users.get(profile_id)
+        if user_id is not None:
+            add(user_id, video_id)
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(max(len(user_index), 1), len(video_index)),
+    )
+    # Duplicate (user, video) pairs were summed, clamp back to binary
+    matrix.data[:] = 1.0
+    # A single watched video pairs with nothing
+    history = np.diff(matrix.indptr)
+    return matrix[(history >= 2) & (history <= CO_WATCH_MAX_USER_VIDEOS)]
+
+
+def _top_per_row(matrix: sparse.csr_matrix, keep: int) -> sparse.csr_matrix:
+    """Keep the ``keep`` largest entries of every row."""
+
+    lengths = np.diff(matrix.indptr)
+    if not len(lengths) or lengths.max() <= keep:
+        return matrix
+    data, indices, indptr = [], [], [0]
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        row_data, row_indices = matrix.data[start:end], matrix.indices[start:end]
+        if end - start > keep:
+            best = np.argpartition(-row_data, keep)[:keep]
+            row_data, row_indices = row_data[best], row_indices[best]
+        data.append(row_data)
+        indices.append(row_indices)
+        indptr.append(indptr[-1] + len(row_data))
+    return sparse.csr_matrix(
+        (np.concatenate(data), np.concatenate(indices), np.array(indptr)), shape=matrix.shape
+    )
+
+
+def _pruned_similarity(vectors: sparse.csr_matrix, keep: int = SIMILAR_CANDIDATES) -> sparse.csr_matrix:
+    """
+    ``vectors @ vectors.T`` for row vectors, computed SIMILARITY_BLOCK_SIZE rows
+    at a time with each row pruned to its ``keep`` best entries (plus itself),
+    so popular items never materialize a dense row block.
+    """
+    transposed = vectors.T.tocsc()
+    blocks = []
+    for start in range(0, vectors.shape[0], SIMILARITY_BLOCK_SIZE):
+        block = (vectors[start:start + SIMILARITY_BLOCK_SIZE] @ transposed).tocsr()
+        block.eliminate_zeros()
+        blocks.append(_top_per_row(block, keep + 1))
+    return sparse.vstack(blocks).tocsr()
+
+
+def _co_watch_similarity(watch_matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Cosine similarity between video columns of the watch matrix (best candidates only)."""
+
+    watchers = np.asarray(watch_matrix.sum(axis=0)).ravel()
+    inverse_norm = np.divide(1.0, np.sqrt(watchers), out=np.zeros_like(watchers, dtype=np.float64), where=watchers > 0)
+    # Unit-norm video vectors over users: their dot products are the cosines
+    videos = (sparse.diags(inverse_norm) @ watch_matrix.T.astype(np.float64)).tocsr()
+    return _pruned_similarity(videos)
+
+
+def _title_similarity(titles: list) -> sparse.csr_matrix:
+    """Cosine similarity of TF-IDF title vectors (common tokens dropped)."""
+
+    vocabulary = {}
+    rows = []
+    cols = []
+    for row, title in enumerate(titles):
+        for token in set(TOKEN_PATTERN.findall((title or '').lower())):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    count = len(titles)
+    if not vocabulary:
+        return sparse.csr_matrix((count, count), dtype=np.float64)
+
+    terms = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+        shape=(count, len(vocabulary)),
+    )
+    document_frequency = np.asarray((terms > 0).sum(axis=0)).ravel()
+    idf = np.log(count / document_frequency)
+    idf[document_frequency > max(2, MAX_TOKEN_DOCUMENT_RATIO * count)] = 0.0
+    terms = (terms @ sparse.diags(idf)).tocsr()
+
+    norms = np.sqrt(np.asarray(terms.multiply(terms).sum(axis=1)).ravel())
+    inverse_norm = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    terms = (sparse.diags(inverse_norm) @ terms).tocsr()
+    return _pruned_similarity(terms)
+
+
+def compute_related_video_lists(top_k: int = RELATED_VIDEOS_TOP_K) -> int:
+    """Recompute and store the top-K related video ids for every published video."""
+
+    videos = list(
+        _published_videos()
+        .values_list('id', 'title', 'category_id', 'category__parent_id', 'views_count')
+        .order_by('id')
+    )
+    if not videos:
+        return 0
+
+    video_ids = np.array([v[0] for v in videos], dtype=np.int64)
+    titles = [v[1] for v in videos]
+    categories = np.array([v[2] if v[2] is not None else -1 for v in videos], dtype=np.int64)
+    parents = np.array([v[3] if v[3] is not None else -1 for v in videos], dtype=np.int64)
+    views = np.array([v[4] for v in videos], dtype=np.int64)
+    video_index = {video_id: index for index, video_id in enumerate(video_ids.tolist())}
+
+    since = timezone.now() - timedelta(days=CO_WATCH_WINDOW_DAYS)
+    scores = (
+        CO_WATCH_WEIGHT * _co_watch_similarity(_co_watch_matrix(video_index, since))
+        + TITLE_WEIGHT * _title_similarity(titles)
+    ).tocsr()
+    scores.setdiag(0)
+    scores.eliminate_zeros()
+
+    # Most viewed videos per category, used to pad short neighbor lists
+    by_popularity = np.argsort(-views, kind='stable')
+    popular_in_category = {}
+    for index in by_popularity:
+        bucket = popular_in_category.setdefault(int(categories[index]), [])
+        if len(bucket) < top_k + 1:
+            bucket.append(int(index))
+
+    related = {}
+    for index in range(len(video_ids)):
+        start, end = scores.indptr[index], scores.indptr[index + 1]
+        candidates = scores.indices[start:end]
+        candidate_scores = scores.data[start:end].astype(np.float64)
+
+        if categories[index] != -1:
+            candidate_scores += SAME_CATEGORY_BONUS * (categories[candidates] == categories[index])
+        if parents[index] != -1:
+            candidate_scores += SAME_PARENT_CATEGORY_BONUS * (parents[candidates] == parents[index])
+
+        if len(candidates) > top_k:
+            best = np.argpartition(-candidate_scores, top_k)[:top_k]
+            candidates, candidate_scores = candidates[best], candidate_scores[best]
+        ranked = candidates[np.argsort(-candidate_scores, kind='stable')].tolist()
+
+        if len(ranked) < top_k and categories[index] != -1:
+            seen = set(ranked)
+            seen.add(index)
+            for other in popular_in_category.get(int(categories[index]), []):
+                if other not in seen:
+                    ranked.append(other)
+                    if len(ranked) == top_k:
+                        break
+
+        related[int(video_ids[index])] = video_ids[ranked].tolist()
+
+    # Rows written by this rebuild get a newer updated_at than any stale one
+    rebuilt_at = timezone.now()
+    RelatedVideoList.objects.bulk_create(
+        [RelatedVideoList(video_id=video_id, related_ids=ids) for video_id, ids in related.items()],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['video'],
+        update_fields=['related_ids', 'updated_at'],
+    )
+    RelatedVideoList.objects.filter(updated_at__lt=rebuilt_at).delete()
+
+    logger.info(f"Computed related videos for {len(related)} videos")
+    return len(related)
+
+
+def _video_card(video: Video) -> dict:
+    """User-independent part of a related-video payload."""
+
+    backend_url = getattr(settings, 'BACKEND_URL', 'https://backend.farajayangutv.co.tz')
+    category = video.category
+    parent = category.parent if category else None
+
+    return {
+        'id': video.id,
+        'uid': str(video.uid),
+        'title': video.title,
+        'description': video.description,
+        'thumbnail': video.thumbnail.url if video.thumbnail else None,
+        'duration': str(video.duration) if video.duration else None,
+        'views': video.views_count,
+        'likes_count': video.likes_count,
+        'dislikes_count': video.dislikes_count,
+        'slug': video.slug,
+        'created_at': video.created_at,
+        'parent_category_name': parent.name if parent else None,
+        'category_name': category.name if category else None,
+        'stream_url': f"{backend_url}/streaming/hls/{video.uid}/master.m3u8",
+        'is_ready': bool(video.is_ready_for_streaming),
+    }
+
+
+def invalidate_video_card(video_id: int) -> None:
+    cache.delete(VIDEO_CARD_KEY.format(video_id))
+
+
+def _get_video_cards(video_ids: list) -> list:
+    """Cards in ``video_ids`` order: cache first, one id__in fetch for misses."""
+
+    keys = {video_id: VIDEO_CARD_KEY.format(video_id) for video_id in video_ids}
+    cached = cache.get_many(list(keys.values()))
+    cards = {video_id: cached[key] for video_id, key in keys.items() if key in cached}
+
+    missing = [video_id for video_id in video_ids if video_id not in cards]
+    if missing:
+        fetched = {}
+        for video in _published_videos().select_related('category', 'category__parent').filter(id__in=missing):
+            fetched[video.id] = _video_card(video)
+        cache.set_many({keys[video_id]: card for video_id, card in fetched.items()}, timeout=VIDEO_CARD_TIMEOUT)
+        cards.update(fetched)
+
+    # Unpublished/deleted neighbors simply drop out until the next recompute
+    return [cards[video_id] for video_id in video_ids if video_id in cards]
+
+
+def get_related_videos_payload(video: Video, user=None, limit: int = RELATED_VIDEOS_TOP_K) -> list:
+    """Related-video payloads for ``video`` with the user's like/dislike flags."""
+
+    related_ids = (
+        RelatedVideoList.objects
+        .filter(video=video)
+        .values_list('related_ids', flat=True)
+        .first()
+    )
+
+    if related_ids is None:
+        # Not computed yet (e.g. new video): newest published videos in the category
+        related_ids = list(
+            _published_videos()
+            .filter(category_id=video.category_id)
+            .exclude(id=video.id)
+            .order_by('-created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+
+    cards = _get_video_cards(related_ids[:limit])
+
+    liked_ids = set()
+    disliked_ids = set()
+    if cards and user is not None and getattr(user, 'is_authenticated', False):
+        card_ids = [card['id'] for card in cards]
+        liked_ids = set(Like.objects.filter(user=user, video_id__in=card_ids).values_list('video_id', flat=True))
+        disliked_ids = set(Dislike.objects.filter(user=user, video_id__in=card_ids).values_list('video_id', flat=True))
+
+    return [
+        {**card, 'has_liked': card['id'] in liked_ids, 'has_disliked': card['id'] in disliked_ids}
+        for card in cards
+    ]
@@ -0,0 +1,15 @@
+"""
+Keep the cached category tree in sync with categories, however they are
+written (API, admin, shell).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.streaming.models import Category
+from apps.streaming.services.category_tree import invalidate_category_tree
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, instance, **kwargs):
+    invalidate_category_tree()
@@ -1,16 +1,14 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.db import close_old_connections
-from rest_framework_simplejwt.tokens import AccessToken
-from rest_framework_simplejwt.exceptions import TokenError
-from apps.authentication.models import User
+from core.utils.websocket import JWTQueryAuthMixin
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class VideoProcessorConsumer(AsyncWebsocketConsumer):
+class VideoProcessorConsumer(JWTQueryAuthMixin, AsyncWebsocketConsumer):
     group_prefix = "video_progress"
 
     async def connect(self):
@@ -49,31 +47,6 @@ class VideoProcessorConsumer(AsyncWebsocketConsumer):
         await database_sync_to_async(close_old_connections)()
         logger.info(f"VideoProcessorConsumer disconnected: {self.channel_name}")
 
-    async def authenticate(self):
-        """Authenticate user from JWT token in query string."""
-        try:
-            query_string = self.scope.get('query_string', b'').decode('utf-8')
-            params = dict(param.split('=') for param in query_string.split('&') if '=' in param)
-            token = params.get('token')
-            
-            if not token:
-                logger.warning("WebSocket connection rejected: No token provided")
-                return None
-            
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']
-            user = await database_sync_to_async(User.objects.get)(id=user_id)
-            return user
-        except TokenError as e:
-            logger.warning(f"WebSocket connection rejected: Invalid token - {str(e)}")
-            return None
-        except User.DoesNotExist:
-            logger.warning("WebSocket connection rejected: User not found")
-            return None
-        except Exception as e:
-            logger.error(f"WebSocket authentication error: {str(e)}")
-            return None
-
     async def video_progress(self, event):
         """Handle video progress updates from channel layer."""
         await self.send(text_data=json.dumps({
@@ -4,124 +4,71 @@ Celery tasks for video processing and HLS conversion.
 import os
 import logging
 from datetime import timedelta, datetime, timezone
-from celery import shared_task
-from django.conf import settings
+from celery import chord, shared_task
 from django.core.files.storage import default_storage
-from apps.analytics.models import Notification
 from apps.streaming.models import Video
 from apps.streaming.services.video_processor import VideoProcessor
+from apps.streaming.services.category_tree import invalidate_category_tree
+from apps.streaming.services.related_videos import compute_related_video_lists
 from farajayangu_be.celery import app as celery_app
-from apps.authentication.models import Devices, User
-from apps.authentication.models import Role
+from apps.analytics.services.push_notifications import (
+    NotificationTypes,
+    UserGroupTypes,
+    complete_blast,
+    create_broadcast,
+    get_template,
+    iter_audience_shards,
+    start_blast,
+)
+from apps.analytics.services.topics import segment_topic, send_topic_broadcast
+from apps.analytics.tasks.notifications import send_push_notification_shard, summarize_push_notification
 from apps.streaming.socket.utils import send_video_progress, send_video_complete, send_video_error
 logger = logging.getLogger(__name__)
 
-class UserGroupTypes:
-    ALL = "all"
-    CLIENTS = "clients"
-    ADMINS = "admins"
-    
-
-class NotificationTypes:
-    NEW_VIDEO = "new_video"
-    COMMENT_REPLY = "comment_reply"    
-
-
-def _get_users(target: UserGroupTypes):
-    if target == UserGroupTypes.ALL:
-        return User.objects.all()
-    elif target == UserGroupTypes.CLIENTS:
-        return User.objects.filter(roles__name=Role.ROLES.USER)
-    elif target == UserGroupTypes.ADMINS:
-        return User.objects.filter(roles__name=Role.ROLES.ADMIN)
-    else:
-        return User.objects.none()
-
-def _send_notification(fcm_token: str, title: str, body: str, data: dict = None):
-    """
-    Send push notification to a device via FCM.
-    
-    Args:
-        fcm_token: The device's FCM registration token
-        title: Notification title
-        body: Notification body
-        data: Optional data payload
+@celery_app.task(bind=True)
+def send_push_notification(self, target: UserGroupTypes, notification_type: NotificationTypes, title: str = None, message: str = None, metadata: dict = None, context: dict = None):
     """
-    import firebase_admin
-    from firebase_admin import messaging, credentials
+    Fan a push notification out to an audience.
     
-    # Initialize Firebase app if not already initialized
-    if not firebase_admin._apps:
-        cred = credentials.Certificate({
-            "type": "service_account",
-            "project_id": settings.FIREBASE_PROJECT_ID,
-            "private_key_id": settings.FIREBASE_PRIVATE_KEY_ID,
-            "private_key": settings.FIREBASE_PRIVATE_KEY,
-            "client_email": settings.FIREBASE_CLIENT_EMAIL,
-            "client_id": settings.FIREBASE_CLIENT_ID,
-            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-            "token_uri": "https://oauth2.googleapis.com/token",
-            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-            "client_x509_cert_url": f"https://www.googleapis.com/robot/v1/metadata/x509/{settings.FIREBASE_CLIENT_EMAIL.replace('@', '%40')}",
-        })
-        firebase_admin.initialize_app(cred)
+    ``title``/``message`` default to the template registered for the type;
+    ``context`` fills its blast-level placeholders.
     
-    # FCM requires all data values to be strings
-    string_data = {k: str(v) for k, v in (data or {}).items()}
-    
-    message = messaging.Message(
-        notification=messaging.Notification(
-            title=title,
-            body=body,
-        ),
-        data=string_data,
-        token=fcm_token,
-    )
+    A template without per-user placeholders is stored once as a
+    BroadcastNotification and, for segments backed by an FCM topic, pushed as
+    a single topic message. Otherwise sub-tasks handle ranges of user ids,
+    writing personalized inbox rows and sending tokens in batches, and a chord
+    callback records the blast's delivery stats.
+    """
+    template = get_template(notification_type, title, message)
+    template.validate(context)
     
-    try:
-        response = messaging.send(message)
-        logger.info(f"Successfully sent notification: {response}")
-        return response
-    except Exception as e:
-        logger.error(f"Failed to send notification: {e}")
-        return None
-
+    broadcast = not template.is_personalized
+    topic = segment_topic(target) if broadcast else None
+    blast = start_blast(target, notification_type, template, context, topic=topic)
     
-@celery_app.task(bind=True)
-def send_push_notification(self, target: UserGroupTypes, notification_type: NotificationTypes, title: str, message: str, metadata: dict = None):
+    if broadcast:
+        create_broadcast(target, notification_type, template, context, blast=blast)
     
-    get_users = _get_users(target)
-    sent_count = 0
-    failed_count = 0
+    if topic:
+        topic_title, topic_body = template.render(context)
+        topic_stats = send_topic_broadcast(topic, topic_title, topic_body, data=metadata)
+        complete_blast(blast.id, [], topic_stats)
+        logger.info(f"Push blast {blast.id} sent to topic '{topic}'")
+        return {'success': True, 'blast_id': blast.id, 'shards': 0}
     
-    if not title:
-        if notification_type == NotificationTypes.NEW_VIDEO:
-            title = "New Video Uploaded"
-        elif notification_type == NotificationTypes.COMMENT_REPLY:
-            title = "You have a new comment reply"
-        
-    for user in get_users:
-        devices: list[Devices] = user.devices.filter(is_active=True)
-        message = message.replace("--username--", user.username)
-        for device in devices:
-            if device.fcm_token:
-                result = _send_notification(device.fcm_token, title, message, data=metadata)
-                if result:
-                    sent_count += 1
-                else:
-                    failed_count += 1
-            print(f"Push notifications sent: {user.username} | {device.fcm_token}")
-        user.notifications.create(
-            user = user,
-            title = title,
-            message = message,
-            type = Notification.NOTIFICATION_TYPES.VIDEO if notification_type == NotificationTypes.NEW_VIDEO else Notification.NOTIFICATION_TYPES.PROMO,
-            is_read = False,
-            target_video_slug = None,
-            target_url = None
-        )
+    shards = [
+        send_push_notification_shard.s(target, notification_type, template.title, template.body, metadata, first_user_id, last_user_id, context=context, store=not broadcast)
+        for first_user_id, last_user_id in iter_audience_shards(target)
+    ]
+    if not shards:
+        complete_blast(blast.id, [])
+        logger.info(f"Push notification skipped: no users in '{target}'")
+        return {'success': True, 'blast_id': blast.id, 'shards': 0}
     
-    print(f"Push notifications sent: {sent_count}, failed: {failed_count}")
+    chord(shards)(summarize_push_notification.s(blast.id))
+    logger.info(f"Push blast {blast.id} queued for '{target}' in {len(shards)} shards")
+    return {'success': True, 'blast_id': blast.id, 'shards': len(shards)}
+
 
 @celery_app.task(bind=True)
 def convert_video_to_hls(self, video_id: int):
@@ -214,8 +161,11 @@ def convert_video_to_hls(self, video_id: int):
         
         logger.info(f"Successfully converted video {video_id} to HLS")
         
+        # Completed videos count towards category totals and top lists
+        invalidate_category_tree()
+        
         send_video_complete(video_id, "Video processing completed successfully", hls_output_dir)
-        send_push_notification(UserGroupTypes.CLIENTS, NotificationTypes.NEW_VIDEO, title=f"{video.category.name} | {video.title}", message=f"Hi, --username--! we have a new {video.category.name} video uploaded", metadata={"video_id": video_id})
+        send_push_notification(UserGroupTypes.CLIENTS, NotificationTypes.NEW_VIDEO, metadata={"video_id": video_id}, context={"category": video.category.name, "video_title": video.title})
         
         return {
             'success': True,
@@ -516,4 +466,20 @@ def cleanup_stale_chunks(self):
         
     except Exception as e:
         logger.error(f"Error during chunk cleanup: {str(e)}", exc_info=True)
-        return {'success': False, 'error': str(e)}
\ No newline at end of file
+        return {'success': False, 'error': str(e)}
+
+
+@celery_app.task(bind=True)
+def compute_related_videos(self):
+    """
+    Recompute related-video neighbor lists for every published video.
+    
+    Runs nightly; the related endpoint only reads the stored lists.
+    """
+    try:
+        computed = compute_related_video_lists()
+        logger.info(f"Related videos computed for {computed} videos")
+        return {'success': True, 'computed': computed}
+    except Exception as e:
+        logger.error(f"Error computing related videos: {str(e)}", exc_info=True)
+        return {'success': False, 'error': str(e)}
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+import pytest
+
+from apps.authentication.models import User
+from apps.streaming.models import Category, Video
+from apps.streaming.services.category_tree import get_category_tree, invalidate_category_tree, list_categories
+from core.utils.cache import VersionedCache
+
+
+@pytest.mark.django_db
+class TestCategoryTree:
+    def setup_method(self):
+        cache.clear()
+        # Drop the tree a previous test left in process memory
+        invalidate_category_tree()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="admin", password="x")
+        self.client.force_authenticate(user=self.user)
+        self.parent = Category.objects.create(name="Music", description="d", slug="music")
+        self.child = Category.objects.create(name="Live", description="d", slug="live", parent=self.parent)
+        for views_count in (5, 50, 20):
+            Video.objects.create(
+                title=f"Video {views_count}", description="desc", category=self.child, uploaded_by=self.user,
+                is_published=True, processing_status="completed", views_count=views_count,
+            )
+        Video.objects.create(title="Draft", description="desc", category=self.child, uploaded_by=self.user)
+
+    def test_tree_is_built_once_then_served_without_queries(self):
+        with CaptureQueriesContext(connection) as build:
+            tree = get_category_tree()
+        # Categories with their counts, then the top videos of every category
+        assert len(build) == 2
+        assert tree["children"] == {None: [self.parent.id], self.parent.id: [self.child.id]}
+        assert tree["nodes"][self.child.id]["video_count"] == 3
+        assert [video["views_count"] for video in tree["videos"][self.child.id]] == [50, 20, 5]
+
+        with CaptureQueriesContext(connection) as hit:
+            response = self.client.get(reverse("streaming:category-list"), {"type": "child"})
+        assert len(hit) == 0
+        assert [category["name"] for category in response.data["data"]] == ["Live"]
+
+    def test_category_save_and_delete_invalidate_the_tree(self):
+        assert [category["name"] for category in list_categories()] == ["Music", "Live"]
+
+        self.child.name = "Concerts"
+        self.child.save()
+        Category.objects.create(name="Talk", description="d", slug="talk")
+        assert [category["name"] for category in list_categories()] == ["Music", "Concerts", "Talk"]
+
+        self.child.delete()
+        assert [category["name"] for category in list_categories()] == ["Music", "Talk"]
+
+    def test_get_category_renders_cached_node_or_404(self):
+        response = self.client.get(
+            reverse("streaming:category-detail", args=[self.parent.id]),
+            {"parents_only": "true", "video_count": 2},
+        )
+        subcategory = response.data["data"]["subcategories"][0]
+        assert subcategory["name"] == "Live"
+        assert [video["views_count"] for video in subcategory["videos"]] == [50, 20]
+
+        response = self.client.get(reverse("streaming:category-detail", args=[self.child.id + 100]))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.data["message"] == "Category not found"
+
+
+class TestVersionedCache:
+    def setup_method(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {"build": self.builds}
+
+    def test_workers_share_a_payload_until_it_is_bumped(self):
+        # Two instances of one namespace stand in for two worker processes
+        first = VersionedCache("tests:versioned", check_interval=0)
+        second = VersionedCache("tests:versioned", check_interval=0)
+
+        assert first.get(self.build) == {"build": 1}
+        assert second.get(self.build) == {"build": 1}
+        assert first.get(self.build) == {"build": 1}
+
+        second.bump()
+        assert first.get(self.build) == {"build": 2}
+        assert second.get(self.build) == {"build": 2}
+        assert self.builds == 2
+
+    def test_payload_expires_after_its_timeout(self):
+        versioned = VersionedCache("tests:versioned", timeout=0, check_interval=0)
+
+        versioned.get(self.build)
+        versioned.get(self.build)
+
+        assert self.builds == 2
@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytest
+
+from apps.authentication.models import Profile, User
+from apps.streaming.models import Category, Comment, Video
+from apps.streaming.services.comments import create_reply
+
+
+@pytest.mark.django_db
+class TestCommentThreads:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="viewer", password="x", profile=Profile.objects.create())
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Cat", description="d", slug="cat")
+        self.video = Video.objects.create(title="Video", description="desc", category=category, uploaded_by=self.user)
+
+        # Three threads; the first one has two direct replies and a nested one
+        self.roots = [Comment.objects.create(video=self.video, user=self.user, comment=f"root {i}") for i in range(3)]
+        first = create_reply(self.roots[0], self.user, "reply 1")
+        create_reply(self.roots[0], self.user, "reply 2")
+        self.nested = create_reply(first, self.user, "nested")
+
+    def threads(self, **params):
+        url = reverse("streaming:stream-comment-threads", kwargs={"video_uid": self.video.uid})
+        return self.client.get(url, params).data["data"]
+
+    def test_threads_are_paginated_with_a_reply_preview(self):
+        page = self.threads(per_page=2, replies_per_comment=2)
+        assert page["has_more"] is True
+        assert [c["comment"] for c in page["comments"]] == ["root 2", "root 1"]
+
+        last = self.threads(per_page=2, page=2, replies_per_comment=2)
+        assert last["has_more"] is False
+        (thread,) = last["comments"]
+        assert thread["comment"] == "root 0"
+        assert thread["replies_count"] == 2
+        # Oldest replies of the thread, at any depth, capped per thread
+        assert [r["comment"] for r in thread["replies"]] == ["reply 1", "reply 2"]
+        assert len(self.threads(per_page=3, replies_per_comment=5)["comments"][2]["replies"]) == 3
+        assert self.threads(per_page=3, replies_per_comment=0)["comments"][2]["replies"] == []
+
+    def test_thread_expands_from_any_reply(self):
+        url = reverse("streaming:comment-thread", kwargs={"comment_id": self.nested.id})
+        data = self.client.get(url).data["data"]
+
+        assert data["comment"]["id"] == self.roots[0].id
+        replies = data["replies"]
+        assert [r["comment"] for r in replies] == ["reply 1", "reply 2", "nested"]
+        assert replies[2]["reply_to"] == replies[0]["id"]
+
+    def test_backfill_command_sets_missing_roots(self):
+        Comment.objects.filter(root__isnull=False).update(root=None)
+        out = StringIO()
+
+        call_command("backfill_comment_roots", stdout=out)
+
+        assert "Backfilled thread root on 3 replies" in out.getvalue()
+        assert set(Comment.objects.filter(reply_to__isnull=False).values_list("root_id", flat=True)) == {self.roots[0].id}
+        assert not Comment.objects.filter(reply_to__isnull=True, root__isnull=False).exists()
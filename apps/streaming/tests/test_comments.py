@@ -0,0 +1,90 @@
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+import pytest
+
+from apps.streaming.models import Video, Category, Comment
+from apps.authentication.models import User, Profile
+
+
+@pytest.mark.django_db
+class TestVideoCommentsQueryCount:
+    def setup_method(self):
+        self.client = APIClient()
+
+    def _create_video(self):
+        user = User.objects.create_user(username="uploader", password="x")
+        category = Category.objects.create(name="Cat", description="d", slug="cat")
+        return Video.objects.create(
+            title="Video",
+            description="desc",
+            category=category,
+            uploaded_by=user,
+        )
+
+    def _create_comments(self, video, count):
+        for index in range(count):
+            author = User.objects.create_user(
+                username=f"author{index}",
+                password="x",
+                profile=Profile.objects.create(),
+            )
+            comment = Comment.objects.create(video=video, user=author, comment=f"comment {index}")
+            for _ in range(2):
+                self.client.force_authenticate(user=author)
+                self.client.post(
+                    reverse("streaming:comment-replies", kwargs={"comment_id": comment.id}),
+                    {"content": "reply"},
+                    format="json",
+                )
+
+    def test_comment_list_query_count_does_not_grow_with_comments(self, django_assert_num_queries):
+        video = self._create_video()
+        self._create_comments(video, 4)
+        url = reverse("streaming:stream-comments", kwargs={"video_uid": video.uid})
+
+        # video lookup + paginator count + page of comments (author/profile joined)
+        # + one IN query resolving is_liked for the whole page
+        with django_assert_num_queries(4):
+            response = self.client.get(url, {"per_page": 4})
+
+        assert response.status_code == status.HTTP_200_OK
+        comments = response.data["data"]["comments"]
+        assert len(comments) == 4
+        assert all(comment["replies_count"] == 2 for comment in comments)
+
+    def test_deleting_reply_decrements_replies_count(self):
+        video = self._create_video()
+        self._create_comments(video, 1)
+        parent = Comment.objects.get(reply_to__isnull=True)
+        reply = parent.replies.first()
+
+        self.client.force_authenticate(user=reply.user)
+        response = self.client.delete(reverse("streaming:comment-delete", kwargs={"comment_id": reply.id}))
+
+        assert response.status_code == status.HTTP_200_OK
+        parent.refresh_from_db()
+        assert parent.replies_count == 1
+
+    def test_like_is_counted_once_and_resolved_per_user(self):
+        video = self._create_video()
+        self._create_comments(video, 1)
+        comment = Comment.objects.get(reply_to__isnull=True)
+        liker = User.objects.create_user(username="liker", password="x")
+        self.client.force_authenticate(user=liker)
+        like_url = reverse("streaming:comment-like", kwargs={"comment_id": comment.id})
+
+        self.client.post(like_url)
+        self.client.post(like_url)
+
+        comment.refresh_from_db()
+        assert comment.likes_count == 1
+
+        response = self.client.get(reverse("streaming:stream-comments", kwargs={"video_uid": video.uid}))
+        payload = response.data["data"]["comments"][0]
+        assert payload["likes_count"] == 1
+        assert payload["is_liked"] is True
+
+        self.client.delete(like_url)
+        comment.refresh_from_db()
+        assert comment.likes_count == 0
@@ -0,0 +1,27 @@
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytest
+
+from apps.streaming.models import Category, Like, Video
+from apps.authentication.models import User
+
+
+@pytest.mark.django_db
+class TestVideoLikeUniqueness:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="viewer", password="x")
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Cat", description="d", slug="cat")
+        self.video = Video.objects.create(title="Video", description="desc", category=category, uploaded_by=self.user)
+
+    def test_repeated_like_keeps_one_row(self):
+        url = reverse("streaming:stream-like", args=[self.video.uid])
+        self.client.post(url)
+        self.client.post(url)
+
+        self.video.refresh_from_db()
+        assert self.video.likes_count == 1
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Like.objects.create(video=self.video, user=self.user)
@@ -0,0 +1,55 @@
+import numpy as np
+from scipy import sparse
+import pytest
+
+from apps.authentication.models import User
+from apps.streaming.models import Category, RelatedVideoList, Video, View
+from apps.streaming.services.related_videos import _top_per_row, compute_related_video_lists
+
+
+@pytest.mark.django_db
+class TestRelatedVideoLists:
+    def setup_method(self):
+        self.users = [User.objects.create_user(username=f"viewer{i}", password="x") for i in range(3)]
+        self.videos = {}
+        for index, title in enumerate(["Safari lions", "Ocean whales", "Mountain goats", "Lions pride documentary"]):
+            category = Category.objects.create(name=f"Cat {index}", description="d", slug=f"cat-{index}")
+            self.videos[title.split()[0].lower()] = Video.objects.create(
+                title=title, description="desc", category=category, uploaded_by=self.users[0],
+                is_published=True, processing_status="completed",
+            )
+
+    def watch(self, user, *names):
+        for name in names:
+            View.objects.create(video=self.videos[name], user=user)
+
+    def related(self, name):
+        ids = RelatedVideoList.objects.get(video=self.videos[name]).related_ids
+        by_id = {video.id: key for key, video in self.videos.items()}
+        return [by_id[video_id] for video_id in ids]
+
+    def test_co_watch_ranks_before_title_similarity(self):
+        self.watch(self.users[0], "safari", "ocean")
+        self.watch(self.users[1], "safari", "ocean")
+        self.watch(self.users[2], "safari", "mountain")
+
+        assert compute_related_video_lists() == 4
+        # Shared watchers first (2 of 3 over 1 of 3), then the shared rare title token
+        assert self.related("safari") == ["ocean", "mountain", "lions"]
+        assert self.related("lions") == ["safari"]
+        assert self.related("ocean") == ["safari"]
+
+    def test_rebuild_replaces_and_drops_stale_lists(self):
+        self.watch(self.users[0], "safari", "ocean")
+        compute_related_video_lists()
+        Video.objects.filter(id=self.videos["ocean"].id).update(is_published=False)
+
+        assert compute_related_video_lists() == 3
+        assert not RelatedVideoList.objects.filter(video=self.videos["ocean"]).exists()
+        assert self.related("safari") == ["lions"]
+
+    def test_rows_are_pruned_to_their_best_entries(self):
+        matrix = sparse.csr_matrix(np.array([[0.1, 0.9, 0.5, 0.0], [0.0, 0.2, 0.0, 0.3]]))
+
+        pruned = _top_per_row(matrix, 2).toarray()
+        assert pruned.tolist() == [[0.0, 0.9, 0.5, 0.0], [0.0, 0.2, 0.0, 0.3]]
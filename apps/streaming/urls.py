@@ -10,6 +10,7 @@ urlpatterns = [
     path('categories/', views.get_categories, name='category-list'),
     path('categories/<int:pk>/', views.get_category, name='category-detail'),
     path('categories/<int:pk>/videos/', views.get_category_videos, name='category-videos'),
+    path('categories/<int:pk>/follow/', views.follow_category, name='category-follow'),
     path('subcategories/<int:category_id>/', views.get_subcategories, name='subcategory-list'),
     # path('subcategories/<int:pk>/', views.get_subcategory, name='subcategory-detail'),
     
@@ -52,8 +53,10 @@ urlpatterns = [
     path('stream/<str:video_uid>/view/', views.record_view_stream, name='stream-view'),
     path('stream/<str:video_uid>/share/', views.record_share_stream, name='stream-share'),
     path('stream/<str:video_uid>/comments/', views.video_comments_stream, name='stream-comments'),
+    path('stream/<str:video_uid>/comment-threads/', views.video_comment_threads_stream, name='stream-comment-threads'),
     path('stream/<str:video_uid>/interceptor-ads/', views.interceptor_ads, name='stream-interceptor-ads'),
     path('comments/<int:comment_id>/replies/', views.comment_replies_stream, name='comment-replies'),
+    path('comments/<int:comment_id>/thread/', views.comment_thread_stream, name='comment-thread'),
     path('comments/<int:comment_id>/like/', views.comment_like_stream, name='comment-like'),
     path('comments/<int:comment_id>/', views.delete_comment_stream, name='comment-delete'),
     
@@ -12,6 +12,9 @@ from apps.streaming.serializers.playlist import (
     PlaylistDetailSerializer,
 )
 from apps.advertising.models import Ad
+from apps.advertising.services.decisions import FEED_POOL, INTERCEPTOR_POOL, choose_ad, has_ads
+from apps.advertising.services.events import tracking_urls
+from apps.authentication.services.credits import apply_credit
 from core.response_wrapper import success_response, error_response
 from rest_framework.decorators import api_view
 from .models import Category, Video, Playlist, PlaylistVideo, Comment, VideoAdSlot
@@ -19,15 +22,32 @@ from apps.streaming.models import Like, Dislike
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.decorators import permission_classes
 from .serializers.category import CategorySerializer
-from .serializers.comment import CommentSerializer, ReplySerializer
+from .serializers.comment import CommentSerializer, ReplySerializer, ThreadReplySerializer
 from apps.streaming.tasks.tasks import convert_video_to_hls, assemble_chunks_task, delete_video_files_task
-from apps.authentication.models import Profile
+from apps.analytics.tasks.notifications import update_category_topic
+from apps.analytics.services.unread_counts import invalidate_unread
+from apps.analytics.socket.utils import send_audiences_changed
+from apps.streaming.selectors.comments import (
+    get_top_level_comments,
+    get_comment_replies,
+    get_liked_comment_ids,
+    get_thread_comments,
+    get_thread_previews,
+)
+from apps.streaming.services.comments import create_reply, delete_comment, add_comment_like, remove_comment_like
+from apps.streaming.services.related_videos import get_related_videos_payload, invalidate_video_card
+from apps.streaming.services.category_tree import (
+    get_category_payload,
+    invalidate_category_tree,
+    list_categories,
+    list_subcategories,
+)
+from apps.authentication.models import CreditTransaction, Profile
 from django.http import HttpResponse, Http404, FileResponse
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Exists, OuterRef, F, Value, Case, When, BooleanField, CharField, Q
-from django.db.models.functions import Concat, Cast
+from django.db.models import Q
 import logging
 import mimetypes
 import os
@@ -38,21 +58,20 @@ from django.shortcuts import get_object_or_404
 
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CREDIT_COST = 10
 
-def get_random_active_ad():
-    """Get a random active interceptor ad from the database."""
-    active_ads = VideoAdSlot.objects.filter(is_active=True).exclude(media_file='')
-    if not active_ads.exists():
-        return None
-    return random.choice(list(active_ads))
+
+def get_random_active_ad(user=None):
+    """Pick an active interceptor ad (payload dict), weighted by the ad decision engine."""
+    return choose_ad(INTERCEPTOR_POOL, user)
 
 
 def inject_ad_markers(playlist_content: str, video_slug: str, min_interval: int = 300) -> str:
     """
     Inject ad markers into HLS playlist for client-side ad insertion.
     
-    Uses VideoAdSlot model to get active ads and injects them at random intervals,
-    ensuring at least 5 minutes (300 seconds) between ads.
+    Picks each ad break's interceptor ad with the ad decision engine and injects
+    them at random intervals, ensuring at least 5 minutes (300 seconds) between ads.
     
     Args:
         playlist_content: Original playlist content
@@ -62,9 +81,7 @@ def inject_ad_markers(playlist_content: str, video_slug: str, min_interval: int
     Returns:
         Modified playlist with ad markers
     """
-    # Get active ads from database
-    active_ads = list(VideoAdSlot.objects.filter(is_active=True).exclude(media_file=''))
-    if not active_ads:
+    if not has_ads(INTERCEPTOR_POOL):
         print(f"No active interceptor ads found for {video_slug}")
         return playlist_content
     
@@ -116,25 +133,30 @@ def inject_ad_markers(playlist_content: str, video_slug: str, min_interval: int
                 if (next_ad_index < len(ad_insertion_points) and 
                     current_duration >= ad_insertion_points[next_ad_index]):
                     
-                    # Pick a random ad from active ads
-                    ad = random.choice(active_ads)
+                    # Pick a weighted ad from the active ads
+                    ad = get_random_active_ad()
+                    if ad is None:
+                        # No ad left within its limits, skip the remaining breaks
+                        next_ad_index = len(ad_insertion_points)
+                        new_lines.append(line)
+                        continue
                     ad_count += 1
                     
                     # Get ad duration
-                    ad_duration = ad.display_duration or 5
+                    ad_duration = ad['display_duration'] or 5
                     
                     # Inject HLS ad markers with ad metadata
                     new_lines.append(f'#EXT-X-CUE-OUT:DURATION={ad_duration}')
-                    new_lines.append(f'#EXT-X-ASSET:CAID=interceptor-{ad.id}')
+                    new_lines.append(f'#EXT-X-ASSET:CAID=interceptor-{ad["id"]}')
                     
                     # Add custom metadata for the player
-                    if ad.media_file:
-                        new_lines.append(f'#EXT-X-AD-URL:{ad.media_file.url}')
-                    if ad.redirect_link:
-                        new_lines.append(f'#EXT-X-AD-CLICK:{ad.redirect_link}')
-                    new_lines.append(f'#EXT-X-AD-TYPE:{ad.media_type}')
+                    if ad['media_url']:
+                        new_lines.append(f'#EXT-X-AD-URL:{ad["media_url"]}')
+                    if ad['redirect_link']:
+                        new_lines.append(f'#EXT-X-AD-CLICK:{ad["redirect_link"]}')
+                    new_lines.append(f'#EXT-X-AD-TYPE:{ad["media_type"]}')
                     
-                    logger.info(f"Injected ad {ad.id} at {current_duration:.1f}s for {video_slug}")
+                    logger.info(f"Injected ad {ad['id']} at {current_duration:.1f}s for {video_slug}")
                     
                     next_ad_index += 1
                     last_ad_time = current_duration
@@ -174,15 +196,8 @@ def update_category(request, pk):
 def get_categories(request):
     types: ('all', 'parent', 'child') = request.GET.get('type', 'all')
     
-    if types == 'parent':
-        categories = Category.objects.filter(parent_id=None)
-    elif types == 'child':
-        categories = Category.objects.filter(parent_id__isnull=False)
-    else:
-        categories = Category.objects.all()
-    
-    serializer = CategorySerializer(categories, many=True)
-    return success_response(serializer.data)
+    # Served from the cached category tree (no DB queries in the steady state)
+    return success_response(list_categories(types))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -191,15 +206,17 @@ def get_category(request, pk):
     video_count = int(request.GET.get('video_count', 10))
     parents = request.GET.get('parents_only', 'false').lower() == 'true'
     
-    category = Category.objects.get(pk=pk)
-    serializer = CategorySerializer(
-        category, 
-        include_videos=include_videos, 
+    payload = get_category_payload(
+        pk,
+        include_videos=include_videos,
         video_count=video_count,
         parents=parents
     )
     
-    return success_response(serializer.data)
+    if payload is None:
+        return error_response('Category not found', code=404)
+    
+    return success_response(payload)
 
 
 @api_view(['GET'])
@@ -212,10 +229,31 @@ def get_category_videos(request, pk):
 
 @api_view(['GET'])
 def get_subcategories(request, category_id):
-    subcategories = Category.objects.filter(~Q(parent=None), parent=category_id)
-    serializer = CategorySerializer(subcategories, many=True)
-    print(subcategories.values("id", "name"))
-    return success_response(serializer.data)
+    return success_response(list_subcategories(category_id))
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def follow_category(request, pk):
+    """Follow (POST) or unfollow (DELETE) a category's new-video notifications."""
+
+    profile = getattr(request.user, "profile", None)
+    if not profile:
+        return error_response({'message': 'Profile not found'})
+
+    category = Category.objects.filter(pk=pk).first()
+    if not category:
+        return error_response({'message': 'Category not found'}, code=404)
+
+    following = request.method == 'POST'
+    if following:
+        profile.followed_categories.add(category)
+    else:
+        profile.followed_categories.remove(category)
+    update_category_topic.delay(request.user.id, category.id, following)
+    invalidate_unread(request.user)
+    send_audiences_changed(request.user)
+
+    return success_response(data={'following': following}, message='Followed' if following else 'Unfollowed')
 
 @api_view(['GET'])
 def get_subcategory(request, pk):
@@ -260,21 +298,13 @@ def get_feed(request):
     if results:
         ad_segment = None
 
-        # Try to use a custom ad if available
-        custom_ad = Ad.objects.filter(is_published=True).first()
+        # Try to use a custom ad if one is eligible for this user
+        custom_ad = choose_ad(FEED_POOL, request.user)
         if custom_ad:
             ad_segment = {
                 'segment_type': 'AD',
                 'ad_render_type': 'CUSTOM',  # frontend: render custom ad
-                'ad': {
-                    'id': custom_ad.id,
-                    'name': custom_ad.name,
-                    'slug': custom_ad.slug,
-                    'type': custom_ad.type,
-                    'thumbnail': custom_ad.thumbnail.url if custom_ad.thumbnail else None,
-                    'video': custom_ad.video.url if custom_ad.video else None,
-                    'duration': custom_ad.duration.total_seconds() if custom_ad.duration else None,
-                },
+                'ad': custom_ad,
             }
         else:
             # Fallback to google ad placeholder only
@@ -520,14 +550,12 @@ def mark_video_downloaded(request, video_uid):
     if not profile:
         return error_response({'message': 'Profile not found'})
 
-    profile.credit_accumulation -= 10
-    profile.save()
-    
     try:
         video = Video.objects.get(uid=video_uid)
     except Video.DoesNotExist:
         return error_response({'message': 'Video not found'})
 
+    apply_credit(profile.id, -DOWNLOAD_CREDIT_COST, CreditTransaction.REASONS.DOWNLOAD)
     profile.downloaded_videos.add(video)
     return success_response(data={}, message='Marked as downloaded')
 
@@ -855,6 +883,9 @@ def create_video(request):
             # If Celery/Redis is not available, log the error
             message = 'Video uploaded successfully. Conversion will start when processing service is available.'
         
+        if video.is_published:
+            invalidate_category_tree()
+        
         # Return response with processing status
         response_data = serializer.data
         response_data['message'] = message
@@ -1061,6 +1092,8 @@ def update_video(request, pk):
     serializer = VideoSerializer(video, data=data)
     if serializer.is_valid():
         serializer.save()
+        invalidate_category_tree()
+        invalidate_video_card(video.id)
         return success_response(serializer.data)
     return error_response(serializer.errors)
 
@@ -1073,7 +1106,10 @@ def delete_video(request, pk):
     if video.hls_path:
         delete_video_files_task.delay(video.hls_path, str(video.uid))
     
+    video_id = video.id
     video.delete()
+    invalidate_category_tree()
+    invalidate_video_card(video_id)
     return success_response()
 
 @api_view(['GET'])
@@ -1239,10 +1275,7 @@ def interceptor_ads(request, video_uid):
             "start_time": time_to_seconds(slot.start_time),
             "end_time": time_to_seconds(slot.end_time),
             "label": "Sponsored",
-            "tracking": {
-                "impression_url": None,
-                "click_url": None,
-            },
+            "tracking": tracking_urls(request, ad_id),
         })
 
     return success_response(ads_payload)
@@ -1252,90 +1285,16 @@ def interceptor_ads(request, video_uid):
 def get_related_videos(request, video_uid):
     """Return related videos for a given video.
 
-    Uses the same payload structure as get_video_stream_url for each video.
+    Uses the same payload structure as get_video_stream_url for each video,
+    served from precomputed neighbor lists (see compute_related_videos).
     """
 
     try:
-        video = Video.objects.select_related('category').get(uid=video_uid)
+        video = Video.objects.only('id', 'category_id').get(uid=video_uid)
     except Video.DoesNotExist:
         return error_response({'message': 'Video not found'})
 
-    base_qs = (
-        Video.objects
-        .select_related('category', 'category__parent')
-        .filter(category=video.category)
-        .exclude(id=video.id)
-        .order_by('-created_at')[:20]
-    )
-
-    from django.conf import settings
-
-    backend_url = getattr(settings, 'BACKEND_URL', 'https://backend.farajayangutv.co.tz')
-    user = getattr(request, 'user', None)
-
-    # Annotate category names
-    qs = base_qs.annotate(
-        parent_category_name=F('category__parent__name'),
-        category_name=F('category__name'),
-    )
-
-    # Annotate like/dislike flags based on current user
-    if user is not None and getattr(user, 'is_authenticated', False):
-        qs = qs.annotate(
-            has_liked=Exists(Like.objects.filter(video=OuterRef('pk'), user=user)),
-            has_disliked=Exists(Dislike.objects.filter(video=OuterRef('pk'), user=user)),
-        )
-    else:
-        qs = qs.annotate(
-            has_liked=Value(False),
-            has_disliked=Value(False),
-        )
-
-    # is_ready equivalent of is_ready_for_streaming property
-    qs = qs.annotate(
-        is_ready=Case(
-            When(
-                processing_status='completed',
-                hls_master_playlist__isnull=False,
-                then=Value(True),
-            ),
-            default=Value(False),
-            output_field=BooleanField(),
-        ),
-    )
-
-    # Annotate stream_url using BACKEND_URL and uid (cast UUID to string)
-    qs = qs.annotate(
-        stream_url=Concat(
-            Value(backend_url + '/streaming/hls/'),
-            Cast('uid', output_field=CharField()),
-            Value('/master.m3u8'),
-            output_field=CharField(),
-        ),
-    )
-
-    # Build response objects so thumbnail uses the storage backend URL (v.thumbnail.url)
-    videos_payload = []
-    for v in qs:
-        videos_payload.append({
-            'id': v.id,
-            'uid': str(v.uid),
-            'title': v.title,
-            'description': v.description,
-            'thumbnail': v.thumbnail.url if v.thumbnail else None,
-            'duration': str(v.duration) if v.duration else None,
-            'views': v.views_count,
-            'likes_count': v.likes_count,
-            'dislikes_count': v.dislikes_count,
-            'slug': v.slug,
-            'created_at': v.created_at,
-            'parent_category_name': getattr(v, 'parent_category_name', None),
-            'category_name': getattr(v, 'category_name', None),
-            'has_liked': getattr(v, 'has_liked', False),
-            'has_disliked': getattr(v, 'has_disliked', False),
-            'stream_url': v.stream_url,
-            'is_ready': getattr(v, 'is_ready', False),
-        })
+    videos_payload = get_related_videos_payload(video, user=getattr(request, 'user', None))
 
     return success_response({
         'videos': videos_payload,
@@ -1491,7 +1450,8 @@ def _get_video_comments_payload(request, video_uid):
     except (TypeError, ValueError):
         per_page = 4
 
-    qs = Comment.objects.filter(video=video, reply_to__isnull=True).order_by('-created_at')
+    # Author/avatar joined in and replies_count denormalized: no per-row queries
+    qs = get_top_level_comments(video)
     paginator = Paginator(qs, per_page)
 
     try:
@@ -1503,7 +1463,9 @@ def _get_video_comments_payload(request, video_uid):
         page_obj = paginator.page(paginator.num_pages)
         page = paginator.num_pages
 
-    serializer = CommentSerializer(page_obj.object_list, many=True)
+    comments = list(page_obj.object_list)
+    liked_comment_ids = get_liked_comment_ids(request.user, [c.id for c in comments])
+    serializer = CommentSerializer(comments, many=True, context={'liked_comment_ids': liked_comment_ids})
 
     return success_response({
         'comments': serializer.data,
@@ -1561,7 +1523,7 @@ def _get_comment_replies_payload(request, comment_id):
     except (TypeError, ValueError):
         per_page = 10
 
-    qs = Comment.objects.filter(reply_to=comment).order_by('created_at')
+    qs = get_comment_replies(comment)
     paginator = Paginator(qs, per_page)
 
     try:
@@ -1573,7 +1535,9 @@ def _get_comment_replies_payload(request, comment_id):
         page_obj = paginator.page(paginator.num_pages)
         page = paginator.num_pages
 
-    serializer = ReplySerializer(page_obj.object_list, many=True)
+    replies = list(page_obj.object_list)
+    liked_comment_ids = get_liked_comment_ids(request.user, [r.id for r in replies])
+    serializer = ReplySerializer(replies, many=True, context={'liked_comment_ids': liked_comment_ids})
 
     return success_response({
         'replies': serializer.data,
@@ -1593,12 +1557,7 @@ def _post_comment_reply_payload(request, comment_id):
     if not content:
         return error_response({'message': 'content is required'})
 
-    reply = Comment.objects.create(
-        video=parent.video,
-        user=request.user,
-        comment=content,
-        reply_to=parent,
-    )
+    reply = create_reply(parent, request.user, content)
 
     serializer = ReplySerializer(reply)
     return success_response(serializer.data, message='Reply posted')
@@ -1614,25 +1573,115 @@ def comment_replies_stream(request, comment_id):
     return _post_comment_reply_payload(request, comment_id)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def comment_thread_stream(request, comment_id):
+    """Return a whole thread for `/comments/{comment_id}/thread/` in one ordered query.
+
+    Replies are flat and oldest first; `reply_to` lets the client nest them.
+    """
+
+    try:
+        comment = Comment.objects.select_related('user__profile').get(id=comment_id)
+    except Comment.DoesNotExist:
+        return error_response({'message': 'Comment not found'})
+
+    # Always expand from the top-level comment of the thread
+    if comment.root_id:
+        comment = Comment.objects.select_related('user__profile').get(id=comment.root_id)
+
+    replies = list(get_thread_comments(comment))
+    liked_comment_ids = get_liked_comment_ids(request.user, [comment.id] + [r.id for r in replies])
+    context = {'liked_comment_ids': liked_comment_ids}
+
+    return success_response({
+        'comment': CommentSerializer(comment, context=context).data,
+        'replies': ThreadReplySerializer(replies, many=True, context=context).data,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def video_comment_threads_stream(request, video_uid):
+    """Paginated top-level comments with the first K replies of each thread.
+
+    Query params:
+    - page, per_page: top-level comment pagination (default 1, 4)
+    - replies_per_comment: replies previewed per thread (default 3, max 20)
+    """
+
+    try:
+        video = Video.objects.get(uid=video_uid)
+    except Video.DoesNotExist:
+        return error_response({'message': 'Video not found'})
+
+    try:
+        page = int(request.GET.get('page', 1))
+    except (TypeError, ValueError):
+        page = 1
+
+    try:
+        per_page = int(request.GET.get('per_page', 4))
+    except (TypeError, ValueError):
+        per_page = 4
+
+    try:
+        replies_per_comment = min(max(int(request.GET.get('replies_per_comment', 3)), 0), 20)
+    except (TypeError, ValueError):
+        replies_per_comment = 3
+
+    paginator = Paginator(get_top_level_comments(video), per_page)
+
+    try:
+        page_obj = paginator.page(page)
+    except PageNotAnInteger:
+        page_obj = paginator.page(1)
+    except EmptyPage:
+        page_obj = paginator.page(paginator.num_pages)
+
+    comments = list(page_obj.object_list)
+    root_ids = [c.id for c in comments]
+
+    replies_by_root = {}
+    if root_ids and replies_per_comment:
+        for reply in get_thread_previews(root_ids, replies_per_comment):
+            replies_by_root.setdefault(reply.root_id, []).append(reply)
+
+    all_ids = root_ids + [r.id for replies in replies_by_root.values() for r in replies]
+    context = {'liked_comment_ids': get_liked_comment_ids(request.user, all_ids)}
+
+    results = []
+    for comment, data in zip(comments, CommentSerializer(comments, many=True, context=context).data):
+        data['replies'] = ThreadReplySerializer(replies_by_root.get(comment.id, []), many=True, context=context).data
+        results.append(data)
+
+    return success_response({
+        'comments': results,
+        'has_more': page_obj.has_next(),
+    })
+
+
 def _like_comment_stream(request, comment_id):
-    """Internal helper to like a comment (placeholder, no persistence)."""
+    """Internal helper to like a comment."""
 
     try:
-        Comment.objects.get(id=comment_id)
+        comment = Comment.objects.get(id=comment_id)
     except Comment.DoesNotExist:
         return error_response({'message': 'Comment not found'})
 
+    add_comment_like(comment, request.user)
     return success_response(data={}, message='Comment liked')
 
 
 def _unlike_comment_stream(request, comment_id):
-    """Internal helper to unlike a comment (placeholder)."""
+    """Internal helper to unlike a comment."""
 
     try:
-        Comment.objects.get(id=comment_id)
+        comment = Comment.objects.get(id=comment_id)
     except Comment.DoesNotExist:
         return error_response({'message': 'Comment not found'})
 
+    remove_comment_like(comment, request.user)
     return success_response(data={}, message='Comment like removed')
 
 
@@ -1656,7 +1705,7 @@ def delete_comment_stream(request, comment_id):
     except Comment.DoesNotExist:
         return error_response({'message': 'Comment not found'})
 
-    comment.delete()
+    delete_comment(comment)
     return success_response(data={}, message='Comment deleted')
 
 
@@ -0,0 +1,19 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+
+from farajayangu_be.celery import app as celery_app
+
+
+@pytest.fixture(autouse=True)
+def celery_eager():
+    """
+    Run ``.delay()``, groups and chords inline instead of through the Redis
+    broker; eager chords pass the header results to the body directly, so no
+    result backend is involved.
+    """
+    previous = {key: celery_app.conf[key] for key in ('task_always_eager', 'task_eager_propagates')}
+    celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+    yield
+    celery_app.conf.update(previous)
@@ -0,0 +1,242 @@
+"""
+Two-level (process memory + shared Redis) caching helpers.
+"""
+import logging
+import threading
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+# INCRBY only counters that exist; missing ones are rebuilt by their reader
+_INCR_EXISTING_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('INCRBY', key, ARGV[1])
+    end
+end
+return 0
+"""
+
+
+def incr_existing(keys: list, delta: int = 1) -> None:
+    """
+    Add ``delta`` to every existing counter in ``keys``.
+
+    On Redis this is one round trip for the whole list. A missing counter is
+    left missing rather than created at ``delta``, so its owner recomputes it
+    from the database on the next read.
+    """
+    if not keys:
+        return
+
+    backend = caches['default']
+    try:
+        if isinstance(backend, RedisCache):
+            client = backend._cache.get_client(write=True)
+            client.eval(_INCR_EXISTING_SCRIPT, len(keys), *[backend.make_and_validate_key(key) for key in keys], delta)
+            return
+
+        for key in keys:
+            try:
+                backend.incr(key, delta)
+            except ValueError:
+                pass
+    except Exception as e:
+        logger.warning(f"Could not update {len(keys)} cached counters: {str(e)}")
+
+
+# Payloads embedding signed storage URLs must not be served for longer than
+# half the URL lifetime after they were built (and signed): a client then
+# always receives a link that stays valid for at least the other half.
+SIGNED_URL_CACHE_TIMEOUT = getattr(settings, 'AWS_QUERYSTRING_EXPIRE', 3600) // 2
+
+
+class VersionedCache:
+    """
+    Cache a single, rarely-changing payload in process memory and in the
+    shared cache, stamped with a version counter.
+
+    Readers only do a cheap version lookup (one cache GET, at most once every
+    ``check_interval`` seconds) and serve the payload from memory while the
+    version is unchanged. Writers call ``bump()`` so every worker rebuilds or
+    reloads the payload on its next version check.
+
+    ``timeout`` counts from when the payload was built, whichever worker built
+    it, so a payload is never served for longer than ``timeout`` (use
+    ``SIGNED_URL_CACHE_TIMEOUT`` at most when it embeds signed URLs).
+
+    Usage:
+        tree_cache = VersionedCache('streaming:category_tree', timeout=1800)
+        tree = tree_cache.get(build_tree)
+        tree_cache.bump()
+    """
+
+    def __init__(self, namespace: str, timeout: int = 1800, check_interval: float = 2.0):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.version_key = f"{namespace}:version"
+        # (version, payload, built_at wall-clock time, checked_at monotonic time)
+        self._local = None
+        self._lock = threading.Lock()
+
+    def _data_key(self, version: int) -> str:
+        return f"{self.namespace}:payload:{version}"
+
+    def version(self) -> int:
+        """Return the current shared version, initialising it if missing."""
+        version = cache.get(self.version_key)
+        if version is None:
+            # Seed with a timestamp so an evicted counter never reuses an old version
+            cache.add(self.version_key, int(time.time() * 1000), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def bump(self) -> None:
+        """Invalidate the payload for every worker."""
+        self._local = None
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            # Counter missing, the next reader seeds a fresh one
+            pass
+        except Exception as e:
+            logger.warning(f"Could not bump cache version for {self.namespace}: {str(e)}")
+
+    def _fresh(self, built_at: float) -> bool:
+        return time.time() - built_at < self.timeout
+
+    def get(self, builder):
+        """Return the cached payload, calling ``builder()`` when it is stale."""
+        now = time.monotonic()
+        local = self._local
+
+        if local is not None:
+            version, payload, built_at, checked_at = local
+            if self._fresh(built_at) and now - checked_at < self.check_interval:
+                return payload
+
+        try:
+            current_version = self.version()
+        except Exception as e:
+            logger.warning(f"Shared cache unavailable for {self.namespace}: {str(e)}")
+            return builder()
+
+        if local is not None:
+            version, payload, built_at, _ = local
+            if version == current_version and self._fresh(built_at):
+                self._local = (version, payload, built_at, now)
+                return payload
+
+        with self._lock:
+            data_key = self._data_key(current_version)
+            entry = cache.get(data_key)
+            if entry is None or not self._fresh(entry[0]):
+                entry = (time.time(), builder())
+                cache.set(data_key, entry, timeout=self.timeout)
+            built_at, payload = entry
+            self._local = (current_version, payload, built_at, now)
+
+        return payload
+
+
+class CounterBuffer:
+    """
+    Counters accumulated in one shared-cache hash and drained in bulk.
+
+    Writers ``add`` increments (one pipelined HINCRBY round trip on Redis);
+    a single periodic consumer ``drain``s the totals, persists them and then
+    ``ack``s. ``drain`` moves the hash aside first, so increments arriving
+    during a flush land in the next batch. A batch that is drained but not
+    acked (worker crash) is returned again by the next ``drain`` under the
+    same batch id, so delivery is at-least-once: consumers record the ids
+    they have applied in the same transaction as the data and skip repeats.
+
+    Backends other than Redis fall back to read-modify-write of a cached
+    dict, which is only safe in a single process (development and tests).
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.pending_key = f"{namespace}:pending"
+        self.flushing_key = f"{namespace}:flushing"
+        self.batch_id_key = f"{namespace}:flushing_id"
+        self._lock = threading.Lock()
+
+    def _redis(self, backend):
+        return backend._cache.get_client(write=True)
+
+    def add(self, counts: dict) -> None:
+        if not counts:
+            return
+
+        backend = caches['default']
+        try:
+            if isinstance(backend, RedisCache):
+                key = backend.make_and_validate_key(self.pending_key)
+                pipeline = self._redis(backend).pipeline(transaction=False)
+                for field, delta in counts.items():
+                    pipeline.hincrby(key, field, delta)
+                pipeline.execute()
+                return
+
+            with self._lock:
+                pending = backend.get(self.pending_key) or {}
+                for field, delta in counts.items():
+                    pending[field] = pending.get(field, 0) + delta
+                backend.set(self.pending_key, pending, timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not buffer {len(counts)} counters for {self.namespace}: {str(e)}")
+
+    def drain(self) -> tuple:
+        """
+        ``(batch id, {field: count})`` of the current batch, the unacked one
+        first; the id is ``None`` when there is nothing to flush.
+        """
+
+        backend = caches['default']
+        if isinstance(backend, RedisCache):
+            client = self._redis(backend)
+            pending = backend.make_and_validate_key(self.pending_key)
+            flushing = backend.make_and_validate_key(self.flushing_key)
+            batch_id_key = backend.make_and_validate_key(self.batch_id_key)
+            if not client.exists(flushing):
+                if not client.exists(pending):
+                    return None, {}
+                pipeline = client.pipeline(transaction=True)
+                pipeline.rename(pending, flushing)
+                pipeline.set(batch_id_key, uuid4().hex)
+                pipeline.execute()
+            # A batch moved aside before ids were recorded gets one now
+            client.set(batch_id_key, uuid4().hex, nx=True)
+            batch_id = client.get(batch_id_key).decode()
+            return batch_id, {field.decode(): int(count) for field, count in client.hgetall(flushing).items()}
+
+        with self._lock:
+            flushing = backend.get(self.flushing_key)
+            if flushing is None:
+                pending = backend.get(self.pending_key)
+                if not pending:
+                    return None, {}
+                flushing = (uuid4().hex, pending)
+                backend.set(self.flushing_key, flushing, timeout=None)
+                backend.delete(self.pending_key)
+        batch_id, batch = flushing
+        return batch_id, dict(batch)
+
+    def ack(self) -> None:
+        """Forget the drained batch once it is persisted."""
+
+        backend = caches['default']
+        if isinstance(backend, RedisCache):
+            self._redis(backend).delete(
+                backend.make_and_validate_key(self.flushing_key),
+                backend.make_and_validate_key(self.batch_id_key),
+            )
+        else:
+            backend.delete(self.flushing_key)
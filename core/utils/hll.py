@@ -0,0 +1,71 @@
+"""
+HyperLogLog distinct-count sketches.
+
+A sketch of ``2 ** HLL_PRECISION`` one-byte registers estimates how many
+distinct items were added to it, and sketches merge losslessly (register-wise
+max), so the distinct count of a union of days is the estimate of the merged
+day sketches.
+
+Error bound: the relative standard error is ``1.04 / sqrt(m)``; with
+``m = 4096`` registers that is about 1.6%, so roughly 95% of estimates are
+within 3.3% and 99.7% within 4.9% of the true count. Small counts (below
+``2.5 * m``) use linear counting and are near exact.
+"""
+import hashlib
+import math
+import zlib
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RELATIVE_ERROR = 1.04 / math.sqrt(HLL_REGISTERS)
+
+_HASH_BITS = 64
+_REMAINING_BITS = _HASH_BITS - HLL_PRECISION
+_REMAINING_MASK = (1 << _REMAINING_BITS) - 1
+
+
+class HyperLogLog:
+
+    def __init__(self, registers: bytes = None):
+        self.registers = bytearray(registers) if registers else bytearray(HLL_REGISTERS)
+
+    def add(self, item) -> None:
+        digest = hashlib.blake2b(str(item).encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        index = value >> _REMAINING_BITS
+        # Position of the leftmost 1-bit in the remaining bits
+        rank = _REMAINING_BITS - (value & _REMAINING_MASK).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items) -> 'HyperLogLog':
+        for item in items:
+            self.add(item)
+        return self
+
+    def merge(self, *others) -> 'HyperLogLog':
+        """Union with ``others`` in place."""
+        for other in others:
+            self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = HLL_REGISTERS
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        """Compressed registers (sparse days compress to a few hundred bytes)."""
+        return zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        return cls(zlib.decompress(bytes(data)))
+
+    @classmethod
+    def union(cls, sketches) -> 'HyperLogLog':
+        return cls().merge(*sketches)
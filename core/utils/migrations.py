@@ -0,0 +1,89 @@
+"""
+Migration operations that build indexes without blocking writes.
+
+On PostgreSQL the indexes are built with ``CREATE INDEX CONCURRENTLY`` and
+unique constraints are promoted from a concurrently built unique index
+(``ADD CONSTRAINT ... UNIQUE USING INDEX``), so only a brief lock is taken
+on busy tables. Other backends (SQLite in development and tests) fall back
+to the plain operations.
+
+Concurrent builds cannot run inside a transaction: migrations using these
+operations must set ``atomic = False``. A failed concurrent build leaves an
+INVALID index behind; the operations drop it before retrying.
+"""
+from django.db import migrations
+
+
+def _is_postgres(schema_editor) -> bool:
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+def _drop_invalid_index(schema_editor, name: str) -> None:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid '
+            'WHERE pg_class.relname = %s AND NOT pg_index.indisvalid',
+            [name],
+        )
+        invalid = cursor.fetchone()
+    if invalid:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+
+    def describe(self):
+        return f'Concurrently create index {self.index.name} on {self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgres(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            _drop_invalid_index(schema_editor, self.index.name)
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgres(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+
+class AddUniqueConstraintConcurrently(migrations.AddConstraint):
+    """
+    ``AddConstraint`` for a plain (unconditional, field-based) ``UniqueConstraint``.
+
+    A constraint that already exists under the same name is left alone, e.g.
+    the one ``partition_event_tables --convert`` creates on a partitioned
+    parent (which cannot build indexes concurrently).
+    """
+
+    def describe(self):
+        return f'Concurrently create constraint {self.constraint.name} on {self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgres(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s',
+                [model._meta.db_table, self.constraint.name],
+            )
+            if cursor.fetchone():
+                return
+
+        name = schema_editor.quote_name(self.constraint.name)
+        table = schema_editor.quote_name(model._meta.db_table)
+        columns = ', '.join(
+            schema_editor.quote_name(model._meta.get_field(field).column) for field in self.constraint.fields
+        )
+        _drop_invalid_index(schema_editor, self.constraint.name)
+        schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})')
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
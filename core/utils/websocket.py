@@ -0,0 +1,43 @@
+"""
+Shared helpers for Channels consumers.
+"""
+from channels.db import database_sync_to_async
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.exceptions import TokenError
+import logging
+
+from apps.authentication.services.principal import get_principal_user
+
+logger = logging.getLogger(__name__)
+
+
+class JWTQueryAuthMixin:
+    """Authenticates a consumer from the ``?token=<access JWT>`` query parameter."""
+
+    async def authenticate(self):
+        """Authenticate user from JWT token in query string."""
+        try:
+            query_string = self.scope.get('query_string', b'').decode('utf-8')
+            params = dict(param.split('=') for param in query_string.split('&') if '=' in param)
+            token = params.get('token')
+
+            if not token:
+                logger.warning("WebSocket connection rejected: No token provided")
+                return None
+
+            access_token = AccessToken(token)
+            user_id = access_token['user_id']
+            user = await database_sync_to_async(get_principal_user)(user_id)
+            if user is None:
+                logger.warning("WebSocket connection rejected: User not found")
+                return None
+            if not user.is_active:
+                logger.warning("WebSocket connection rejected: User is inactive")
+                return None
+            return user
+        except TokenError as e:
+            logger.warning(f"WebSocket connection rejected: Invalid token - {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"WebSocket authentication error: {str(e)}")
+            return None
@@ -13,4 +13,32 @@ app.conf.beat_schedule = {
         'task': 'apps.streaming.tasks.tasks.cleanup_stale_chunks',
         'schedule': crontab(hour=0, minute=0),  # Run at midnight
     },
+    'compute-related-videos-nightly': {
+        'task': 'apps.streaming.tasks.tasks.compute_related_videos',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'reconcile-notification-unread-counts-hourly': {
+        'task': 'apps.analytics.tasks.notifications.reconcile_notification_unread_counts',
+        'schedule': crontab(minute=15),
+    },
+    'refresh-analytics-rollups': {
+        'task': 'apps.analytics.tasks.rollups.refresh_analytics_rollups',
+        'schedule': crontab(minute='*/10'),
+    },
+    'reconcile-client-activities-daily': {
+        'task': 'apps.analytics.tasks.rollups.reconcile_client_activities',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'flush-ad-events': {
+        'task': 'apps.advertising.tasks.events.flush_ad_event_buffer',
+        'schedule': crontab(minute='*'),
+    },
+    'reconcile-credits-hourly': {
+        'task': 'apps.authentication.tasks.credits.reconcile_credits',
+        'schedule': crontab(minute=15),
+    },
+    'roll-event-partitions-daily': {
+        'task': 'apps.analytics.tasks.partitions.roll_event_partitions',
+        'schedule': crontab(hour=3, minute=30),
+    },
 }
@@ -1,7 +1,9 @@
 from django.urls import path
 from apps.streaming.socket.consumers import VideoProcessorConsumer
+from apps.analytics.socket.consumers import NotificationConsumer
 
 # WebSocket URL patterns used by Channels' URLRouter
 ws_urlpatterns = [
     path("socket/stream/progress/<int:video_uid>/", VideoProcessorConsumer.as_asgi()),
+    path("socket/notifications/", NotificationConsumer.as_asgi()),
 ]
\ No newline at end of file